@@ -0,0 +1,68 @@
+# ASGI entry point for the async /weather path: hypercorn asgi:app --workers 4
+# Run from the backend folder. Routes other than /weather are served by the WSGI app (wsgi.py).
+import time
+from quart import Quart, Response, g, request
+from config import load_config
+from controllers.User_Controller import UserController
+from controllers.Async_Weather_Controller import AsyncWeatherController
+from utils.compression import gzip_response_async
+from utils.log import REQUEST_ID_HEADER, configure_logging, get_logger, new_request_id, request_id
+
+access_logger = get_logger("access")
+
+
+def create_asgi_app(config=None):
+    """
+    Builds the Quart app serving GET /weather without blocking a thread per request.
+    config is the same override mapping create_app accepts.
+    """
+    app = Quart(__name__)
+    app.config.from_mapping(load_config(config))
+    configure_logging(app.config)
+
+    # The sync controller owns the caches, snapshots and response building; the async one only
+    # replaces the I/O. The async client and thread pool are bound to the serving event loop.
+    user_controller = UserController(app.config)
+    app.extensions["user_controller"] = user_controller
+
+    @app.before_serving
+    async def start_weather_controller():
+        app.extensions["weather_controller"] = AsyncWeatherController(user_controller)
+
+    @app.after_serving
+    async def stop_weather_controller():
+        await app.extensions.pop("weather_controller").close()
+
+    @app.before_request
+    async def start_request():
+        g.request_started = time.perf_counter()
+        # Each request runs in its own task, so the ID stays with this request across awaits
+        request_id.set(new_request_id(request.headers.get(REQUEST_ID_HEADER)))
+
+    @app.after_request
+    async def finish_response(response):
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        started = g.get("request_started")
+        response.headers[REQUEST_ID_HEADER] = request_id.get() or ""
+        access_logger.info("%s %s %s", request.method, route, response.status_code, extra={
+            "event": "http.request", "method": request.method, "route": route, "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2) if started is not None else None})
+        if "Origin" in request.headers:
+            response.headers["Access-Control-Allow-Origin"] = "*"  # same default as flask_cors in server.py
+        return await gzip_response_async(response, request, min_size=app.config["RESPONSE_GZIP_MIN_SIZE"],
+                                         level=app.config["RESPONSE_GZIP_LEVEL"])
+
+    # --- Weather Data Route ---
+    @app.route('/weather', methods=['GET'])
+    async def get_weather():
+        return await app.extensions["weather_controller"].get_weather()
+
+    # --- Monitoring ---
+    @app.route('/metrics', methods=['GET'])
+    async def metrics():
+        return Response(user_controller.metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return app
+
+
+app = create_asgi_app()
@@ -0,0 +1,170 @@
+# benchmarks/bench_suite.py
+"""
+Latency of the User model, Admin statistics and the /weather controller path at several
+table sizes, written as a JSON report that can be compared between commits.
+
+    python backend/benchmarks/bench_suite.py --sizes 1000 100000 1000000 --output before.json
+    python backend/benchmarks/bench_suite.py --sizes 1000 100000 1000000 --output after.json
+    python backend/benchmarks/bench_suite.py --compare before.json after.json
+
+Each size seeds a fresh synthetic users table (see common.seed_users) and times every
+operation on it. Reads and updates target random seeded users; creates are removed again
+by the remove benchmark, so every operation sees the same table size. /weather is served
+through the Flask test client with a canned upstream, so it measures our code, not the network.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import PREFERENCES, fresh_user_model, seed_users, time_calls
+
+import Admin_Model
+
+# Full table scans are timed fewer times than point operations
+SCAN_REPEAT = 5
+SCAN_OPERATIONS = ("get_all", "admin_preference_statistics")
+
+
+def canned_upstream(url, params=None, timeout=None):
+    """Fixed OpenWeatherMap-shaped payloads for the /weather benchmarks."""
+    if "geo/1.0" in url:
+        return [{"lat": 40.7128, "lon": -74.006}]
+    if "forecast" in url:
+        return {"city": {"timezone": -14400}, "list": [
+            {"dt": 1760000000 + 10800 * i,
+             "main": {"feels_like": 10.0 + i, "temp": 11.0 + i, "humidity": 50},
+             "wind": {"speed": 3.0},
+             "weather": [{"description": "light rain" if i == 1 else "clear sky"}]}
+            for i in range(40)]}
+    return {"dt": 1760000000, "timezone": -14400, "name": "New York",
+            "main": {"feels_like": 8.6, "temp": 9.0, "temp_min": 5.0, "temp_max": 12.0, "humidity": 61},
+            "wind": {"speed": 4.1}, "weather": [{"description": "few clouds"}]}
+
+
+def weather_client(db_path, history_dir):
+    """A Flask test client for the app bound to db_path, with the upstream replaced by canned_upstream."""
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from server import create_app
+    app = create_app({"DB_PATH": db_path, "FORECAST_HISTORY_DIR": history_dir, "API_KEY": "bench",
+                      "WEATHER_PREFETCH_ENABLED": False, "FORECAST_HISTORY_ENABLED": False})
+    app.extensions["user_controller"].upstream.get_json = canned_upstream
+    return app.test_client()
+
+
+def bench_size(size, repeat, db_dir, rng):
+    db_path = os.path.join(db_dir, f"bench_suite_{size}.db")
+    user = fresh_user_model(db_path)
+    ids = seed_users(user, size)
+    Admin_Model.DB_PATH = db_path
+
+    def seeded_email(i):
+        return f"seed-{rng.randrange(size)}@example.com"
+
+    # Update targets are chosen up front so the timed call is User.update alone
+    update_targets = [(ids[n], f"seed-{n}@example.com") for n in (rng.randrange(size) for _ in range(repeat))]
+
+    def update(i):
+        user_id, email = update_targets[i]
+        user.update({"id": user_id, "email": email, "name": f"Renamed User {i}"})
+
+    results = {}
+    results["create"] = time_calls(lambda i: user.create({
+        "name": f"New User {i}", "email": f"new-{i}@example.com",
+        "preference_temperature": PREFERENCES[i % 3], "google_oauth_token": None}), repeat)
+    results["exists"] = time_calls(lambda i: user.exists(email=seeded_email(i)), repeat)
+    results["get"] = time_calls(lambda i: user.get(email=seeded_email(i)), repeat)
+    results["update"] = time_calls(update, repeat)
+    results["update_preference"] = time_calls(
+        lambda i: user.update_preference(seeded_email(i), PREFERENCES[i % 3]), repeat)
+    results["remove"] = time_calls(lambda i: user.remove(f"new-{i}@example.com"), repeat)
+    results["get_all"] = time_calls(lambda i: user.get_all(), min(repeat, SCAN_REPEAT))
+    results["admin_preference_statistics"] = time_calls(
+        lambda i: Admin_Model.Admin.get_user_preference_statistics(), min(repeat, SCAN_REPEAT))
+
+    client = weather_client(db_path, os.path.join(db_dir, "bench_suite_history"))
+    client.get("/weather")  # warm the caches; the benchmark measures the cached path
+    results["weather_cached"] = time_calls(lambda i: client.get(f"/weather?email={seeded_email(i)}"), repeat)
+    etag = client.get("/weather").headers["ETag"]
+    results["weather_not_modified"] = time_calls(
+        lambda i: client.get("/weather", headers={"If-None-Match": etag}), repeat)
+
+    user.close()
+    for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat, db_dir, seed=0):
+    rng = random.Random(seed)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": {str(size): bench_size(size, repeat, db_dir, rng) for size in sizes},
+    }
+
+
+def compare(base, head, threshold=0.10, metric="p50_us"):
+    """
+    Rows of (rows, operation, base, head, ratio, flag) for every benchmark in both reports.
+    flag is "REGRESSION" / "improved" when head differs from base by more than threshold.
+    """
+    rows = []
+    for size, operations in head["results"].items():
+        for operation, summary in operations.items():
+            before = base["results"].get(size, {}).get(operation)
+            if before is None or not before[metric]:
+                continue
+            ratio = summary[metric] / before[metric]
+            flag = "REGRESSION" if ratio > 1 + threshold else "improved" if ratio < 1 - threshold else ""
+            rows.append((int(size), operation, before[metric], summary[metric], round(ratio, 3), flag))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--db-dir", default=tempfile.gettempdir())
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two reports instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative p50 change reported by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f_base, open(args.compare[1]) as f_head:
+            rows = compare(json.load(f_base), json.load(f_head), args.threshold)
+        print(f"{'rows':>10} {'operation':<28} {'base p50':>10} {'head p50':>10} {'ratio':>7}")
+        for size, operation, before, after, ratio, flag in rows:
+            print(f"{size:>10} {operation:<28} {before:>10} {after:>10} {ratio:>7} {flag}")
+        sys.exit(1 if any(row[5] == "REGRESSION" for row in rows) else 0)
+
+    report = run(args.sizes, args.repeat, args.db_dir)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
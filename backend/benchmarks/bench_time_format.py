@@ -0,0 +1,61 @@
+# benchmarks/bench_time_format.py
+"""
+Forecast time formatting: the previous per-entry path (strptime + pytz + three
+strftime calls per entry) against utils.time_format's batch pass over epoch "dt".
+
+    python backend/benchmarks/bench_time_format.py --entries 8 --repeat 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a benchmarks folder next to the utils folder
+sys.path.append(fpath)
+from time_format import format_local_times
+
+
+def legacy_convert_utc_to_est(utc_time_str):
+    """The per-entry conversion /weather used before (kept here only for comparison)."""
+    import pytz
+    utc_time = datetime.strptime(utc_time_str, '%Y-%m-%d %H:%M:%S')
+    utc_time = utc_time.replace(tzinfo=pytz.UTC)
+    est_tz = pytz.timezone('America/New_York')
+    est_time = utc_time.astimezone(est_tz)
+    hour = int(est_time.strftime('%I'))
+    minute = est_time.strftime('%M')
+    ampm = est_time.strftime('%p')
+    if minute == '00':
+        return f"{hour}{ampm}"
+    return f"{hour}:{minute}{ampm}"
+
+
+def sample_entries(count, start=1751328000):
+    return [{"dt": start + 10800 * i,
+             "dt_txt": datetime.fromtimestamp(start + 10800 * i, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}
+            for i in range(count)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    entries = sample_entries(args.entries)
+    offset = -4 * 3600  # what OpenWeatherMap reports for New York in summer
+    legacy = [legacy_convert_utc_to_est(entry["dt_txt"]) for entry in entries]
+    assert legacy == format_local_times([entry["dt"] for entry in entries], utc_offset=offset)
+    assert legacy == format_local_times([entry["dt"] for entry in entries])
+
+    cases = {
+        "legacy per-entry (pytz)": lambda: [legacy_convert_utc_to_est(entry["dt_txt"]) for entry in entries],
+        "batch, zone fallback": lambda: format_local_times([entry["dt"] for entry in entries]),
+        "batch, API utc offset": lambda: format_local_times([entry["dt"] for entry in entries], utc_offset=offset),
+    }
+    baseline = None
+    for name, fn in cases.items():
+        per_call_us = min(timeit.repeat(fn, number=args.repeat, repeat=3)) / args.repeat * 1e6
+        baseline = baseline or per_call_us
+        print(f"{name:<26} {per_call_us:8.2f} us per {args.entries} entries  ({baseline / per_call_us:5.1f}x)")
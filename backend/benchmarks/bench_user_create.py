@@ -0,0 +1,46 @@
+# benchmarks/bench_user_create.py
+"""
+Signup latency of User.create as the users table grows.
+
+    python backend/benchmarks/bench_user_create.py --sizes 1000 100000 1000000
+
+Each size seeds a fresh table, then times --repeat calls to User.create. With id
+allocation done by the primary key, p50 should stay flat across sizes.
+"""
+import argparse
+import os
+import tempfile
+
+from common import fresh_user_model, seed_users, time_calls
+
+
+def run(sizes, repeat, db_dir):
+    results = []
+    for size in sizes:
+        db_path = os.path.join(db_dir, f"bench_create_{size}.db")
+        user = fresh_user_model(db_path)
+        seed_users(user, size)
+        summary = time_calls(lambda i: user.create({
+            "name": f"New User {i}",
+            "email": f"new-{i}@example.com",
+            "preference_temperature": "neutral",
+            "google_oauth_token": None,
+        }), repeat)
+        results.append({"rows": size, **summary})
+        user.close()
+        for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--db-dir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'p50 us':>10} {'p95 us':>10} {'mean us':>10}")
+    for row in run(args.sizes, args.repeat, args.db_dir):
+        print(f"{row['rows']:>10} {row['p50_us']:>10} {row['p95_us']:>10} {row['mean_us']:>10}")
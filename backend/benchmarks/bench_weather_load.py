@@ -0,0 +1,112 @@
+# benchmarks/bench_weather_load.py
+"""
+Offline load test of the /weather pipeline against the local OpenWeatherMap stand-in.
+
+    python backend/benchmarks/bench_weather_load.py --requests 2000 --concurrency 32 --cities 200 \
+        --latency lognormal:40:0.5 --error-rate 0.01 --rate-limit-rate 0.01
+
+By default the fake upstream and the Flask app both run in this process (the app through its
+test client, one per worker thread). With --target the requests go over HTTP to an already
+running server instead, which should have been started with OWM_BASE_URL pointing at a fake
+(see fake_owm.py). Prints a JSON summary: throughput, latency percentiles and status counts.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_owm import FakeOpenWeatherMap
+
+
+def in_process_client_factory(base_url, db_dir):
+    """Return a function creating one Flask test client per worker thread, all sharing one app."""
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from server import create_app
+    app = create_app({"OWM_BASE_URL": base_url, "API_KEY": "load-test",
+                      "DB_PATH": os.path.join(db_dir, "bench_weather_load.db"),
+                      "FORECAST_HISTORY_DIR": os.path.join(db_dir, "bench_weather_load_history"),
+                      "WEATHER_PREFETCH_ENABLED": False})
+
+    def get(client, path):
+        return client.get(path).status_code
+    return app.test_client, get
+
+
+def http_client_factory(target):
+    import requests
+
+    def get(session, path):
+        return session.get(target + path, timeout=30).status_code
+    return requests.Session, get
+
+
+def run(paths, concurrency, new_client, get):
+    local = threading.local()
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def one(path):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = new_client()
+        start = time.perf_counter()
+        status = get(client, path)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, paths))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+    return {
+        "requests": len(paths),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(paths) / duration, 1),
+        "latency_ms": {"mean": round(statistics.fmean(latencies), 2), "p50": percentile(0.50),
+                       "p95": percentile(0.95), "p99": percentile(0.99), "max": round(latencies[-1], 2)},
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--cities", type=int, default=200, help="distinct cities requested (cache key spread)")
+    parser.add_argument("--latency", default="lognormal:40:0.5", help="fake upstream latency spec in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", help="base URL of a running backend, e.g. http://127.0.0.1:5000")
+    parser.add_argument("--db-dir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    paths = [f"/weather?city=Load%20City%20{rng.randrange(args.cities)}" for _ in range(args.requests)]
+
+    if args.target:
+        summary = run(paths, args.concurrency, *http_client_factory(args.target.rstrip("/")))
+    else:
+        upstream = FakeOpenWeatherMap(latency=args.latency, error_rate=args.error_rate,
+                                      rate_limit_rate=args.rate_limit_rate, seed=args.seed).start()
+        try:
+            summary = run(paths, args.concurrency, *in_process_client_factory(upstream.base_url, args.db_dir))
+            summary["upstream"] = upstream.stats()
+        finally:
+            upstream.stop()
+    json.dump(summary, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,59 @@
+# benchmarks/common.py
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+fpath = os.path.join(os.path.dirname(__file__), '../models') #Assumes this file lives in a benchmarks folder next to the Models folder
+sys.path.append(fpath)
+from User_Model import User
+
+PREFERENCES = ("neutral", "gets_cold_easily", "gets_hot_easily")
+
+
+def fresh_user_model(db_path, table_name="users"):
+    """Create an empty users table at db_path and return a User model bound to it."""
+    for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    user = User(db_path, table_name)
+    user.initialize_table()
+    return user
+
+
+def seed_users(user, count, batch_size=50000, rng=None):
+    """
+    Bulk-insert count synthetic users straight through SQL, bypassing User.create,
+    so large tables can be built in seconds. Emails are seed-<n>@example.com.
+    """
+    rng = rng or random.Random(0)
+    ids = rng.sample(range(user.max_safe_id + 1), count)
+    db_connection = sqlite3.connect(user.db_name)
+    try:
+        for start in range(0, count, batch_size):
+            rows = [(ids[n], f"Seed User {n}", f"seed-{n}@example.com", PREFERENCES[n % 3], None)
+                    for n in range(start, min(start + batch_size, count))]
+            db_connection.executemany(f"INSERT INTO {user.table_name} VALUES (?, ?, ?, ?, ?);", rows)
+            db_connection.commit()
+    finally:
+        db_connection.close()
+    return ids
+
+
+def time_calls(fn, repeat):
+    """Call fn(i) repeat times and return per-call latency summary in microseconds."""
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "calls": repeat,
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p95_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        "max_us": round(samples[-1], 2),
+    }
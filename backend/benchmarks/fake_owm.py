@@ -0,0 +1,225 @@
+# benchmarks/fake_owm.py
+"""
+Local stand-in for the OpenWeatherMap endpoints UserController calls: geocoding
+(/geo/1.0/direct), the 5 day forecast (/data/2.5/forecast) and current conditions
+(/data/2.5/weather). Payloads are a deterministic function of the query, so runs are
+reproducible; latency, 5xx errors and 429 rate limiting are injected at configurable rates.
+
+    python backend/benchmarks/fake_owm.py --port 8089 --latency lognormal:40:0.5 --error-rate 0.01
+    OWM_BASE_URL=http://127.0.0.1:8089 python backend/server.py
+
+Latency specs are in milliseconds: fixed:MS, uniform:LO:HI, normal:MEAN:SD,
+lognormal:MEDIAN:SIGMA or exponential:MEAN. GET /__stats returns request counters.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DESCRIPTIONS = ("clear sky", "few clouds", "scattered clouds", "broken clouds", "overcast clouds",
+                "light rain", "moderate rain", "light snow", "mist", "thunderstorm")
+FORECAST_ENTRIES = 40  # 5 days of 3-hour steps, like the real endpoint
+DEFAULT_EPOCH = 1760000400  # fixed "now" so payloads do not change between runs
+
+
+def parse_latency(spec):
+    """Turn a latency spec such as "uniform:20:80" into a callable(rng) returning seconds."""
+    kind, *values = spec.split(":")
+    try:
+        values = [float(value) for value in values]
+        samplers = {
+            "fixed": lambda rng: values[0],
+            "uniform": lambda rng: rng.uniform(values[0], values[1]),
+            "normal": lambda rng: rng.gauss(values[0], values[1]),
+            "lognormal": lambda rng: rng.lognormvariate(math.log(values[0]), values[1]),
+            "exponential": lambda rng: rng.expovariate(1 / values[0]),
+        }
+        sampler = samplers[kind]
+        sampler(random.Random(0))
+    except (KeyError, IndexError, ValueError, ZeroDivisionError):
+        raise ValueError(f"Invalid latency spec {spec!r}")
+    return lambda rng: max(0.0, sampler(rng)) / 1000
+
+
+def seeded(*parts):
+    """A Random seeded from the request's identifying values, identical across runs and processes."""
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "big"))
+
+
+def geocode_payload(city):
+    rng = seeded("geo", city.strip().lower())
+    return [{"name": city, "lat": round(rng.uniform(-60, 70), 4), "lon": round(rng.uniform(-180, 180), 4),
+             "country": "XX"}]
+
+
+def conditions(rng, base_temp):
+    temp = round(base_temp + rng.uniform(-4, 4), 2)
+    return {
+        "main": {"temp": temp, "feels_like": round(temp - rng.uniform(0, 3), 2),
+                 "temp_min": round(temp - rng.uniform(0, 3), 2), "temp_max": round(temp + rng.uniform(0, 3), 2),
+                 "humidity": rng.randint(20, 100)},
+        "wind": {"speed": round(rng.uniform(0, 15), 2)},
+        "weather": [{"description": rng.choice(DESCRIPTIONS)}],
+    }
+
+
+def utc_offset(lon):
+    return int(round(lon / 15)) * 3600
+
+
+def forecast_payload(lat, lon, epoch):
+    rng = seeded("forecast", lat, lon)
+    base_temp = 25 - abs(lat) / 3
+    start = epoch - epoch % 10800 + 10800
+    entries = []
+    for step in range(FORECAST_ENTRIES):
+        dt = start + step * 10800
+        entry = {"dt": dt, "dt_txt": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(dt))}
+        entry.update(conditions(rng, base_temp))
+        entries.append(entry)
+    return {"cod": "200", "cnt": FORECAST_ENTRIES, "list": entries,
+            "city": {"coord": {"lat": lat, "lon": lon}, "timezone": utc_offset(lon)}}
+
+
+def current_payload(key, lat, lon, name, epoch):
+    rng = seeded("current", key)
+    payload = {"dt": epoch, "name": name, "timezone": utc_offset(lon), "coord": {"lat": lat, "lon": lon}}
+    payload.update(conditions(rng, 25 - abs(lat) / 3))
+    return payload
+
+
+class FakeOpenWeatherMap(ThreadingHTTPServer):
+    """The stand-in server. Use start() / stop() to run it on a background thread (e.g. in a benchmark)."""
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency="fixed:0", error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1, seed=0, epoch=DEFAULT_EPOCH):
+        super().__init__(address, FakeOpenWeatherMapHandler)
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.epoch = epoch
+        self.rng = random.Random(seed)  # latency and fault injection; shared, so guarded by _lock
+        self._lock = threading.Lock()
+        self.counts = {"geocode": 0, "forecast": 0, "current": 0, "errors": 0, "rate_limited": 0, "not_found": 0}
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self):
+        """(delay in seconds, injected status or None) for one request"""
+        with self._lock:
+            delay = self.latency(self.rng)
+            roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return delay, 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, 500
+        return delay, None
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-owm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeOpenWeatherMapHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if url.path == "/__stats":
+            return self.send_json(200, self.server.stats())
+
+        endpoint = {"/geo/1.0/direct": "geocode", "/data/2.5/forecast": "forecast",
+                    "/data/2.5/weather": "current"}.get(url.path)
+        if endpoint is None:
+            self.server.count("not_found")
+            return self.send_json(404, {"cod": "404", "message": "Internal error"})
+
+        delay, injected = self.server.draw()
+        if delay:
+            time.sleep(delay)
+        if injected == 429:
+            self.server.count("rate_limited")
+            return self.send_json(429, {"cod": 429, "message": "Too many requests"},
+                                  {"Retry-After": str(self.server.retry_after)})
+        if injected == 500:
+            self.server.count("errors")
+            return self.send_json(500, {"cod": 500, "message": "Internal server error"})
+        if "appid" not in query:
+            return self.send_json(401, {"cod": 401, "message": "Invalid API key"})
+
+        self.server.count(endpoint)
+        try:
+            if endpoint == "geocode":
+                return self.send_json(200, geocode_payload(query["q"]))
+            if endpoint == "forecast":
+                lat, lon = float(query["lat"]), float(query["lon"])
+                return self.send_json(200, forecast_payload(lat, lon, self.server.epoch))
+            if "q" in query:
+                coords = geocode_payload(query["q"])[0]
+                return self.send_json(200, current_payload(query["q"].strip().lower(), coords["lat"], coords["lon"],
+                                                           query["q"], self.server.epoch))
+            lat, lon = float(query["lat"]), float(query["lon"])
+            return self.send_json(200, current_payload((lat, lon), lat, lon, "", self.server.epoch))
+        except (KeyError, ValueError):
+            return self.send_json(400, {"cod": "400", "message": "Nothing to geocode"})
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate a load test
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0", help="per-request latency spec in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--epoch", type=int, default=DEFAULT_EPOCH, help="timestamp payloads are generated for")
+    args = parser.parse_args()
+
+    server = FakeOpenWeatherMap((args.host, args.port), latency=args.latency, error_rate=args.error_rate,
+                                rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                                seed=args.seed, epoch=args.epoch)
+    print(f"Fake OpenWeatherMap listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,31 @@
+# Consistency check for the maintained user preference counters (users_preference_stats).
+# Recounts the users table and reports any counter that drifted; run it from cron, e.g.
+#     python backend/check_preference_stats.py            exit status 1 if anything drifted
+#     python backend/check_preference_stats.py --repair   also overwrite drifted counters
+#     python backend/check_preference_stats.py --install  create the table and triggers on an existing database
+import argparse
+import json
+import sys
+
+from config import load_config
+from models.User_Model import User
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recount users per preference and report counter drift.")
+    parser.add_argument("--db", default=None, help="database path (default: DB_PATH from the config)")
+    parser.add_argument("--repair", action="store_true", help="overwrite drifted counters with the recount")
+    parser.add_argument("--install", action="store_true",
+                        help="create the stats table and triggers first (keeps existing users)")
+    args = parser.parse_args()
+
+    Users = User(args.db or load_config()["DB_PATH"], "users", cache_size=0)
+    if args.install:
+        Users.initialize_preference_stats()
+    result = Users.check_preference_stats(repair=args.repair)
+    Users.close()
+    if result["status"] != "success":
+        print(f"Preference stats check failed: {result['data']}", file=sys.stderr)
+        sys.exit(2)
+
+    print(json.dumps(result["data"], indent=2))
+    sys.exit(1 if result["data"]["drift"] and not result["data"]["repaired"] else 0)
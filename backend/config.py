@@ -0,0 +1,88 @@
+# config.py
+import os
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DOTENV_PATH = os.path.join(BACKEND_DIR, '..', 'frontend', '.env')
+
+# Every setting the backend reads, with its default. Values are taken from the environment
+# (after loading the frontend .env file) and converted to the type of the default.
+DEFAULTS = {
+    "API_KEY": None,
+    "OWM_BASE_URL": "http://api.openweathermap.org",  # point at benchmarks/fake_owm.py for offline runs
+    "EXPO_PUBLIC_IP_ADDRESS": None,
+    "DB_PATH": os.path.join(BACKEND_DIR, 'data', 'database.db'),
+    "BULK_CHUNK_SIZE": 1000,
+    "USER_CACHE_MAXSIZE": 4096,  # users; 0 disables the cache
+    "USER_CACHE_COHERENCE_INTERVAL": 1.0,  # max seconds another worker's write can go unseen; 0 checks every read
+    "GEOCODE_CACHE_MAXSIZE": 1024,
+    "WEATHER_CACHE_TTL_FORECAST": 600,
+    "WEATHER_CACHE_TTL_CURRENT": 300,
+    "WEATHER_CACHE_MAXSIZE": 512,
+    "FORECAST_HISTORY_ENABLED": True,
+    "FORECAST_HISTORY_DIR": os.path.join(BACKEND_DIR, 'data', 'forecast_history'),
+    "UPSTREAM_POOL_MAXSIZE": 32,
+    "UPSTREAM_CONNECT_TIMEOUT": 3.05,
+    "UPSTREAM_READ_TIMEOUT": 5.0,
+    "UPSTREAM_MAX_RETRIES": 2,
+    "WEATHER_FETCH_WORKERS": 16,
+    "WEATHER_FETCH_TIMEOUT": 10.0,
+    "WEATHER_PREFETCH_ENABLED": True,
+    "WEATHER_PREFETCH_LEAD_TIME": 30.0,
+    "WEATHER_PREFETCH_IDLE_TIMEOUT": 3600.0,
+    "WEATHER_PREFETCH_WORKERS": 4,
+    "WEATHER_PREFETCH_MAX_TRACKED": 0,  # locations kept warm; 0 = 3/8 of WEATHER_CACHE_MAXSIZE (2 entries each)
+    "WEATHER_PREFETCH_MIN_REQUESTS": 2,  # requests before a location is kept warm
+    "WEATHER_BATCH_CONCURRENCY": 8,
+    "WEATHER_BATCH_MAX_LOCATIONS": 50,
+    "WEATHER_BATCH_TIMEOUT": 20.0,
+    "ASYNC_UPSTREAM_MAX_CONNECTIONS": 200,
+    "ASYNC_BLOCKING_WORKERS": 8,
+    "RESPONSE_GZIP_MIN_SIZE": 1024,
+    "RESPONSE_GZIP_LEVEL": 6,
+    "PROFILE_ENABLED": False,
+    "PROFILE_ROUTES": "/weather,/users",  # comma separated path prefixes
+    "PROFILE_SAMPLE_RATE": 0.01,
+    "PROFILE_ADMIN_TOKEN": None,  # X-Profile-Token value that profiles any single request
+    "PROFILE_DIR": os.path.join(BACKEND_DIR, 'data', 'profiles'),
+    "PROFILE_FLUSH_INTERVAL": 30.0,
+    "LOG_LEVEL": "INFO",
+    "LOG_SAMPLE_RATES": "",  # comma separated event=rate, e.g. "http.request=0.1"; WARNING and up are never sampled
+    "LOG_QUEUE_SIZE": 10000,
+}
+
+
+def convert(value, default):
+    """Convert an environment string to the type of its default ("0"/"false"/"no"/"off" are False)."""
+    if isinstance(default, bool):
+        return value.strip().lower() not in ("0", "false", "no", "off", "")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+
+def load_config(overrides=None, environ=None, dotenv_path=DOTENV_PATH):
+    """
+    Build the application config once: defaults, then the environment (including the frontend
+    .env file, which does not override variables that are already set), then overrides.
+
+    Raises ValueError if an environment variable cannot be converted to its setting's type.
+    """
+    if environ is None:
+        load_dotenv(dotenv_path=dotenv_path)
+        environ = os.environ
+
+    config = {}
+    for name, default in DEFAULTS.items():
+        raw = environ.get(name)
+        if raw is None:
+            config[name] = default
+            continue
+        try:
+            config[name] = convert(raw, default)
+        except ValueError:
+            raise ValueError(f"Invalid value for {name}: {raw!r}")
+    config.update(overrides or {})
+    return config
@@ -0,0 +1,181 @@
+import asyncio
+import contextvars
+import time
+
+import httpx
+from quart import Response, request, jsonify
+
+from controllers.User_Controller import LocationNotFound
+from models.Geocode_Model import GeocodeCache
+from utils.async_upstream_client import AsyncUpstreamClient
+from utils.concurrency import AsyncSingleFlight, StageTimeout, bounded_executor
+from utils.log import get_logger
+
+logger = get_logger("async_weather_controller")
+
+
+class AsyncWeatherController:
+    """
+    Non-blocking /weather for the ASGI app (see asgi.py).
+
+    Waiting on OpenWeatherMap never holds a thread: upstream calls go through an async HTTP
+    client, so one event loop can keep thousands of requests in flight. SQLite lookups (user
+    preference, stored geocodes) and forecast history writes are short blocking calls and run
+    on a small thread pool. Parsing, caching, snapshots and response building are delegated to
+    the wrapped UserController, so the output is exactly that of UserController.get_weather.
+
+    Create it inside the serving event loop (and so after any fork), e.g. in before_serving.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        config = controller.config
+        self.upstream = AsyncUpstreamClient(
+            max_connections=config["ASYNC_UPSTREAM_MAX_CONNECTIONS"],
+            max_keepalive_connections=config["UPSTREAM_POOL_MAXSIZE"],
+            connect_timeout=config["UPSTREAM_CONNECT_TIMEOUT"],
+            read_timeout=config["UPSTREAM_READ_TIMEOUT"],
+            max_retries=config["UPSTREAM_MAX_RETRIES"],
+        )
+        self.upstream_flights = AsyncSingleFlight()
+        self.blocking_pool = bounded_executor(config["ASYNC_BLOCKING_WORKERS"], "weather-blocking")
+
+    async def run_blocking(self, fn, *args):
+        """Runs a short blocking call (SQLite, disk) on blocking_pool without stalling the event loop"""
+        # run_in_executor does not carry context variables over; copy them so the request ID follows
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self.blocking_pool, context.run, fn, *args)
+
+    async def close(self):
+        await self.upstream.close()
+        self.blocking_pool.shutdown(wait=False)
+
+    async def call_upstream(self, endpoint, url, params=None):
+        """self.upstream.get_json(url, params), recorded in the same metrics as UserController.call_upstream"""
+        status = "error"
+        started = time.perf_counter()
+        try:
+            data = await self.upstream.get_json(url, params=params)
+            status = "200"
+            return data
+        except httpx.HTTPStatusError as e:
+            status = str(e.response.status_code)
+            raise
+        finally:
+            self.controller.upstream_seconds.observe(time.perf_counter() - started, endpoint)
+            self.controller.upstream_responses.inc(endpoint, status)
+
+    async def fetch_upstream_json(self, endpoint, location, url, params):
+        """Async fetch_upstream_json: shares the controller's weather_cache with the sync path"""
+        cache_key = (endpoint, location)
+        data = self.controller.weather_cache.get(cache_key)
+        if data is None:
+            async def fetch():
+                fetched = await self.call_upstream(endpoint, url, params)
+                self.controller.weather_cache.set(cache_key, fetched, ttl=self.controller.weather_cache_ttls[endpoint])
+                return fetched
+            data = await self.upstream_flights.do(cache_key, fetch)
+        return data
+
+    async def get_coordinates(self, city):
+        """Async get_coordinates: memory, then the geocode_cache table, then the geocoding API"""
+        city_key = GeocodeCache.normalize(city)
+        coords = self.controller.geocode_memory.get(city_key)
+        if coords is not None:
+            return coords
+
+        stored = await self.run_blocking(self.controller.geocodes.get, city)
+        if stored["status"] == "success":
+            self.controller.geocode_memory.set(city_key, stored["data"])
+            return stored["data"]
+
+        geocoding_url, params = self.controller.geocoding_request(city)
+        try:
+            data = await self.upstream_flights.do(("geocode", city_key), lambda: self.call_upstream("geocode", geocoding_url, params))
+            if data:
+                coords = {
+                    "lat": data[0]["lat"],
+                    "lon": data[0]["lon"]
+                }
+                await self.run_blocking(self.controller.geocodes.set, city, coords["lat"], coords["lon"])
+                self.controller.geocode_memory.set(city_key, coords)
+                return coords
+            return None
+        except Exception as e:
+            logger.warning("Geocoding error: %s", e, extra={"event": "geocode.failed", "city": city})
+            return None
+
+    async def fetch_weather_payloads(self, location):
+        """Async fetch_weather_payloads: geocode + forecast and current conditions run concurrently"""
+        async def forecast_for_location():
+            if location.city is None:
+                coords = {"lat": location.lat, "lon": location.lon}
+            else:
+                coords = await self.get_coordinates(location.city)
+            if not coords:
+                raise LocationNotFound("Could not get coordinates for city")
+            return await self.fetch_upstream_json("forecast", *self.controller.forecast_request(coords))
+
+        timeout = self.controller.config["WEATHER_FETCH_TIMEOUT"]
+        try:
+            forecast, current = await asyncio.wait_for(asyncio.gather(
+                forecast_for_location(),
+                self.fetch_upstream_json("current", *self.controller.current_request(location)),
+            ), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeout(f"Timed out after {timeout}s waiting for: forecast, current")
+        return {"forecast": forecast, "current": current}
+
+    async def get_snapshot(self, location):
+        """Async get_snapshot: a rebuild (and its forecast history write) runs on blocking_pool"""
+        controller = self.controller
+        if controller.config["WEATHER_PREFETCH_ENABLED"]:
+            controller.prefetcher.track(location)
+            controller.prefetcher.start()
+
+        payloads = await self.fetch_weather_payloads(location)
+        snapshot = controller.snapshots.get(controller.location_key(location))
+        if controller.snapshot_is_current(snapshot, payloads):
+            return snapshot
+        return await self.run_blocking(controller.snapshot_for_payloads, location, payloads)
+
+    async def get_user_preference(self, user_email):
+        if not user_email:
+            return 'neutral'
+        return await self.run_blocking(self.controller.get_user_preference, user_email)
+
+    def weather_error(self, error):
+        """UserController.weather_error, also covering the async client's httpx errors"""
+        if isinstance(error, httpx.HTTPError):
+            logger.warning("API request failed: %s", error, extra={"event": "weather.upstream_failed"})
+            return "Failed to retrieve weather data", 500
+        return self.controller.weather_error(error)
+
+    async def get_weather(self):
+        controller = self.controller
+        user_preference = await self.get_user_preference(request.args.get('email'))
+
+        try:
+            location = controller.parse_location(request.args.get('city'), request.args.get('lat'), request.args.get('lon'))
+            fields = controller.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            snapshot = await self.get_snapshot(location) if controller.needs_snapshot(fields) else None
+            etag = controller.weather_etag(snapshot, user_preference, fields, location.city)
+            matched_etag = controller.matched_etag(etag, request.if_none_match)
+            if matched_etag is not None:
+                # The client already has this exact body; skip building and serializing it
+                response = Response("", status=304)
+                etag = matched_etag
+            else:
+                response = jsonify(controller.build_weather(location, user_preference, snapshot, fields))
+        except (LocationNotFound, StageTimeout, httpx.HTTPError, KeyError, TypeError) as e:
+            message, status = self.weather_error(e)
+            return jsonify({"error": message}), status
+
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.max_age = controller.weather_max_age(location) if snapshot is not None else 0
+        return response
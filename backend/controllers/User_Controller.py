@@ -1,26 +1,180 @@
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, Response, request, render_template, jsonify
 import json
+import hashlib
 import calendar
 import math
 import os
+import time
+import weakref
 import requests  # Import the requests library
-from dotenv import load_dotenv, dotenv_values
-from datetime import datetime
-import pytz
+from collections import namedtuple
 
-dotenv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..','frontend', '.env')
-load_dotenv(dotenv_path=dotenv_path)  # Load environment variables from .env file
-API_KEY = os.getenv("API_KEY") # Get the environment variable
+from models.User_Model import User
+from models.Geocode_Model import GeocodeCache
+from models.Forecast_History_Model import ForecastHistory
+from utils.ttl_cache import TTLCache
+from utils.concurrency import SingleFlight, StageTimeout, bounded_executor, fan_out
+from utils.upstream_client import UpstreamClient
+from utils.prefetch import PrefetchScheduler
+from utils.time_format import format_local_times
+from utils.compression import GZIP_ETAG_SUFFIX
+from utils.metrics import MetricsRegistry
+from utils.log import get_logger
 
+logger = get_logger("user_controller")
+
+# Sub-keys that can be selected with /weather?fields=top.sub; USER_FIELDS need no weather data
+WEATHER_FIELDS = {
+    "current_weather_data": ("city", "feelsLike", "low", "high", "conditions", "userPreference", "clothingRecommendation"),
+    "hourly_forecast_data": ("hourly_forecast_list",),
+}
+USER_FIELDS = {"current_weather_data": {"userPreference"}}
+
+DEFAULT_CITY = "New York"
+
+# A requested place: either a city name (lat/lon None) or coordinates (city None)
+Location = namedtuple("Location", ["city", "lat", "lon"])
+
+
+class LocationNotFound(Exception):
+    """Raised when a city cannot be geocoded."""
 
-from models.User_Model import User
-DB_location=f"{os.getcwd()}/backend/data/database.db"
-Users = User(DB_location, "users")
 
 class UserController:
+    def __init__(self, config):
+        """config is the mapping built by config.load_config (usually app.config)"""
+        self.config = config
+        self.users = User(config["DB_PATH"], "users", cache_size=config["USER_CACHE_MAXSIZE"],
+                          coherence_interval=config["USER_CACHE_COHERENCE_INTERVAL"])
+        # Install the maintained preference counters on databases created before they existed
+        self.users.initialize_preference_stats()
+
+        # Geocoding is two-tier: an in-memory LRU in front of the persistent geocode_cache table,
+        # which survives restarts and is shared by every worker process.
+        self.geocodes = GeocodeCache(config["DB_PATH"], "geocode_cache")
+        self.geocodes.initialize_table()
+
+        # Upstream responses are cached per (endpoint, location). Each endpoint gets its own TTL
+        # since current conditions go stale faster than the 3-hourly forecast.
+        self.weather_cache_ttls = {
+            "forecast": config["WEATHER_CACHE_TTL_FORECAST"],
+            "current": config["WEATHER_CACHE_TTL_CURRENT"],
+        }
+
+        # Every newly fetched forecast is appended to a columnar on-disk history (see Forecast_History_Model)
+        self.history = ForecastHistory(config["FORECAST_HISTORY_DIR"])
+
+        self.open_process_resources()
+        self.register_metrics()
+        # A pre-forking server (e.g. gunicorn --preload) builds the app once in the master process;
+        # threads, sockets and SQLite connections must not be shared with the forked workers.
+        controller = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: controller() is not None and controller().after_fork())
+
+    def open_process_resources(self):
+        """Creates the caches, pools, clients and threads that belong to a single process"""
+        config = self.config
+        self.geocode_memory = TTLCache(maxsize=config["GEOCODE_CACHE_MAXSIZE"], ttl=None)
+        self.weather_cache = TTLCache(maxsize=config["WEATHER_CACHE_MAXSIZE"])
+
+        # Processed, user-independent view of each location's latest payloads (see get_snapshot)
+        self.snapshots = TTLCache(maxsize=config["WEATHER_CACHE_MAXSIZE"], ttl=None)
+
+        # Every OpenWeatherMap call goes through one pooled keep-alive client with timeouts and retries.
+        self.upstream = UpstreamClient(
+            pool_maxsize=config["UPSTREAM_POOL_MAXSIZE"],
+            connect_timeout=config["UPSTREAM_CONNECT_TIMEOUT"],
+            read_timeout=config["UPSTREAM_READ_TIMEOUT"],
+            max_retries=config["UPSTREAM_MAX_RETRIES"],
+        )
+
+        # Independent upstream calls for one /weather request are issued together on this pool.
+        # WEATHER_FETCH_TIMEOUT bounds the whole fetch stage of a request, not each call.
+        self.upstream_pool = bounded_executor(config["WEATHER_FETCH_WORKERS"], "weather-upstream")
+
+        # Concurrent cache misses for the same upstream key wait on one shared fetch instead of
+        # each calling OpenWeatherMap (upstream_flights.stats() reports how many were coalesced).
+        self.upstream_flights = SingleFlight()
+
+        # POST /weather/batch runs each location on its own pool (each location then fans out on
+        # upstream_pool), so the number of locations fetched at once is capped by this pool's size.
+        self.batch_pool = bounded_executor(config["WEATHER_BATCH_CONCURRENCY"], "weather-batch")
+
+        # Background refresher that keeps recently requested cities warm in weather_cache.
+        # Its thread is started by the first /weather request, not at import time.
+        # Each location holds two weather_cache entries; the tracked set is capped at 3/4 of the
+        # cache so prefetched entries are not evicted by on-demand ones (and then re-fetched on
+        # every poll because expires_in() sees them missing).
+        max_tracked = config["WEATHER_CACHE_MAXSIZE"] * 3 // 8
+        if config["WEATHER_PREFETCH_MAX_TRACKED"] > max_tracked:
+            logger.warning("WEATHER_PREFETCH_MAX_TRACKED=%d does not fit WEATHER_CACHE_MAXSIZE=%d; using %d",
+                           config["WEATHER_PREFETCH_MAX_TRACKED"], config["WEATHER_CACHE_MAXSIZE"], max_tracked,
+                           extra={"event": "prefetch.max_tracked_clamped"})
+        elif config["WEATHER_PREFETCH_MAX_TRACKED"] > 0:
+            max_tracked = config["WEATHER_PREFETCH_MAX_TRACKED"]
+        self.prefetcher = PrefetchScheduler(
+            self.refresh_location,
+            self.location_expires_in,
+            lead_time=config["WEATHER_PREFETCH_LEAD_TIME"],
+            idle_timeout=config["WEATHER_PREFETCH_IDLE_TIMEOUT"],
+            max_workers=config["WEATHER_PREFETCH_WORKERS"],
+            max_tracked=max_tracked,
+            min_requests=config["WEATHER_PREFETCH_MIN_REQUESTS"],
+        )
+        self.prefetcher.track(Location(DEFAULT_CITY, None, None), pinned=True)
+
+    def register_metrics(self):
+        """
+        Per-process metrics served at /metrics. Cache and client counters are read from the
+        objects' own stats() at scrape time, so only the stage timers cost anything per request.
+        """
+        self.metrics = MetricsRegistry()
+        self.stage_seconds = self.metrics.histogram(
+            "weather_stage_seconds", "Time spent in each stage of a /weather request", ("stage",))
+        self.upstream_seconds = self.metrics.histogram(
+            "upstream_request_seconds", "OpenWeatherMap calls, including retries", ("endpoint",))
+        self.upstream_responses = self.metrics.counter(
+            "upstream_responses_total", "Final status of OpenWeatherMap calls", ("endpoint", "status"))
+        db_seconds = self.metrics.histogram(
+            "db_query_seconds", "User model operations", ("operation",))
+        self.users.observer = lambda operation, seconds: db_seconds.observe(seconds, operation)
+
+        def caches():
+            return {"weather": self.weather_cache.stats, "geocode": self.geocode_memory.stats,
+                    "snapshot": self.snapshots.stats, "user": self.users.cache_stats}
+        def cache_stat(stat):
+            return lambda: {(name, ): stats()[stat] for name, stats in caches().items()}
+        self.metrics.collected("cache_hits_total", "In-memory cache hits", "counter", ("cache",), cache_stat("hits"))
+        self.metrics.collected("cache_misses_total", "In-memory cache misses", "counter", ("cache",), cache_stat("misses"))
+        self.metrics.collected("cache_hit_ratio", "Hits / lookups since start", "gauge", ("cache",), cache_stat("hit_ratio"))
+        self.metrics.collected("cache_entries", "Entries currently cached", "gauge", ("cache",), cache_stat("size"))
+        self.metrics.collected("upstream_retries_total", "Retried OpenWeatherMap attempts", "counter", (),
+                               lambda: {(): self.upstream.stats()["retries"]})
+        self.metrics.collected("upstream_coalesced_total", "Cache misses that waited on another request's fetch",
+                               "counter", (), lambda: {(): self.upstream_flights.stats()["coalesced"]})
+
+    def call_upstream(self, endpoint, url, params=None):
+        """self.upstream.get_json(url, params), recording its latency and final status"""
+        status = "error"
+        started = time.perf_counter()
+        try:
+            data = self.upstream.get_json(url, params=params)
+            status = "200"
+            return data
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None:
+                status = str(e.response.status_code)
+            raise
+        finally:
+            self.upstream_seconds.observe(time.perf_counter() - started, endpoint)
+            self.upstream_responses.inc(endpoint, status)
+
+    def after_fork(self):
+        """Gives a forked worker its own connections, pools and caches instead of the parent's"""
+        self.users.forget_connections()
+        self.open_process_resources()
+
     def create_user(self):
-        print(DB_location)
-        
         data = request.get_json()
         name = data.get('name')
         email = data.get('email')
@@ -37,26 +191,73 @@ class UserController:
             "google_oauth_token": google_oauth_token
         }
 
-        print(user_info)
-
         try:
-            create_packet = Users.create(user_info)
-            print(create_packet)
+            create_packet = self.users.create(user_info)
             if create_packet["status"] == "success":
+                logger.info("User created", extra={"event": "user.created", "user_id": create_packet["data"]["id"]})
                 return jsonify({'message': 'User created successfully', 'user': create_packet["data"]}), 201
             else:
+                logger.info("User not created: %s", create_packet["data"], extra={"event": "user.create_rejected"})
                 return jsonify({'error': create_packet["data"]}), 400
         except Exception as e:
+            logger.exception("Error creating user", extra={"event": "user.create_failed"})
             return jsonify({'error': str(e)}), 500
         
-    def check_user_exists():
+    def parse_ndjson(self, stream):
+        """Lazily yield one parsed object per non-blank line of a newline-delimited JSON stream"""
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None  # rejected by User.validate_new_user like any other non-object row
+
+    def create_users_bulk(self):
+        """
+        Creates many users in one request. The body is newline-delimited JSON (one user object
+        per line) and is consumed as a stream, so a large import is never held in memory as a
+        single document. A JSON array body is also accepted for small batches.
+        """
+        if request.mimetype == 'application/json':
+            rows = request.get_json(silent=True)
+            if not isinstance(rows, list):
+                return jsonify({'error': 'Expected a JSON array of users'}), 400
+        else:
+            rows = self.parse_ndjson(request.stream)
+
+        try:
+            create_packet = self.users.create_many(rows, chunk_size=self.config["BULK_CHUNK_SIZE"])
+        except Exception as e:
+            logger.exception("Error creating users in bulk", extra={"event": "user.bulk_create_failed"})
+            return jsonify({'error': str(e)}), 500
+
+        results = []
+        created = 0
+        for index, row in enumerate(create_packet["data"]):
+            if row["status"] == "success":
+                created += 1
+                results.append({"index": index, "status": "success", "id": row["data"]["id"]})
+            else:
+                results.append({"index": index, "status": "error", "error": str(row["data"])})
+
+        logger.info("Bulk user import: %d created, %d failed", created, len(results) - created,
+                    extra={"event": "user.bulk_created"})
+        return jsonify({
+            "created": created,
+            "failed": len(results) - created,
+            "results": results
+        }), 200
+
+    def check_user_exists(self):
         data = request.get_json()
         email = data.get('email')
         
         if not email:
             return jsonify({"exists": False}), 400
             
-        result = Users.exists(email=email)
+        result = self.users.exists(email=email)
         return jsonify({"exists": result["data"]})
     
     def format_description(self,desc):
@@ -132,45 +333,162 @@ class UserController:
 
         return recommendation
     
+    def fetch_upstream_json(self, endpoint, location, url, params, force=False):
+        """
+        Return the JSON payload for url and params, served from self.weather_cache while it is fresh
+        (unless force is set). The cache key is (endpoint, location), never the request URL.
+        """
+        cache_key = (endpoint, location)
+        data = None if force else self.weather_cache.get(cache_key)
+        if data is None:
+            def fetch():
+                fetched = self.call_upstream(endpoint, url, params)
+                self.weather_cache.set(cache_key, fetched, ttl=self.weather_cache_ttls[endpoint])
+                return fetched
+            data = self.upstream_flights.do(cache_key, fetch)
+        return data
+
+    def parse_location(self, city=None, lat=None, lon=None):
+        """
+        Build a Location from request values. Coordinates win over a city name; with neither
+        the default city is used. Raises ValueError for malformed or out of range coordinates.
+        """
+        if lat is not None or lon is not None:
+            if lat is None or lon is None:
+                raise ValueError("lat and lon must be given together")
+            try:
+                lat, lon = float(lat), float(lon)
+            except (TypeError, ValueError):
+                raise ValueError("lat and lon must be numbers")
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+            # ~11m of rounding keeps nearby requests on the same cache entries
+            return Location(None, round(lat, 4), round(lon, 4))
+        if city is not None:
+            if not isinstance(city, str) or not city.strip():
+                raise ValueError("city must be a non-empty string")
+            return Location(" ".join(city.split()), None, None)
+        return Location(DEFAULT_CITY, None, None)
+
+    # Request values go in params, which the HTTP client encodes, never into the URL itself:
+    # a city such as "Paris&units=imperial" or "Paris#" must not change or cut off the query.
+    def forecast_request(self, coords):
+        """(cache location, url, params) of the 5 day / 3 hour forecast for a set of coordinates"""
+        forecast_url = f"{self.config['OWM_BASE_URL']}/data/2.5/forecast"
+        params = {"lat": coords['lat'], "lon": coords['lon'], "appid": self.config['API_KEY'], "units": "metric"}
+        return (coords['lat'], coords['lon']), forecast_url, params
+
+    def current_request(self, location):
+        """(cache location, url, params) of the current conditions (by coordinates if known, otherwise by city name)"""
+        current_url = f"{self.config['OWM_BASE_URL']}/data/2.5/weather"
+        if location.city is None:
+            params = {"lat": location.lat, "lon": location.lon, "appid": self.config['API_KEY'], "units": "metric"}  # Use metric units
+            return (location.lat, location.lon), current_url, params
+        params = {"q": location.city, "appid": self.config['API_KEY'], "units": "metric"}  # Use metric units
+        return GeocodeCache.normalize(location.city), current_url, params
+
+    def fetch_forecast(self, coords, force=False):
+        """Get the 5 day / 3 hour forecast for a set of coordinates"""
+        with self.stage_seconds.time("forecast"):
+            return self.fetch_upstream_json("forecast", *self.forecast_request(coords), force=force)
+
+    def fetch_current(self, location, force=False):
+        """Get the current conditions for a location (by coordinates if known, otherwise by city name)"""
+        with self.stage_seconds.time("current"):
+            return self.fetch_upstream_json("current", *self.current_request(location), force=force)
+
+    def location_coordinates(self, location):
+        """Coordinates for a location, geocoding the city name when needed"""
+        if location.city is None:
+            return {"lat": location.lat, "lon": location.lon}
+        with self.stage_seconds.time("geocode"):
+            return self.get_coordinates(location.city)
+
+    def fetch_weather_payloads(self, location, force=()):
+        """
+        Fetch the forecast and current payloads for a location concurrently.
+        The forecast needs coordinates, so geocoding runs in the same task as the forecast
+        while the current-weather call (which can take the city name) runs alongside it.
+        force names the endpoints ("forecast", "current") to re-fetch even if they are cached.
+        """
+        def forecast_for_location():
+            coords = self.location_coordinates(location)
+            if not coords:
+                raise LocationNotFound("Could not get coordinates for city")
+            return self.fetch_forecast(coords, force="forecast" in force)
+
+        return fan_out({
+            "forecast": forecast_for_location,
+            "current": lambda: self.fetch_current(location, force="current" in force),
+        }, self.upstream_pool, timeout=self.config["WEATHER_FETCH_TIMEOUT"])
+
+    def refresh_location(self, location):
+        """
+        Re-fetch a location's payloads into self.weather_cache ahead of expiry (called by the prefetcher).
+        Only payloads that are missing or within the lead time are fetched, so each endpoint is
+        refreshed on its own TTL rather than on the shorter of the two.
+        """
+        lead_time = self.config["WEATHER_PREFETCH_LEAD_TIME"]
+        stale = {endpoint for endpoint, remaining in self.payload_expires_in(location).items()
+                 if remaining is None or remaining <= lead_time}
+        self.fetch_weather_payloads(location, force=stale)
+
+    def payload_expires_in(self, location):
+        """Seconds until each of a location's cached payloads expires, by endpoint (None if not cached)"""
+        if location.city is None:
+            coords = {"lat": location.lat, "lon": location.lon}
+            current_key = ("current", (location.lat, location.lon))
+        else:
+            coords = self.geocode_memory.peek(GeocodeCache.normalize(location.city))
+            current_key = ("current", GeocodeCache.normalize(location.city))
+        forecast = None if coords is None else self.weather_cache.expires_in(("forecast", (coords['lat'], coords['lon'])))
+        return {"forecast": forecast, "current": self.weather_cache.expires_in(current_key)}
+
+    def location_expires_in(self, location):
+        """Seconds until the first of a location's cached payloads expires, or None if one is missing"""
+        remaining = list(self.payload_expires_in(location).values())
+        if None in remaining:
+            return None
+        return min(remaining)
+
+    def geocoding_request(self, city):
+        """(url, params) of the geocoding lookup for a city name"""
+        return f"{self.config['OWM_BASE_URL']}/geo/1.0/direct", {"q": city, "limit": 1, "appid": self.config['API_KEY']}
+
     def get_coordinates(self, city):
         """Get latitude and longitude for a city using OpenWeatherMap Geocoding API"""
-        geocoding_url = f"http://api.openweathermap.org/geo/1.0/direct?q={city}&limit=1&appid={API_KEY}"
+        city_key = GeocodeCache.normalize(city)
+        coords = self.geocode_memory.get(city_key)
+        if coords is not None:
+            return coords
+
+        stored = self.geocodes.get(city)
+        if stored["status"] == "success":
+            self.geocode_memory.set(city_key, stored["data"])
+            return stored["data"]
+
+        geocoding_url, params = self.geocoding_request(city)
         
         try:
-            response = requests.get(geocoding_url)
-            response.raise_for_status()
-            data = response.json()
+            data = self.upstream_flights.do(("geocode", city_key), lambda: self.call_upstream("geocode", geocoding_url, params))
             
             if data:
-                return {
+                coords = {
                     "lat": data[0]["lat"],
                     "lon": data[0]["lon"]
                 }
+                self.geocodes.set(city, coords["lat"], coords["lon"])
+                self.geocode_memory.set(city_key, coords)
+                return coords
             return None
         except Exception as e:
-            print(f"Geocoding error: {e}")
+            logger.warning("Geocoding error: %s", e, extra={"event": "geocode.failed", "city": city})
             return None
         
-    def convert_utc_to_est(self, utc_time_str):
-        # Convert string to datetime object
-        utc_time = datetime.strptime(utc_time_str, '%Y-%m-%d %H:%M:%S')
-        
-        # Set UTC timezone
-        utc_time = utc_time.replace(tzinfo=pytz.UTC)
-        
-        # Convert to EST
-        est_tz = pytz.timezone('America/New_York')
-        est_time = utc_time.astimezone(est_tz)
-        
-        # Get hour and minute
-        hour = int(est_time.strftime('%I'))  # Remove leading zero
-        minute = est_time.strftime('%M')
-        ampm = est_time.strftime('%p')
-        
-        # Return just hour + AM/PM if minute is 00
-        if minute == '00':
-            return f"{hour}{ampm}"
-        return f"{hour}:{minute}{ampm}"
+    def format_forecast_times(self, entries, forecast_data):
+        """Local clock times for forecast entries, from their epoch "dt" and the location's UTC offset"""
+        return format_local_times([entry['dt'] for entry in entries],
+                                  utc_offset=forecast_data.get('city', {}).get('timezone'))
     
     def convert_wind_speed(self, speed_ms):
         """Convert wind speed from m/s to mph"""
@@ -193,105 +511,339 @@ class UserController:
         else:
             return "High winds."
     
-    def get_weather(self):
-        user_email = request.args.get('email')
+    def get_user_preference(self, user_email):
         user_preference = 'neutral'  # default
 
         if user_email:
             # Get user preference from database
-            user_result = Users.get(email=user_email)
+            user_result = self.users.get(email=user_email)
             if user_result["status"] == "success":
                 user_preference = user_result["data"]["preference_temperature"]
+        return user_preference
+
+    def location_key(self, location):
+        """Hashable identity of a location, treating city names case-insensitively"""
+        if location.city is None:
+            return ("coords", location.lat, location.lon)
+        return ("city", GeocodeCache.normalize(location.city))
 
+    def build_snapshot(self, location, forecast_data, current_data):
         """
-        Fetches weather data from the OpenWeatherMap API.
-        Requires an API key.
+        Everything in the /weather payload that does not depend on the user, computed once per
+        pair of upstream payloads. Clothing recommendations are precomputed for every
+        preference profile so a request only has to pick one.
         """
-        city = "New York"  # You can make this a request parameter
+        #FOR THE DAY ------------------------
+        entries = forecast_data['list'][:8]
+        hourly_forecast = []
+        for entry, local_time in zip(entries, self.format_forecast_times(entries, forecast_data)):
+            hourly_forecast.append({
+                "time": local_time,
+                "feelsLike": round(entry['main']['feels_like']),
+                "temp": round(entry['main']['temp']),
+                "description": self.format_description(entry['weather'][0]['description'])
+            })
+
+        hourly_forecast_data = {
+            "hourly_forecast_list": hourly_forecast,
+        }
 
-        try:
-            #FOR THE DAY ------------------------
-            coords = self.get_coordinates(city)
-            if not coords:
-                return jsonify({"error": "Could not get coordinates for city"}), 500
-
-            forecast_url = f"http://api.openweathermap.org/data/2.5/forecast?lat={coords['lat']}&lon={coords['lon']}&appid={API_KEY}&units=metric"
-            forecast_response = requests.get(forecast_url)
-            forecast_response.raise_for_status()
-            forecast_data = forecast_response.json()
-
-            hourly_forecast = []
-            for entry in forecast_data['list'][:8]:
-                hourly_forecast.append({
-                    "time": self.convert_utc_to_est(entry['dt_txt']),
-                    "feelsLike": round(entry['main']['feels_like']),
-                    "temp": round(entry['main']['temp']),
-                    "description": self.format_description(entry['weather'][0]['description'])
-                })
-
-            hourly_forecast_data = {
-                "hourly_forecast_list": hourly_forecast,
-            }
+        will_rain = self.check_future_rain(forecast_data)
+
+        # CURRENT  ------------------------
+        wind_speed_mph = self.convert_wind_speed(current_data["wind"]["speed"])
+
+        recommendations = {
+            preference: self.get_clothing_recommendation(
+                current_data["main"]["feels_like"],
+                current_data["weather"][0]["description"],
+                preference,
+                will_rain
+            )
+            for preference in self.users.preferences
+        }
 
-            will_rain = self.check_future_rain(forecast_data)
+        # Extract relevant weather information. Snapshots are shared by every spelling of a city,
+        # so "city" is the upstream name here; build_weather puts the requested spelling back.
+        current_weather_base = {
+            "city": current_data.get("name", ""),
+            "feelsLike": round(current_data["main"]["feels_like"]),
+            "low": round(current_data["main"]["temp_min"]),
+            "high": round(current_data["main"]["temp_max"]),
+            "conditions": {
+                "windSpeed": wind_speed_mph,
+                "windDescription": self.get_wind_description(wind_speed_mph),
+                "humidity": current_data["main"]["humidity"],
+                "description": self.format_description(current_data["weather"][0]["description"]),
+                "uvIndex": "N/A",  # Not directly available in this API endpoint
+                "airQuality": "N/A",  # Not directly available in this API endpoint
+                "pollenCount": "N/A",  # Not directly available in this API endpoint
+            },
+        }
 
-            # CURRENT  ------------------------
-            current_url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={API_KEY}&units=metric"  # Use metric units
-            current_response = requests.get(current_url)
-            current_response.raise_for_status()  # Raise an exception for bad status codes
-            current_data = current_response.json()
+        # Content hash of the upstream payloads: identical in every worker for the same data
+        version = hashlib.blake2b(json.dumps([forecast_data, current_data], sort_keys=True).encode(),
+                                  digest_size=8).hexdigest()
+
+        return {
+            "version": version,
+            "forecast": forecast_data,
+            "current": current_data,
+            "will_rain": will_rain,
+            "current_weather_base": current_weather_base,
+            "hourly_forecast_data": hourly_forecast_data,
+            "recommendations": recommendations,
+        }
 
-            wind_speed_mph = self.convert_wind_speed(current_data["wind"]["speed"])
+    def get_snapshot(self, location):
+        """
+        Current snapshot for a location. It is rebuilt only when self.weather_cache hands back
+        different payload objects, i.e. after a fetch or prefetch replaced them.
+        """
+        if self.config["WEATHER_PREFETCH_ENABLED"]:
+            self.prefetcher.track(location)
+            self.prefetcher.start()
+
+        return self.snapshot_for_payloads(location, self.fetch_weather_payloads(location))
+
+    def snapshot_is_current(self, snapshot, payloads):
+        """True if snapshot was built from exactly these payload objects"""
+        return (snapshot is not None and snapshot["forecast"] is payloads["forecast"]
+                and snapshot["current"] is payloads["current"])
+
+    def snapshot_for_payloads(self, location, payloads):
+        """The cached snapshot for location if it is current for payloads, otherwise a rebuilt one"""
+        key = self.location_key(location)
+        snapshot = self.snapshots.get(key)
+        if not self.snapshot_is_current(snapshot, payloads):
+            if self.config["FORECAST_HISTORY_ENABLED"] and (snapshot is None or snapshot["forecast"] is not payloads["forecast"]):
+                self.record_forecast_history(key, payloads["forecast"])
+            with self.stage_seconds.time("snapshot"):
+                snapshot = self.build_snapshot(location, payloads["forecast"], payloads["current"])
+            self.snapshots.set(key, snapshot)
+        return snapshot
+
+    def record_forecast_history(self, key, forecast_data):
+        """Appends a newly fetched forecast to self.history. A failed write never fails the request."""
+        try:
+            self.history.append(key, forecast_data)
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            logger.warning("Forecast history error: %s", e, extra={"event": "forecast_history.failed"})
 
-            clothing_recommendation = self.get_clothing_recommendation(
+    def parse_fields(self, raw_fields):
+        """
+        Parses a fields= projection such as "current_weather_data.userPreference,hourly_forecast_data"
+        into {top-level key: tuple of sub-keys, or None for the whole subtree}. Returns None when
+        no projection was requested. Raises ValueError on unknown fields.
+        """
+        if raw_fields is None or not raw_fields.strip():
+            return None
+        fields = {}
+        for path in raw_fields.split(","):
+            top, _, sub = path.strip().partition(".")
+            if top not in WEATHER_FIELDS or (sub and sub not in WEATHER_FIELDS[top]):
+                raise ValueError(f"Unknown field '{path.strip()}'")
+            if not sub:
+                fields[top] = None
+            elif top not in fields or fields[top] is not None:
+                fields[top] = tuple(sorted(set(fields.get(top) or ()) | {sub}))
+        return fields
+
+    def needs_snapshot(self, fields):
+        """False when every requested field comes from the user alone, so no weather has to be fetched"""
+        if fields is None:
+            return True
+        return any(subkeys is None or not set(subkeys) <= USER_FIELDS.get(top, set())
+                   for top, subkeys in fields.items())
+
+    def clothing_recommendation(self, snapshot, user_preference):
+        recommendation = snapshot["recommendations"].get(user_preference)
+        if recommendation is None:
+            # Preferences outside the known profiles (e.g. NULL) are still handled like before
+            current_data = snapshot["current"]
+            recommendation = self.get_clothing_recommendation(
                 current_data["main"]["feels_like"],
                 current_data["weather"][0]["description"],
                 user_preference,
-                will_rain
+                snapshot["will_rain"]
             )
+        return recommendation
 
-            # Extract relevant weather information
-            current_weather_data = {
-                "city": city,
-                "feelsLike": round(current_data["main"]["feels_like"]),
-                "low": round(current_data["main"]["temp_min"]),
-                "high": round(current_data["main"]["temp_max"]),
-                "userPreference": user_preference,
-                "clothingRecommendation": clothing_recommendation,
-                "conditions": {
-                    "windSpeed": wind_speed_mph,
-                    "windDescription": self.get_wind_description(wind_speed_mph),
-                    "humidity": current_data["main"]["humidity"],
-                    "description": self.format_description(current_data["weather"][0]["description"]),
-                    "uvIndex": "N/A",  # Not directly available in this API endpoint
-                    "airQuality": "N/A",  # Not directly available in this API endpoint
-                    "pollenCount": "N/A",  # Not directly available in this API endpoint
-                },
-            }
+    def displayed_city(self, location, snapshot):
+        """The city name a response shows: as the client spelled it, or the upstream name for coordinates"""
+        return location.city if location.city is not None else snapshot["current_weather_base"]["city"]
+
+    def build_weather(self, location, user_preference, snapshot=None, fields=None):
+        """
+        Fetches weather data from the OpenWeatherMap API and builds the /weather payload.
+        Requires an API key. Raises on upstream or parsing failures (see weather_error).
+        With a fields projection (see parse_fields) only the requested subtrees are built,
+        and the upstream fetch is skipped entirely when they do not need weather data.
+        """
+        if snapshot is None and self.needs_snapshot(fields):
+            snapshot = self.get_snapshot(location)
+
+        if fields is None:
+            current_weather_data = dict(snapshot["current_weather_base"])
+            current_weather_data["city"] = self.displayed_city(location, snapshot)
+            current_weather_data["userPreference"] = user_preference
+            current_weather_data["clothingRecommendation"] = self.clothing_recommendation(snapshot, user_preference)
 
             combined_data={
                 "current_weather_data": current_weather_data,
-                "hourly_forecast_data": hourly_forecast_data
+                "hourly_forecast_data": snapshot["hourly_forecast_data"]
             }
+            return combined_data
+
+        combined_data = {}
+        for top, subkeys in fields.items():
+            combined_data[top] = {}
+            for key in WEATHER_FIELDS[top] if subkeys is None else subkeys:
+                if key == "userPreference":
+                    combined_data[top][key] = user_preference
+                elif key == "clothingRecommendation":
+                    combined_data[top][key] = self.clothing_recommendation(snapshot, user_preference)
+                elif key == "city":
+                    combined_data[top][key] = self.displayed_city(location, snapshot)
+                elif top == "current_weather_data":
+                    combined_data[top][key] = snapshot["current_weather_base"][key]
+                else:
+                    combined_data[top][key] = snapshot[top][key]
+        return combined_data
+
+    def weather_error(self, error):
+        """Map an exception raised by build_weather to an (error message, status code) pair"""
+        if isinstance(error, LocationNotFound):
+            return str(error), 500
+        if isinstance(error, StageTimeout):
+            logger.warning("API request timed out: %s", error, extra={"event": "weather.timeout"})
+            return "Timed out retrieving weather data", 504
+        if isinstance(error, requests.exceptions.RequestException):
+            logger.warning("API request failed: %s", error, extra={"event": "weather.upstream_failed"})
+            return "Failed to retrieve weather data", 500
+        if isinstance(error, (KeyError, TypeError)):
+            logger.warning("Error parsing weather data: %r", error, extra={"event": "weather.parse_failed"})
+            return "Error processing weather data", 500
+        raise error
 
-            return jsonify(combined_data), 200
+    def get_weather(self):
+        with self.stage_seconds.time("user_lookup"):
+            user_preference = self.get_user_preference(request.args.get('email'))
 
-        except requests.exceptions.RequestException as e:
-            print(f"API request failed: {e}")
-            return jsonify({"error": "Failed to retrieve weather data"}), 500
-        except (KeyError, TypeError) as e:
-            print(f"Error parsing weather data: {e}")
-            return jsonify({"error": "Error processing weather data"}), 500
+        try:
+            location = self.parse_location(request.args.get('city'), request.args.get('lat'), request.args.get('lon'))
+            fields = self.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            snapshot = self.get_snapshot(location) if self.needs_snapshot(fields) else None
+            etag = self.weather_etag(snapshot, user_preference, fields, location.city)
+            matched_etag = self.matched_etag(etag, request.if_none_match)
+            if matched_etag is not None:
+                # The client already has this exact body; skip building and serializing it
+                response = Response(status=304)
+                etag = matched_etag
+            else:
+                with self.stage_seconds.time("serialize"):
+                    response = jsonify(self.build_weather(location, user_preference, snapshot, fields))
+        except (LocationNotFound, StageTimeout, requests.exceptions.RequestException, KeyError, TypeError) as e:
+            message, status = self.weather_error(e)
+            return jsonify({"error": message}), status
+
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.max_age = self.weather_max_age(location) if snapshot is not None else 0
+        return response
+
+    def weather_etag(self, snapshot, user_preference, fields=None, city=None):
+        """
+        Strong validator for a /weather body. The body is fully determined by the snapshot's
+        payloads, the user's preference, the projection and the city as spelled in the request,
+        so together they identify it byte for byte.
+        """
+        variant = str(user_preference)
+        if city is not None:
+            variant += "|city=" + city
+        if fields is not None:
+            variant += "|" + ",".join(f"{top}.{'.'.join(subkeys or ('*',))}" for top, subkeys in sorted(fields.items()))
+        version = snapshot["version"] if snapshot is not None else "user"
+        return f"{version}-{hashlib.blake2b(variant.encode(), digest_size=4).hexdigest()}"
+
+    def matched_etag(self, etag, if_none_match):
+        """The representation of etag named in If-None-Match (identity or gzip-encoded), or None"""
+        for candidate in (etag, etag + GZIP_ETAG_SUFFIX):
+            if if_none_match.contains_weak(candidate):
+                return candidate
+        return None
+
+    def weather_max_age(self, location):
+        """Seconds a client may reuse a /weather body: until the first cached payload it was built from expires"""
+        remaining = self.location_expires_in(location)
+        if remaining is None or remaining == float("inf"):
+            return 0
+        return int(remaining)
+
+    def get_weather_batch(self):
+        """
+        Weather for many locations in one request. The JSON body is
+        {"locations": ["Boston", {"city": "Paris"}, {"lat": 40.7, "lon": -74.0}], "email": optional}.
+        Duplicate locations are fetched once; results come back in first-seen order, each with
+        its own status so one failing city does not fail the batch.
+        """
+        data = request.get_json(silent=True)
+        raw_locations = data.get('locations') if isinstance(data, dict) else None
+        if not isinstance(raw_locations, list) or not raw_locations:
+            return jsonify({"error": "Expected a non-empty list of locations"}), 400
+
+        locations = []
+        seen = set()
+        for raw in raw_locations:
+            try:
+                if isinstance(raw, str):
+                    location = self.parse_location(city=raw)
+                elif isinstance(raw, dict):
+                    location = self.parse_location(raw.get('city'), raw.get('lat'), raw.get('lon'))
+                else:
+                    raise ValueError("each location must be a city name or an object with city or lat/lon")
+            except ValueError as e:
+                return jsonify({"error": f"Invalid location {raw!r}: {e}"}), 400
+            key = self.location_key(location)
+            if key not in seen:
+                seen.add(key)
+                locations.append(location)
+
+        if len(locations) > self.config["WEATHER_BATCH_MAX_LOCATIONS"]:
+            return jsonify({"error": f"At most {self.config['WEATHER_BATCH_MAX_LOCATIONS']} distinct locations per batch"}), 400
+
+        user_preference = self.get_user_preference(data.get('email'))
+        outcomes = fan_out({
+            index: (lambda location=location: self.build_weather(location, user_preference))
+            for index, location in enumerate(locations)
+        }, self.batch_pool, timeout=self.config["WEATHER_BATCH_TIMEOUT"], return_exceptions=True)
+
+        results = []
+        for index, location in enumerate(locations):
+            outcome = outcomes[index]
+            requested = {"city": location.city} if location.city is not None else {"lat": location.lat, "lon": location.lon}
+            if isinstance(outcome, Exception):
+                message, status = self.weather_error(outcome)
+                results.append({"location": requested, "status": status, "error": message})
+            else:
+                results.append({"location": requested, "status": 200, "data": outcome})
+
+        return jsonify({"results": results}), 200
 
     def remove_user(self, email):
         try:
-            result = Users.remove(email=email)
-            print("TRYING TO REMOVE")
+            result = self.users.remove(email=email)
             if result["status"] == "success":
+                logger.info("User removed", extra={"event": "user.removed"})
                 return jsonify({"message": "User removed successfully"}), 200
             else:
                 return jsonify({"error": result["data"]}), 400
         except Exception as e:
+            logger.exception("Error removing user", extra={"event": "user.remove_failed"})
             return jsonify({"error": str(e)}), 500
         
     def update_preference(self):
@@ -300,17 +852,17 @@ class UserController:
             email = data.get('email')
             new_preference = data.get('preference')
 
-            print(new_preference)
-            
             if not email or not new_preference:
                 return jsonify({"error": "Missing email or preference"}), 400
                 
-            result = Users.update_preference(email, new_preference)
+            result = self.users.update_preference(email, new_preference)
             
             if result["status"] == "success":
+                logger.info("Preference updated", extra={"event": "user.preference_updated", "preference": new_preference})
                 return jsonify({"message": "Preference updated successfully"}), 200
             else:
                 return jsonify({"error": result["data"]}), 400
                 
         except Exception as e:
+            logger.exception("Error updating preference", extra={"event": "user.preference_update_failed"})
             return jsonify({"error": str(e)}), 500
\ No newline at end of file
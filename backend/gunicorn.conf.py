@@ -0,0 +1,19 @@
+# gunicorn.conf.py -- run from anywhere with: gunicorn -c backend/gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# /weather is mostly waiting on upstream I/O, so each worker process also runs a few threads
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+# The app (and its config) is built once in the master; UserController re-creates its pools,
+# caches and connections in each worker after the fork (see UserController.after_fork).
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
@@ -4,8 +4,12 @@ import calendar
 import math
 import os
 
+from config import load_config
 from models.User_Model import User
-DB_location=f"{os.getcwd()}/backend/data/database.db"
+from models.Geocode_Model import GeocodeCache
+DB_location=load_config()["DB_PATH"]
 Users = User(DB_location, "users")
+Geocodes = GeocodeCache(DB_location, "geocode_cache")
 
-Users.initialize_table()
\ No newline at end of file
+Users.initialize_table()
+Geocodes.initialize_table()
\ No newline at end of file
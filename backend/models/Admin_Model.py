@@ -1,4 +1,5 @@
 # models/Admin_Model.py
+import logging
 import sqlite3
 import os
 from typing import Optional, List, Dict, Any, Tuple
@@ -8,6 +9,8 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_DIR = os.path.join(PROJECT_ROOT, 'data')
 DB_PATH = os.path.join(DB_DIR, 'database.db')
 
+logger = logging.getLogger("backend.admin_model")
+
 # Ensure the data directory exists
 os.makedirs(DB_DIR, exist_ok=True)
 
@@ -229,6 +232,11 @@ class Admin:
         Calculates and returns statistics on user temperature preferences.
         This method demonstrates an admin-specific function.
 
+        The counts are read from the users_preference_stats table, which triggers on the
+        users table keep current (see User.initialize_preference_stats), so the cost does
+        not grow with the number of users. Databases created before that table existed
+        fall back to counting the users table.
+
         Returns:
             A dictionary where keys are temperature preference categories
             ('neutral', 'gets_cold_easily', 'gets_hot_easily') and values are the
@@ -239,7 +247,12 @@ class Admin:
         try:
             conn = sqlite3.connect(DB_PATH)
             cursor = conn.cursor()
-            cursor.execute("SELECT preference_temperature, COUNT(*) FROM users GROUP BY preference_temperature")
+            try:
+                cursor.execute("SELECT preference_temperature, user_count FROM users_preference_stats")
+            except sqlite3.OperationalError as e:
+                logger.warning("Preference stats table unavailable (%s); counting the users table instead", e,
+                               extra={"event": "admin.preference_stats_fallback"})
+                cursor.execute("SELECT preference_temperature, COUNT(*) FROM users GROUP BY preference_temperature")
             rows = cursor.fetchall()
             for row in rows:
                 if row[0] in stats:
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, and no pre-forking server sharing the directory either
+    fcntl = None
+
+# One fixed-width record per forecast entry: 32 bytes, no per-row JSON
+HISTORY_DTYPE = np.dtype([
+    ("dt", "<i8"),          # forecast timestamp (UTC epoch seconds)
+    ("fetched_at", "<i8"),  # when the forecast containing this entry was fetched
+    ("temp", "<f4"),
+    ("feels_like", "<f4"),
+    ("humidity", "<f4"),
+    ("wind_speed", "<f4"),
+])
+
+class ForecastHistory:
+    '''Append-only store of forecast entries, one directory of fixed-size segments per location.
+
+       Each segment is a flat little-endian array of HISTORY_DTYPE records, so it can be
+       memory-mapped and queried with NumPy directly. Writes only ever append whole records;
+       a torn trailing record from a crash is ignored on read.
+
+       Several worker processes may append to the same location: each append holds an
+       exclusive flock on the location's .lock file, so the torn-record check, the rollover
+       decision and the write happen as one step across processes.
+    '''
+    def __init__(self, data_dir, segment_rows=65536):
+        self.data_dir = data_dir
+        self.segment_rows = segment_rows
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def location_slug(location):
+        '''Filesystem-safe directory name for a location key such as ("city", "new york").
+
+           The readable prefix drops anything outside [a-z0-9.-] (so "東京" and "北京" read the
+           same), and the hash of the full key keeps every location in its own directory.
+        '''
+        text = "-".join(str(part) for part in location) if isinstance(location, tuple) else str(location)
+        readable = re.sub(r"[^a-z0-9.\-]+", "_", text.lower()).strip("_")
+        digest = hashlib.blake2b(repr(location).encode(), digest_size=6).hexdigest()
+        return f"{readable}-{digest}"
+
+    def _location_dir(self, location):
+        return os.path.join(self.data_dir, self.location_slug(location))
+
+    @contextmanager
+    def _locked(self, location_dir):
+        '''Holds this process's lock and an exclusive flock shared with every other writer process'''
+        with self._lock:
+            os.makedirs(location_dir, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(location_dir, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _segments(self, location_dir):
+        if not os.path.isdir(location_dir):
+            return []
+        return sorted(os.path.join(location_dir, name) for name in os.listdir(location_dir)
+                      if name.startswith("seg-") and name.endswith(".bin"))
+
+    def to_records(self, forecast_data, fetched_at):
+        '''Converts an OpenWeatherMap /forecast payload into a HISTORY_DTYPE array'''
+        entries = forecast_data["list"]
+        records = np.empty(len(entries), dtype=HISTORY_DTYPE)
+        records["dt"] = [entry["dt"] for entry in entries]
+        records["fetched_at"] = fetched_at
+        records["temp"] = [entry["main"]["temp"] for entry in entries]
+        records["feels_like"] = [entry["main"]["feels_like"] for entry in entries]
+        records["humidity"] = [entry["main"].get("humidity", np.nan) for entry in entries]
+        records["wind_speed"] = [entry.get("wind", {}).get("speed", np.nan) for entry in entries]
+        return records
+
+    def append(self, location, forecast_data, fetched_at=None):
+        '''Appends every entry of a forecast payload. Returns the number of records written.'''
+        records = self.to_records(forecast_data, int(time.time() if fetched_at is None else fetched_at))
+        location_dir = self._location_dir(location)
+        with self._locked(location_dir):
+            segments = self._segments(location_dir)
+            if segments and os.path.getsize(segments[-1]) % HISTORY_DTYPE.itemsize:
+                # drop a torn record left by an interrupted write so new records stay aligned
+                with open(segments[-1], "r+b") as segment:
+                    segment.truncate(os.path.getsize(segments[-1]) // HISTORY_DTYPE.itemsize * HISTORY_DTYPE.itemsize)
+            written = 0
+            while written < len(records):
+                path = segments[-1] if segments else None
+                used_rows = os.path.getsize(path) // HISTORY_DTYPE.itemsize if path else 0
+                if path is None or used_rows >= self.segment_rows:
+                    path = os.path.join(location_dir, f"seg-{len(segments):06d}.bin")
+                    segments.append(path)
+                    used_rows = 0
+                chunk = records[written:written + self.segment_rows - used_rows]
+                with open(path, "ab") as segment:
+                    segment.write(chunk.tobytes())
+                written += len(chunk)
+        return written
+
+    def read(self, location):
+        '''All records for a location as a list of read-only memory-mapped segment arrays'''
+        arrays = []
+        for path in self._segments(self._location_dir(location)):
+            rows = os.path.getsize(path) // HISTORY_DTYPE.itemsize
+            if rows:
+                arrays.append(np.memmap(path, dtype=HISTORY_DTYPE, mode="r", shape=(rows,)))
+        return arrays
+
+    def query(self, location, start=None, end=None, latest_only=True):
+        '''Entries with start <= dt < end for a location, as a dict of column name -> NumPy array.
+
+           With latest_only, a timestamp that appeared in several fetched forecasts is reported
+           once, from the most recent fetch. Results are sorted by dt.
+        '''
+        selected = []
+        for segment in self.read(location):
+            mask = np.ones(len(segment), dtype=bool)
+            if start is not None:
+                mask &= segment["dt"] >= start
+            if end is not None:
+                mask &= segment["dt"] < end
+            if mask.any():
+                selected.append(segment[mask])
+
+        records = np.concatenate(selected) if selected else np.empty(0, dtype=HISTORY_DTYPE)
+        order = np.lexsort((records["fetched_at"], records["dt"]))
+        records = records[order]
+        if latest_only and len(records):
+            last_of_each_dt = np.append(records["dt"][1:] != records["dt"][:-1], True)
+            records = records[last_of_each_dt]
+        return {name: np.ascontiguousarray(records[name]) for name in HISTORY_DTYPE.names}
+
+    def locations(self):
+        '''Directory names of every location with stored history'''
+        if not os.path.isdir(self.data_dir):
+            return []
+        return sorted(name for name in os.listdir(self.data_dir)
+                      if os.path.isdir(os.path.join(self.data_dir, name)))
@@ -0,0 +1,93 @@
+import sqlite3
+import logging
+import time
+
+logger = logging.getLogger("backend.geocode_model")
+
+class GeocodeCache:
+    '''Persistent city -> coordinates lookup table shared by every worker process.
+
+       Geocoding answers essentially never change, so rows are kept until they are
+       explicitly removed rather than expiring.
+    '''
+    def __init__(self, db_name, table_name="geocode_cache"):
+        self.db_name = db_name
+        self.table_name = table_name
+
+    @staticmethod
+    def normalize(city):
+        '''Case and whitespace insensitive key so "new  York" and "New York" share a row'''
+        return " ".join(city.split()).lower()
+
+    def initialize_table(self):
+        db_connection = None
+        try:
+            db_connection = sqlite3.connect(self.db_name)
+            cursor = db_connection.cursor()
+            cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {self.table_name} (
+                        city_key TEXT PRIMARY KEY,
+                        lat REAL NOT NULL,
+                        lon REAL NOT NULL,
+                        updated_at INTEGER NOT NULL
+                    )
+                    """)
+            db_connection.commit()
+        except sqlite3.Error as e:
+            logger.error("Database error during geocode table initialization: %s", e, extra={"event": "db.init_failed", "table": self.table_name})
+            raise
+        finally:
+            if db_connection:
+                db_connection.close()
+
+    def get(self, city):
+        db_connection = None
+        try:
+            db_connection = sqlite3.connect(self.db_name)
+            cursor = db_connection.cursor()
+            row = cursor.execute(f"SELECT lat, lon FROM {self.table_name} WHERE city_key = ?;",
+                                 (self.normalize(city),)).fetchone()
+            if row:
+                return {"status": "success",
+                        "data": {"lat": row[0], "lon": row[1]}}
+            return {"status": "error",
+                    "data": "Location not cached!"}
+        except sqlite3.Error as error:
+            return {"status": "error",
+                    "data": error}
+        finally:
+            if db_connection:
+                db_connection.close()
+
+    def set(self, city, lat, lon):
+        db_connection = None
+        try:
+            db_connection = sqlite3.connect(self.db_name)
+            cursor = db_connection.cursor()
+            cursor.execute(f"INSERT OR REPLACE INTO {self.table_name} VALUES (?, ?, ?, ?);",
+                           (self.normalize(city), lat, lon, int(time.time())))
+            db_connection.commit()
+            return {"status": "success",
+                    "data": {"lat": lat, "lon": lon}}
+        except sqlite3.Error as error:
+            return {"status": "error",
+                    "data": error}
+        finally:
+            if db_connection:
+                db_connection.close()
+
+    def remove(self, city):
+        db_connection = None
+        try:
+            db_connection = sqlite3.connect(self.db_name)
+            cursor = db_connection.cursor()
+            cursor.execute(f"DELETE FROM {self.table_name} WHERE city_key = ?;", (self.normalize(city),))
+            db_connection.commit()
+            return {"status": "success",
+                    "data": cursor.rowcount > 0}
+        except sqlite3.Error as error:
+            return {"status": "error",
+                    "data": error}
+        finally:
+            if db_connection:
+                db_connection.close()
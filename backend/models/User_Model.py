@@ -1,17 +1,235 @@
 #Stephanie Wang
 import sqlite3
+import logging
 import random
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import wraps
+
+logger = logging.getLogger("backend.user_model")
+
+# Connections a forked child inherited from its parent. They must be neither used nor closed in
+# the child (closing one could checkpoint or remove the parent's WAL), so they are kept referenced here.
+_inherited_connections = []
+
+def _close_connection(db_connection, owner_pid):
+    if os.getpid() == owner_pid:
+        db_connection.close()
+    else:
+        _inherited_connections.append(db_connection)
+
+class _ThreadConnection:
+    '''One thread's connection. Only the thread's threading.local holds it strongly, so when the
+       thread exits it is collected and the finalizer closes the connection.
+    '''
+    __slots__ = ("connection", "generation", "__weakref__")
+
+    def __init__(self, db_connection, generation):
+        self.connection = db_connection
+        self.generation = generation
+        weakref.finalize(self, _close_connection, db_connection, os.getpid())
+
+def observed(operation):
+    '''Reports how long each call took to the model's observer, if one is set'''
+    def decorate(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.observer is None:
+                return method(self, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.observer(operation, time.perf_counter() - started)
+        return wrapper
+    return decorate
 
 class User:
-    def __init__(self, db_name, table_name):
+    def __init__(self, db_name, table_name, cache_size=1024, coherence_interval=0):
         self.db_name =  db_name
         self.max_safe_id = 9007199254740991 #maximun safe Javascript integer
         self.table_name = table_name #"users"
+        self.max_id_attempts = 10 #collisions are ~n/2^53 likely, so one retry is already rare
+        self.preferences = ('neutral', 'gets_cold_easily', 'gets_hot_easily')
+        self.stats_table_name = f"{table_name}_preference_stats" #user count per preference, kept by triggers
+        self.observer = None #optional callable(operation, seconds), e.g. to record query latency
+
+        # Each thread keeps one persistent connection instead of connecting per call; it is closed
+        # when the thread exits, so short-lived request threads do not pile up connections
+        self._local = threading.local()
+        self._pool_lock = threading.Lock()
+        self._holders = weakref.WeakSet() #live _ThreadConnections of the current generation
+        self._generation = 0
+        self.connections_opened = 0
+        self.checkouts = 0
+
+        # LRU of user rows in front of get() and exists(), keyed by ("email", email) and ("id", id).
+        # Writes made here invalidate their rows; writes by any other connection (another worker
+        # process, a script) are noticed through PRAGMA data_version and clear the whole cache.
+        self.cache_size = cache_size
+        self.coherence_interval = coherence_interval #seconds between data_version checks; 0 checks on every read
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0 #bumped by every invalidation, so a read that raced a write is not cached
+        self._watch_connection = None
+        self._data_version = None
+        self._checked_at = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _get_connection(self):
+        '''Returns the calling thread's persistent connection, opening it on first use.
+
+           Connections run in WAL mode so readers never block the writer (and vice versa).
+        '''
+        holder = getattr(self._local, "holder", None)
+        if holder is None or holder.generation != self._generation:
+            db_connection = sqlite3.connect(self.db_name, check_same_thread=False)
+            db_connection.execute("PRAGMA journal_mode=WAL;")
+            db_connection.execute("PRAGMA synchronous=NORMAL;")
+            db_connection.execute("PRAGMA busy_timeout=5000;")
+            with self._pool_lock:
+                holder = _ThreadConnection(db_connection, self._generation)
+                self._holders.add(holder)
+                self.connections_opened += 1
+            self._local.holder = holder
+        with self._pool_lock:
+            self.checkouts += 1
+        return holder.connection
+
+    def _rollback(self):
+        '''Ends a failed write so the persistent connection is not left holding a transaction'''
+        holder = getattr(self._local, "holder", None)
+        if holder is not None and holder.connection.in_transaction:
+            holder.connection.rollback()
+
+    def pool_stats(self):
+        '''Utility function which reports how the per-thread connections are being used'''
+        with self._pool_lock:
+            return {"open_connections": len(self._holders),
+                    "connections_opened": self.connections_opened,
+                    "checkouts": self.checkouts}
+
+    def forget_connections(self):
+        '''Drops every pooled connection without closing it. Used in a forked child process, where
+           connections opened by the parent must be neither used nor closed; threads reconnect.
+        '''
+        self._pool_lock = threading.Lock()  # the parent's lock may have been held mid-fork
+        self._holders = weakref.WeakSet()  # their finalizers see a different pid and keep them unclosed
+        self._generation += 1
+        self._cache_lock = threading.Lock()
+        if self._watch_connection is not None:
+            _inherited_connections.append(self._watch_connection)
+        self._watch_connection = None
+        self._clear_cache()
+
+    def close(self):
+        '''Closes every pooled connection. Threads transparently reconnect on their next call.'''
+        with self._pool_lock:
+            holders = list(self._holders)
+            self._holders = weakref.WeakSet()
+            self._generation += 1
+        for holder in holders:
+            holder.connection.close()
+        with self._cache_lock:
+            watch_connection, self._watch_connection = self._watch_connection, None
+            self._clear_cache()
+        if watch_connection is not None:
+            watch_connection.close()
+
+    def _clear_cache(self):
+        self._cache.clear()
+        self._cache_generation += 1
+        self._data_version = None
+
+    def _check_coherence(self):
+        '''Clears the cache if another connection has committed since the last check (caller holds _cache_lock)
+
+           data_version only changes for commits made through *other* connections, so a dedicated
+           connection that never writes sees every commit, including this process's own.
+        '''
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.coherence_interval:
+            return
+        if self._watch_connection is None:
+            self._watch_connection = sqlite3.connect(self.db_name, check_same_thread=False)
+        data_version = self._watch_connection.execute("PRAGMA data_version;").fetchone()[0]
+        if data_version != self._data_version:
+            self._clear_cache()
+            self._data_version = data_version
+        self._checked_at = now
+
+    def _cached(self, key):
+        '''(user dict or None, generation to pass to _cache_user)'''
+        with self._cache_lock:
+            self._check_coherence()
+            user = self._cache.get(key)
+            if user is None:
+                self.cache_misses += 1
+            else:
+                self.cache_hits += 1
+                self._cache.move_to_end(key)
+            return user, self._cache_generation
+
+    def _cache_user(self, user, generation):
+        '''Caches a row read from the database, unless an invalidation happened since generation'''
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                return
+            for key in (("email", user["email"]), ("id", user["id"])):
+                self._cache[key] = user
+                self._cache.move_to_end(key)
+            while len(self._cache) > 2 * self.cache_size:
+                key, evicted = self._cache.popitem(last=False)
+                #a row leaves under both of its keys, so _invalidate by either key always finds it
+                self._cache.pop(("email", evicted["email"]), None)
+                self._cache.pop(("id", evicted["id"]), None)
+
+    def _invalidate(self, *users):
+        '''Drops the cached rows of users (dicts with email and/or id) after a write'''
+        with self._cache_lock:
+            for user in users:
+                for column in ("email", "id"):
+                    cached = self._cache.pop((column, user.get(column)), None)
+                    if cached is not None:
+                        self._cache.pop(("email", cached["email"]), None)
+                        self._cache.pop(("id", cached["id"]), None)
+            self._cache_generation += 1
+
+    def _lookup(self, column, value):
+        '''The user row whose column equals value as a dict (the cached one when possible), or None.
+           Callers get the shared cached dict and must copy it before handing it out.
+        '''
+        if self.cache_size <= 0:
+            return self._select(column, value)
+        user, generation = self._cached((column, value))
+        if user is None:
+            user = self._select(column, value)
+            if user is not None:
+                self._cache_user(user, generation)
+        return user
+
+    def _select(self, column, value):
+        cursor = self._get_connection().cursor()
+        row = cursor.execute(f'''SELECT * FROM {self.table_name} WHERE {column} = ?;''', (value,)).fetchone()
+        return self.to_dict(row) if row is not None else None
+
+    def cache_stats(self):
+        '''Utility function which reports the user cache counters, in the shape of TTLCache.stats()'''
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {"size": len(self._cache) // 2,
+                    "maxsize": self.cache_size,
+                    "hits": self.cache_hits,
+                    "misses": self.cache_misses,
+                    "hit_ratio": (self.cache_hits / lookups) if lookups else 0.0}
     
     def initialize_table(self):
         try:
-            db_connection = sqlite3.connect(self.db_name)
+            db_connection = self._get_connection()
             cursor = db_connection.cursor()
             schema=f"""
                     CREATE TABLE {self.table_name} (
@@ -26,109 +244,277 @@ class User:
             results=cursor.execute(schema)
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_email ON users (email)")
             db_connection.commit()
+            with self._cache_lock:
+                self._clear_cache()
             # Commit the changes to the database
             # print("User table initialized successfully or already exists.") # Optional confirmation message
         except sqlite3.Error as e:
-            print(f"Database error during table initialization: {e}")
+            self._rollback()
+            logger.error("Database error during table initialization: %s", e, extra={"event": "db.init_failed", "table": self.table_name})
             # Re-raise the exception to signal failure
             raise
-        finally:
-            # Ensure the connection is closed even if an error occurred
-            if db_connection:
-                db_connection.close()
-    
-    def create(self, user_info):
+        self.initialize_preference_stats()
+
+    def initialize_preference_stats(self):
+        '''Creates the preference stats table and the triggers that keep it current, then fills it
+           from the users table. Safe to run on a database that already has users (and idempotent).
+
+           Every insert, delete and preference change on the users table adjusts one or two
+           counters in the same transaction, so reading the statistics never scans the users table.
+           Rows with no preference are not counted, as with GROUP BY preference_temperature.
+
+           Cheap once installed (nothing is recounted), so it is run whenever the app starts. Does
+           nothing before the users table exists; initialize_table installs the counters with it.
+        '''
+        stats = self.stats_table_name
+        required = {self.table_name, stats, f"{self.table_name}_preference_insert",
+                    f"{self.table_name}_preference_delete", f"{self.table_name}_preference_update"}
         try:
-            db_connection = sqlite3.connect(self.db_name)
+            db_connection = self._get_connection()
             cursor = db_connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE;") #no writer can slip in between counting and installing the triggers
+            existing = {name for (name,) in cursor.execute(
+                f"SELECT name FROM sqlite_master WHERE name IN ({', '.join('?' * len(required))});",
+                tuple(required)).fetchall()}
+            if self.table_name not in existing or existing == required:
+                db_connection.commit()
+                return
+            cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {stats} (
+                        preference_temperature TEXT PRIMARY KEY,
+                        user_count INTEGER NOT NULL DEFAULT 0
+                    )
+                    """)
+            cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {self.table_name}_preference_insert AFTER INSERT ON {self.table_name}
+                    BEGIN
+                        UPDATE {stats} SET user_count = user_count + 1 WHERE preference_temperature = NEW.preference_temperature;
+                    END
+                    """)
+            cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {self.table_name}_preference_delete AFTER DELETE ON {self.table_name}
+                    BEGIN
+                        UPDATE {stats} SET user_count = user_count - 1 WHERE preference_temperature = OLD.preference_temperature;
+                    END
+                    """)
+            cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {self.table_name}_preference_update
+                    AFTER UPDATE OF preference_temperature ON {self.table_name}
+                    WHEN OLD.preference_temperature IS NOT NEW.preference_temperature
+                    BEGIN
+                        UPDATE {stats} SET user_count = user_count - 1 WHERE preference_temperature = OLD.preference_temperature;
+                        UPDATE {stats} SET user_count = user_count + 1 WHERE preference_temperature = NEW.preference_temperature;
+                    END
+                    """)
+            self._write_preference_counts(cursor, self._count_preferences(cursor))
+            db_connection.commit()
+        except sqlite3.Error as e:
+            self._rollback()
+            logger.error("Database error during preference stats initialization: %s", e, extra={"event": "db.init_failed", "table": stats})
+            raise
 
-            existing_ids_query = cursor.execute(f"SELECT id FROM {self.table_name};")
-            existing_ids = existing_ids_query.fetchall()
+    def _count_preferences(self, cursor):
+        '''The actual user count per preference (a full scan of the users table)'''
+        counts = dict.fromkeys(self.preferences, 0)
+        rows = cursor.execute(f'''SELECT preference_temperature, COUNT(*) FROM {self.table_name}
+                                  GROUP BY preference_temperature;''').fetchall()
+        for preference, count in rows:
+            if preference in counts:
+                counts[preference] = count
+        return counts
 
-            #CHECK IF ID EXISTS AND REROLL IF IT DOES
-            user_id_exists = True
-            while user_id_exists == True:
-                user_id = random.randint(0, self.max_safe_id)
-                #user_id = 1 #(used for testing)
-                if ((user_id,) not in existing_ids) == True:
-                    user_id_exists = False
-                else:
-                    user_id_exists = True
+    def _write_preference_counts(self, cursor, counts):
+        cursor.executemany(f'''INSERT OR REPLACE INTO {self.stats_table_name} (preference_temperature, user_count)
+                              VALUES (?, ?);''', list(counts.items()))
 
-            user_data = (user_id, user_info["name"], user_info["email"], user_info["preference_temperature"], user_info["google_oauth_token"])
-            user_data_dict = self.to_dict(user_data)
-            
-            cursor.execute(f"INSERT INTO {self.table_name} VALUES (?, ?, ?, ?, ?);", user_data)
+    def get_preference_stats(self):
+        '''Returns the maintained user count per preference; reads three rows whatever the table size'''
+        try:
+            cursor = self._get_connection().cursor()
+            counts = dict.fromkeys(self.preferences, 0)
+            for preference, count in cursor.execute(f'''SELECT preference_temperature, user_count
+                                                         FROM {self.stats_table_name};''').fetchall():
+                counts[preference] = count
+            return {"status": "success",
+                    "data": counts}
+        except sqlite3.Error as error:
+            return {"status": "error",
+                    "data": error}
+
+    def check_preference_stats(self, repair=False):
+        '''Recounts users per preference and compares the result with the maintained counters.
+
+           Returns a success packet whose data is {"drift": {preference: {"stored": n, "actual": m}}
+           for every counter that is off, "repaired": bool}. With repair=True, drifted counters are
+           overwritten with the actual counts in the same transaction as the recount.
+        '''
+        try:
+            db_connection = self._get_connection()
+            cursor = db_connection.cursor()
+            #one transaction, so the recount and the counters describe the same snapshot
+            cursor.execute("BEGIN IMMEDIATE;" if repair else "BEGIN;")
+            actual = self._count_preferences(cursor)
+            stored = dict(cursor.execute(f'''SELECT preference_temperature, user_count
+                                             FROM {self.stats_table_name};''').fetchall())
+            drift = {preference: {"stored": stored.get(preference), "actual": count}
+                     for preference, count in actual.items() if stored.get(preference) != count}
+            if repair and drift:
+                self._write_preference_counts(cursor, actual)
+            db_connection.commit()
+            return {"status": "success",
+                    "data": {"drift": drift, "repaired": bool(repair and drift)}}
+        except sqlite3.Error as error:
+            self._rollback()
+            return {"status": "error",
+                    "data": error}
+    
+    @observed("create")
+    def create(self, user_info):
+        try:
+            db_connection = self._get_connection()
+            cursor = db_connection.cursor()
+            user_data = self._insert_with_unique_id(cursor, user_info)
             db_connection.commit()
 
             return {"status": "success",
-                    "data": user_data_dict
+                    "data": self.to_dict(user_data)
                     }
         except sqlite3.Error as error:
+            self._rollback()
             return {"status":"error",
                     "data":error}
-        finally:
-            db_connection.close()
 
+    def _insert_with_unique_id(self, cursor, user_info):
+        '''Inserts one user inside the caller's transaction and returns the inserted tuple'''
+        #PICK A RANDOM ID AND LET THE PRIMARY KEY REJECT IT IF IT IS TAKEN, THEN REROLL
+        #(never reads the existing ids, so the cost does not grow with the table)
+        for attempt in range(self.max_id_attempts):
+            user_id = random.randint(0, self.max_safe_id)
+            #user_id = 1 #(used for testing)
+            user_data = (user_id, user_info["name"], user_info["email"], user_info["preference_temperature"], user_info["google_oauth_token"])
+            try:
+                cursor.execute(f"INSERT INTO {self.table_name} VALUES (?, ?, ?, ?, ?);", user_data)
+            except sqlite3.IntegrityError as error:
+                if self._is_id_collision(error):
+                    continue
+                raise
+            return user_data
+        raise sqlite3.IntegrityError(f"Could not allocate a unique id after {self.max_id_attempts} attempts")
+
+    def _is_id_collision(self, error):
+        '''True if an IntegrityError was caused by the primary key rather than e.g. the email'''
+        return f"{self.table_name}.id" in str(error)
+
+    def validate_new_user(self, user_info):
+        '''Returns an error message for a user dict that cannot be inserted, or None if it is valid'''
+        if not isinstance(user_info, dict):
+            return "User must be a JSON object."
+        if not user_info.get("name") or not user_info.get("email"):
+            return "Missing required fields"
+        if user_info.get("preference_temperature") not in (None,) + self.preferences:
+            return f"preference_temperature must be one of {', '.join(self.preferences)}."
+        return None
+
+    @observed("create_many")
+    def create_many(self, users_info, chunk_size=1000):
+        '''Creates users from any iterable of user dicts (it is consumed lazily, so it can be a stream).
+
+           Rows are validated, then inserted chunk_size at a time with executemany, one transaction
+           per chunk. If a chunk hits a constraint (e.g. a duplicate email) it is rolled back and
+           retried row by row so that only the offending rows fail.
+
+           Returns a success packet whose data is one create()-style packet per input row, in order.
+        '''
+        results = []
+        chunk = []
+        for user_info in users_info:
+            chunk.append(user_info)
+            if len(chunk) >= chunk_size:
+                results.extend(self._create_chunk(chunk))
+                chunk = []
+        if chunk:
+            results.extend(self._create_chunk(chunk))
+        return {"status": "success",
+                "data": results}
+
+    def _create_chunk(self, chunk):
+        results = [None] * len(chunk)
+        pending = []  # (position in chunk, user_info with defaults applied)
+        for position, user_info in enumerate(chunk):
+            error = self.validate_new_user(user_info)
+            if error:
+                results[position] = {"status": "error", "data": error}
+            else:
+                pending.append((position, {
+                    "name": user_info["name"],
+                    "email": user_info["email"],
+                    "preference_temperature": user_info.get("preference_temperature") or "neutral",
+                    "google_oauth_token": user_info.get("google_oauth_token"),
+                }))
+
+        db_connection = self._get_connection()
+        cursor = db_connection.cursor()
+        try:
+            rows = [(random.randint(0, self.max_safe_id), user_info["name"], user_info["email"],
+                     user_info["preference_temperature"], user_info["google_oauth_token"])
+                    for position, user_info in pending]
+            cursor.executemany(f"INSERT INTO {self.table_name} VALUES (?, ?, ?, ?, ?);", rows)
+            db_connection.commit()
+            for (position, user_info), user_data in zip(pending, rows):
+                results[position] = {"status": "success", "data": self.to_dict(user_data)}
+            return results
+        except sqlite3.Error:
+            self._rollback()
+
+        #SLOW PATH: one statement per row (still one transaction) so each failure is isolated
+        try:
+            for position, user_info in pending:
+                try:
+                    user_data = self._insert_with_unique_id(cursor, user_info)
+                    results[position] = {"status": "success", "data": self.to_dict(user_data)}
+                except sqlite3.IntegrityError as error:
+                    results[position] = {"status": "error", "data": error}
+            db_connection.commit()
+        except sqlite3.Error as error:
+            self._rollback()
+            for position, user_info in pending:
+                results[position] = {"status": "error", "data": error}
+        return results
+
+    @observed("exists")
     def exists(self, email=None, id=None):
         try: 
-            db_connection = sqlite3.connect(self.db_name)
-            cursor = db_connection.cursor()
-            email_results = []
-            id_results = []
-
-            if email != None:
-                email_results = cursor.execute(f'''
-                    SELECT * FROM {self.table_name}
-                    WHERE email = '{email}';
-                ''')
-                email_results = email_results.fetchall()
-
-            if id != None:
-                id_results = cursor.execute(f'''
-                    SELECT * FROM {self.table_name}
-                    WHERE id = {id};
-                ''')
-                id_results = id_results.fetchall()
-
-            if len(email_results) != 1 and len(id_results) != 1:
+            #email is UNIQUE and id the primary key, so each matches at most one (possibly cached) row
+            if (email != None and self._lookup("email", email) is not None) or \
+               (id != None and self._lookup("id", id) is not None):
                 return {"status": "success",
-                    "data": False
+                    "data": True
                     }
             else:
                 return {"status": "success",
-                    "data": True
+                    "data": False
                     }
         
         except sqlite3.Error as error:
             return {"status":"error",
                     "data":error}
-        finally:
-            db_connection.close()
 
+    @observed("get")
     def get(self, email=None, id=None):
         try: 
-            db_connection = sqlite3.connect(self.db_name)
-            cursor = db_connection.cursor()
             if email != None:
-                specific_user_query = cursor.execute(f'''
-                                                    SELECT * FROM {self.table_name} 
-                                                    WHERE email = '{email}';''')
-                specific_user = specific_user_query.fetchall()
-                if specific_user != []:
+                specific_user = self._lookup("email", email)
+                if specific_user is not None:
                     return {"status":"success",
-                    "data":self.to_dict(specific_user[0])}
+                    "data":dict(specific_user)} #a copy, so callers cannot change the cached row
                 else:
                     return {"status":"error",
                     "data":"User does not exist!"}
             elif id != None:
-                specific_user_query = cursor.execute(f'''
-                                                    SELECT * FROM {self.table_name} 
-                                                    WHERE id = {id};''')
-                specific_user = specific_user_query.fetchall()
-                if specific_user != []:
+                specific_user = self._lookup("id", id)
+                if specific_user is not None:
                     return {"status":"success",
-                    "data":self.to_dict(specific_user[0])}
+                    "data":dict(specific_user)}
                 else:
                     return {"status":"error",
                     "data":"User does not exist!"}
@@ -139,12 +525,11 @@ class User:
         except sqlite3.Error as error:
             return {"status":"error",
                     "data":error}
-        finally:
-            db_connection.close()
 
+    @observed("get_all")
     def get_all(self): 
         try: 
-            db_connection = sqlite3.connect(self.db_name)
+            db_connection = self._get_connection()
             cursor = db_connection.cursor()
             all_users_query = cursor.execute(f'''SELECT * FROM {self.table_name};''')
             all_users = all_users_query.fetchall()
@@ -158,78 +543,70 @@ class User:
         except sqlite3.Error as error:
             return {"status":"error",
                     "data":error}
-        finally:
-            db_connection.close()
 
+    @observed("update")
     def update(self, user_info): 
         #IN THE FUTURE, THE EMAIL CHECKER SHOULD BE THROUGH OAUTH/VALID EMAIL CHECKER ANYWAY
         try: 
-            db_connection = sqlite3.connect(self.db_name)
+            db_connection = self._get_connection()
             cursor = db_connection.cursor()
-            all_ids_query = cursor.execute(f'''SELECT id FROM {self.table_name};''')
-            all_ids = all_ids_query.fetchall()
-            #print(all_ids)
-            #check if id exists
-            if (user_info["id"],) not in all_ids:
+            #check if id exists (primary key lookup)
+            original_user_query = cursor.execute(f'''SELECT * FROM {self.table_name} WHERE id = ?;''', (user_info["id"],))
+            original_user = original_user_query.fetchone()
+            if original_user is None:
                 return {"status":"error",
                         "data":"Id does not exist!"}
-            #if id does exist
-            else:
-                #check if username and email are unique and if username/email/password are correctly formatted
-                existing_emails_query = cursor.execute(f'''SELECT email FROM {self.table_name};''')
-                existing_emails = existing_emails_query.fetchall()
-                
-                original_user_query = cursor.execute(f'''SELECT * FROM {self.table_name} WHERE id = {user_info["id"]};''')
-                original_user = original_user_query.fetchone()
-                
-                #email
-                #if the email doesn't match the current email and is present in the db
-                if (user_info["email"],) in existing_emails and user_info["email"] != original_user[2]:
-                    return {"status":"error",
-                            "data": "Email address already exists!"}
-                elif "@" not in user_info["email"]:
-                    return {"status":"error",
-                            "data": "Email address should contain @ character."}
-                elif "." not in user_info["email"]:
-                    return {"status":"error",
-                            "data": "Email address should contain . character."}
-                elif " " in user_info["email"]:
-                    return {"status":"error",
-                            "data": "Email address should not contain any spaces."}
-                #name
-                # Lowk do not need this but just in case
-                # elif user_info["name"].isalnum() == False:
-                #     for character in user_info["name"]:
-                #         if character != "-" and character != "_" and character.isalnum() == False:
-                #             return {"status":"error",
-                #                     "data":"Name contains forbidden characters!"}
-                
-                #update id's info
-                else:
-                    cursor.execute(f'''
-                    UPDATE {self.table_name}
-                    SET email = '{user_info["email"]}',
-                    name = '{user_info["name"]}'
-                    WHERE id = {user_info["id"]};
-                    ''')
-                    db_connection.commit()
-                   
-
-                    updated_user_query = cursor.execute(f'''SELECT * FROM {self.table_name}
-                                                            WHERE id = {user_info["id"]};''')
-                    updated_user = updated_user_query.fetchall()
-                    return {"status":"success",
-                        "data":self.to_dict(updated_user[0])}
+
+            #check if email is correctly formatted
+            if "@" not in user_info["email"]:
+                return {"status":"error",
+                        "data": "Email address should contain @ character."}
+            elif "." not in user_info["email"]:
+                return {"status":"error",
+                        "data": "Email address should contain . character."}
+            elif " " in user_info["email"]:
+                return {"status":"error",
+                        "data": "Email address should not contain any spaces."}
+            #name
+            # Lowk do not need this but just in case
+            # elif user_info["name"].isalnum() == False:
+            #     for character in user_info["name"]:
+            #         if character != "-" and character != "_" and character.isalnum() == False:
+            #             return {"status":"error",
+            #                     "data":"Name contains forbidden characters!"}
+
+            #update id's info - the UNIQUE index on email rejects an address that belongs to another user
+            try:
+                cursor.execute(f'''
+                UPDATE {self.table_name}
+                SET email = ?,
+                name = ?
+                WHERE id = ?;
+                ''', (user_info["email"], user_info["name"], user_info["id"]))
+            except sqlite3.IntegrityError as error:
+                if f"{self.table_name}.email" not in str(error):
+                    raise
+                self._rollback()
+                return {"status":"error",
+                        "data": "Email address already exists!"}
+
+            #read the row back before committing so the caller gets exactly what was written
+            updated_user_query = cursor.execute(f'''SELECT * FROM {self.table_name} WHERE id = ?;''', (user_info["id"],))
+            updated_user = updated_user_query.fetchone()
+            db_connection.commit()
+            self._invalidate(self.to_dict(original_user))
+            return {"status":"success",
+                    "data":self.to_dict(updated_user)}
             
         except sqlite3.Error as error:
+            self._rollback()
             return {"status":"error",
                     "data":error}
-        finally:
-            db_connection.close()
 
+    @observed("update_preference")
     def update_preference(self, email, new_preference):
         try:
-            db_connection = sqlite3.connect(self.db_name)
+            db_connection = self._get_connection()
             cursor = db_connection.cursor()
             
             # Check if user exists
@@ -248,6 +625,7 @@ class User:
             ''', (new_preference, email))
             
             db_connection.commit()
+            self._invalidate({"email": email})
             
             # Get updated user data
             updated_user = self.get(email=email)
@@ -257,12 +635,11 @@ class User:
             }
             
         except sqlite3.Error as error:
+            self._rollback()
             return {
                 "status": "error",
                 "data": str(error)
             }
-        finally:
-            db_connection.close()
 
     def to_dict(self, user_tuple):
         '''Utility function which converts the tuple returned from a SQLlite3 database
@@ -277,9 +654,10 @@ class User:
             user_dict["google_oauth_token"]=user_tuple[4]
         return user_dict
 
+    @observed("remove")
     def remove(self, email): 
         try: 
-            db_connection = sqlite3.connect(self.db_name)
+            db_connection = self._get_connection()
             cursor = db_connection.cursor()
 
             if (self.exists(email=email)["data"] == True):
@@ -287,9 +665,10 @@ class User:
 
                 cursor.execute(f'''
                 DELETE FROM {self.table_name}
-                WHERE email = '{email}';
-                ''')
+                WHERE email = ?;
+                ''', (email,))
                 db_connection.commit()
+                self._invalidate({"email": email})
 
                 return {"status":"success",
                        "data":original_user_info["data"]}
@@ -297,10 +676,9 @@ class User:
                 return {"status":"error",
                     "data":"User does not exist!"}
         except sqlite3.Error as error:
+            self._rollback()
             return {"status":"error",
                     "data":error}
-        finally:
-            db_connection.close()
 
 if __name__ == '__main__':
     SAMPLE_USERS = [
@@ -1,45 +1,138 @@
-from flask import Flask, jsonify, request
+import atexit
+import time
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS  # Import CORS
+from config import load_config
 from controllers.User_Controller import UserController  # Import UserController
-import requests  # Import the requests library
-import os
-from dotenv import load_dotenv, dotenv_values
+from utils.compression import gzip_response
+from utils.log import REQUEST_ID_HEADER, configure_logging, get_logger, new_request_id, request_id
+from utils.profiling import PROFILE_HEADER, RouteProfiler
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+access_logger = get_logger("access")
 
-dotenv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', '.env')
-print(dotenv_path)
-load_dotenv(dotenv_path=dotenv_path)  # Load environment variables from .env file
-IP_ADDRESS = os.getenv("EXPO_PUBLIC_IP_ADDRESS") # Get the environment variable
 
-# Initialize controllers
-user_controller = UserController()
+def create_app(config=None):
+    """
+    Builds the Flask app. config holds overrides for the settings in config.DEFAULTS, which are
+    otherwise read from the environment (and the frontend .env file) once, here.
+    Safe to call before a pre-forking server forks: each worker re-creates its own resources.
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(load_config(config))
+    configure_logging(app.config)
+    CORS(app)  # Enable CORS for all routes
 
-# --- User Routes ---
-@app.route('/users', methods=['POST'])
-def create_user():
-    return user_controller.create_user()
+    # Initialize controllers
+    user_controller = UserController(app.config)
+    app.extensions["user_controller"] = user_controller
 
-@app.route('/users/exists', methods=['POST'])
-def check_user_exists():
-    return user_controller.check_user_exists()
+    # Request latency and status per route, served with everything else at /metrics
+    http_seconds = user_controller.metrics.histogram(
+        "http_request_seconds", "Time from routing to response", ("method", "route"))
+    http_responses = user_controller.metrics.counter(
+        "http_responses_total", "Responses sent", ("method", "route", "status"))
 
-@app.route('/users/delete/<email>', methods=['GET'])
-def remove_user(email):
-    return user_controller.remove_user(email)
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+        # Every log line written while handling this request carries its ID
+        g.request_id_token = request_id.set(new_request_id(request.headers.get(REQUEST_ID_HEADER)))
 
-@app.route('/users/preference', methods=['PUT'])
-def update_preference():
-    return user_controller.update_preference()
+    @app.after_request
+    def record_request(response):
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        started = g.get("request_started")
+        elapsed = time.perf_counter() - started if started is not None else None
+        if elapsed is not None:
+            http_seconds.observe(elapsed, request.method, route)
+        http_responses.inc(request.method, route, str(response.status_code))
+        response.headers[REQUEST_ID_HEADER] = request_id.get() or ""
+        access_logger.info("%s %s %s", request.method, route, response.status_code, extra={
+            "event": "http.request", "method": request.method, "route": route, "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 2) if elapsed is not None else None})
+        return response
 
-# --- Weather Data Route ---
-@app.route('/weather', methods=['GET'])
-def get_weather():
-    return user_controller.get_weather()
+    @app.teardown_request
+    def end_request(error=None):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            request_id.reset(token)
+
+    # Compress larger responses for clients that accept gzip
+    @app.after_request
+    def compress_response(response):
+        return gzip_response(response, request, min_size=app.config["RESPONSE_GZIP_MIN_SIZE"],
+                             level=app.config["RESPONSE_GZIP_LEVEL"])
+
+    # On-demand cProfile of sampled requests; no hooks at all unless it is configured
+    if app.config["PROFILE_ENABLED"] or app.config["PROFILE_ADMIN_TOKEN"]:
+        register_profiler(app)
+
+    # --- User Routes ---
+    @app.route('/users', methods=['POST'])
+    def create_user():
+        return user_controller.create_user()
+
+    @app.route('/users/bulk', methods=['POST'])
+    def create_users_bulk():
+        return user_controller.create_users_bulk()
+
+    @app.route('/users/exists', methods=['POST'])
+    def check_user_exists():
+        return user_controller.check_user_exists()
+
+    @app.route('/users/delete/<email>', methods=['GET'])
+    def remove_user(email):
+        return user_controller.remove_user(email)
+
+    @app.route('/users/preference', methods=['PUT'])
+    def update_preference():
+        return user_controller.update_preference()
+
+    # --- Weather Data Route ---
+    @app.route('/weather', methods=['GET'])
+    def get_weather():
+        return user_controller.get_weather()
+
+    @app.route('/weather/batch', methods=['POST'])
+    def get_weather_batch():
+        return user_controller.get_weather_batch()
+
+    # --- Monitoring ---
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(user_controller.metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return app
+
+
+def register_profiler(app):
+    profiler = RouteProfiler(
+        app.config["PROFILE_DIR"],
+        routes=app.config["PROFILE_ROUTES"].split(",") if app.config["PROFILE_ENABLED"] else (),
+        sample_rate=app.config["PROFILE_SAMPLE_RATE"],
+        admin_token=app.config["PROFILE_ADMIN_TOKEN"],
+        flush_interval=app.config["PROFILE_FLUSH_INTERVAL"],
+    )
+    app.extensions["profiler"] = profiler
+    atexit.register(profiler.flush)
+
+    @app.before_request
+    def start_profile():
+        if profiler.wants(request.path, request.headers.get(PROFILE_HEADER)):
+            g.profile = profiler.start()
+
+    # teardown rather than after_request, so requests that raise are still finished
+    @app.teardown_request
+    def finish_profile(error=None):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            profiler.finish(route, profile)
 
 
 if __name__ == '__main__':
-    #app.run(debug=True, host="192.168.0.134") # home 
-    print("ip address",IP_ADDRESS)
-    app.run(debug=True, host=IP_ADDRESS) # trinity guest
\ No newline at end of file
+    # Development server only; production runs wsgi:app under gunicorn (see gunicorn.conf.py)
+    app = create_app()
+    #app.run(debug=True, host="192.168.0.134") # home
+    app.run(debug=True, host=app.config["EXPO_PUBLIC_IP_ADDRESS"]) # trinity guest
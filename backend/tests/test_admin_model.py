@@ -0,0 +1,59 @@
+import pytest
+import sqlite3
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '../models') #Assumes this file lives in a tests folder next to the Models folder
+sys.path.append(fpath)
+import Admin_Model
+from User_Model import User
+from sample_user_data import SAMPLE_USERS
+
+@pytest.fixture
+def user_model(tmp_path, monkeypatch):
+    """Fixture pointing Admin at a temporary database with a populated users table."""
+    db_path = str(tmp_path / "test_admin_model.db")
+    monkeypatch.setattr(Admin_Model, "DB_PATH", db_path)
+    user = User(db_name=db_path, table_name="users")
+    user.initialize_table()
+    user.create_many(SAMPLE_USERS)
+    yield user
+    user.close()
+
+def expected_counts():
+    counts = {"neutral": 0, "gets_cold_easily": 0, "gets_hot_easily": 0}
+    for sample in SAMPLE_USERS:
+        counts[sample["preference_temperature"]] += 1
+    return counts
+
+def test_preference_statistics_read_maintained_counters(user_model):
+    """Test that the statistics match the users table and follow later writes."""
+    assert Admin_Model.Admin.get_user_preference_statistics() == expected_counts()
+    user_model.update_preference(SAMPLE_USERS[0]["email"], "gets_hot_easily")
+    counts = expected_counts()
+    counts[SAMPLE_USERS[0]["preference_temperature"]] -= 1
+    counts["gets_hot_easily"] += 1
+    assert Admin_Model.Admin.get_user_preference_statistics() == counts
+
+def test_preference_statistics_do_not_scan_users(user_model, monkeypatch):
+    """Test that the statistics are read from the stats table, not counted from users."""
+    statements = []
+    original_connect = sqlite3.connect
+    def tracing_connect(*args, **kwargs):
+        conn = original_connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+    monkeypatch.setattr(Admin_Model.sqlite3, "connect", tracing_connect)
+    Admin_Model.Admin.get_user_preference_statistics()
+    assert any("users_preference_stats" in statement for statement in statements)
+    assert not any("GROUP BY" in statement for statement in statements)
+
+def test_preference_statistics_fall_back_without_stats_table(user_model, monkeypatch):
+    """Test that a database without the stats table is still counted correctly, with a warning."""
+    warnings = []
+    monkeypatch.setattr(Admin_Model.logger, "warning", lambda *args, **kwargs: warnings.append(args))
+    conn = sqlite3.connect(user_model.db_name)
+    conn.execute("DROP TABLE users_preference_stats;")
+    conn.commit()
+    conn.close()
+    assert Admin_Model.Admin.get_user_preference_statistics() == expected_counts()
+    assert len(warnings) == 1
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '..') #Assumes this file lives in a tests folder inside the backend folder
+sys.path.append(fpath)
+import pytest
+
+httpx = pytest.importorskip("httpx")
+from utils.async_upstream_client import AsyncUpstreamClient
+
+async def no_sleep(delay):
+    pass
+
+def make_client(handler, **kwargs):
+    """Client whose requests are answered in-process by handler(request) -> httpx.Response."""
+    client = AsyncUpstreamClient(sleep=no_sleep, **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+def run(client, coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+def test_get_json_success():
+    """Test that a JSON body is decoded and counted as one request."""
+    client = make_client(lambda request: httpx.Response(200, json={"ok": True}))
+    assert run(client, client.get_json("http://upstream.test/ok")) == {"ok": True}
+    assert client.stats() == {"requests": 1, "retries": 0, "failures": 0}
+
+def test_invalid_json_raises_an_http_error():
+    """Test that a 200 whose body is not JSON raises httpx.DecodingError, not a bare ValueError."""
+    client = make_client(lambda request: httpx.Response(200, text="<html>Service Unavailable</html>"))
+    with pytest.raises(httpx.DecodingError):
+        run(client, client.get_json("http://upstream.test/garbled"))
+
+def test_retryable_status_is_retried():
+    """Test that a 503 followed by a 200 succeeds after one retry."""
+    statuses = [503, 200]
+    client = make_client(lambda request: httpx.Response(statuses.pop(0), json={"ok": True}))
+    assert run(client, client.get_json("http://upstream.test/flaky")) == {"ok": True}
+    assert client.stats()["retries"] == 1
+
+def test_retries_are_bounded():
+    """Test that a persistent 503 is retried max_retries times, then raised as an HTTP error."""
+    client = make_client(lambda request: httpx.Response(503, json={}), max_retries=2)
+    with pytest.raises(httpx.HTTPStatusError):
+        run(client, client.get_json("http://upstream.test/down"))
+    assert client.stats() == {"requests": 3, "retries": 2, "failures": 1}
+
+def test_client_errors_are_not_retried():
+    """Test that a 404 is returned after a single attempt."""
+    client = make_client(lambda request: httpx.Response(404, json={}))
+    with pytest.raises(httpx.HTTPStatusError):
+        run(client, client.get_json("http://upstream.test/missing"))
+    assert client.stats()["requests"] == 1
+
+def test_connection_errors_are_retried_then_raised():
+    """Test that transport errors are retried and the last one propagates."""
+    def refuse(request):
+        raise httpx.ConnectError("refused", request=request)
+    client = make_client(refuse, max_retries=1)
+    with pytest.raises(httpx.ConnectError):
+        run(client, client.get("http://upstream.test/ok"))
+    assert client.stats() == {"requests": 2, "retries": 1, "failures": 1}
@@ -0,0 +1,51 @@
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a tests folder next to the utils folder
+sys.path.append(fpath)
+import gzip
+import json
+import pytest
+from flask import Flask, jsonify, request
+from compression import GZIP_ETAG_SUFFIX, gzip_response
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+def make_response(app, body, headers, etag=None):
+    with app.test_request_context(headers=headers):
+        response = jsonify(body)
+        if etag is not None:
+            response.set_etag(etag)
+        return gzip_response(response, request, min_size=100)
+
+def test_large_body_is_compressed_when_accepted(app):
+    """Test that a body over the threshold is gzipped and its ETag gets the gzip suffix."""
+    body = {"hourly_forecast_list": [{"temp": i} for i in range(50)]}
+    response = make_response(app, body, {"Accept-Encoding": "gzip, deflate"}, etag="abc")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.vary
+    assert json.loads(gzip.decompress(response.get_data())) == body
+    assert int(response.headers["Content-Length"]) == len(response.get_data())
+    assert response.get_etag() == ("abc" + GZIP_ETAG_SUFFIX, False)
+
+def test_small_body_is_not_compressed(app):
+    """Test that bodies under min_size are sent as they are."""
+    response = make_response(app, {"ok": True}, {"Accept-Encoding": "gzip"}, etag="abc")
+    assert "Content-Encoding" not in response.headers
+    assert response.get_etag() == ("abc", False)
+
+def test_not_compressed_without_accept_encoding(app):
+    """Test that clients that do not accept gzip get identity encoding but still a Vary header."""
+    body = {"data": "x" * 500}
+    assert "Content-Encoding" not in make_response(app, body, {}).headers
+    response = make_response(app, body, {"Accept-Encoding": "gzip;q=0, identity"})
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.vary
+
+def test_error_responses_are_not_compressed(app):
+    """Test that only 200 responses are compressed."""
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = jsonify({"error": "x" * 500})
+        response.status_code = 500
+        assert "Content-Encoding" not in gzip_response(response, request, min_size=100).headers
@@ -0,0 +1,183 @@
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a tests folder next to the utils folder
+sys.path.append(fpath)
+import pytest
+from concurrency import AsyncSingleFlight, SingleFlight, StageTimeout, bounded_executor, fan_out
+
+@pytest.fixture
+def executor():
+    pool = bounded_executor(4, "test-fan-out")
+    yield pool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def test_fan_out_returns_results_by_name(executor):
+    """Test that results are keyed by the names of the calls."""
+    results = fan_out({"a": lambda: 1, "b": lambda: 2}, executor)
+    assert results == {"a": 1, "b": 2}
+
+def test_fan_out_runs_calls_concurrently(executor):
+    """Test that two calls overlap instead of running back to back."""
+    barrier = threading.Barrier(2, timeout=2)
+    results = fan_out({"a": barrier.wait, "b": barrier.wait}, executor, timeout=5)
+    assert sorted(results.values()) == [0, 1]
+
+def test_fan_out_propagates_exceptions(executor):
+    """Test that an exception raised by one call is re-raised to the caller."""
+    def fail():
+        raise ValueError("upstream broke")
+    with pytest.raises(ValueError, match="upstream broke"):
+        fan_out({"ok": lambda: 1, "bad": fail}, executor)
+
+def test_fan_out_timeout_covers_whole_stage(executor):
+    """Test that the stage fails once its deadline passes and names the slow call."""
+    release = threading.Event()
+    start = time.monotonic()
+    with pytest.raises(StageTimeout, match="slow"):
+        fan_out({"fast": lambda: 1, "slow": lambda: release.wait(5)}, executor, timeout=0.1)
+    assert time.monotonic() - start < 2
+    release.set()
+
+def test_fan_out_can_return_exceptions(executor):
+    """Test that return_exceptions reports failures and timeouts per call instead of raising."""
+    release = threading.Event()
+    def fail():
+        raise ValueError("upstream broke")
+    results = fan_out({"ok": lambda: 1, "bad": fail, "slow": lambda: release.wait(5)},
+                      executor, timeout=0.1, return_exceptions=True)
+    release.set()
+    assert results["ok"] == 1
+    assert isinstance(results["bad"], ValueError)
+    assert isinstance(results["slow"], StageTimeout)
+
+def test_fan_out_calls_see_the_callers_context(executor):
+    """Test that context variables (e.g. the request ID) reach the calls, including nested fan-outs."""
+    request_id = contextvars.ContextVar("request_id", default=None)
+    inner = bounded_executor(2, "test-fan-out-inner")
+    def nested():
+        return fan_out({"x": request_id.get}, inner)["x"]
+    token = request_id.set("req-1")
+    try:
+        results = fan_out({"a": request_id.get, "b": request_id.get, "nested": nested}, executor)
+    finally:
+        request_id.reset(token)
+        inner.shutdown(wait=False)
+    assert results == {"a": "req-1", "b": "req-1", "nested": "req-1"}
+    assert fan_out({"a": request_id.get}, executor) == {"a": None}
+
+def test_single_flight_coalesces_concurrent_calls():
+    """Test that concurrent callers for one key share a single execution."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"temp": 20}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("forecast:nyc", fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("forecast:nyc", fetch))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while flight.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"temp": 20}] * 5
+    assert flight.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+def test_single_flight_shares_exceptions_and_releases_key():
+    """Test that waiters see the leader's exception and the key can be retried afterwards."""
+    flight = SingleFlight()
+    release = threading.Event()
+    def fail():
+        release.wait(5)
+        raise ValueError("upstream broke")
+
+    errors = []
+    def call():
+        try:
+            flight.do("key", fail)
+        except ValueError as error:
+            errors.append(str(error))
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["executions"] + flight.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["upstream broke"] * 3
+    assert flight.do("key", lambda: "ok") == "ok"
+    assert flight.stats()["executions"] == 2
+
+def test_single_flight_keys_are_independent():
+    """Test that different keys do not wait on each other."""
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats()["coalesced"] == 0
+
+def test_async_single_flight_coalesces_concurrent_calls():
+    """Test that concurrent awaits for one key share a single execution."""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*[flight.do("key", fetch) for _ in range(10)])
+
+    assert asyncio.run(main()) == ["value"] * 10
+    assert len(calls) == 1
+    assert flight.stats() == {"executions": 1, "coalesced": 9, "in_flight": 0}
+
+def test_async_single_flight_survives_cancelled_caller():
+    """Test that cancelling the first caller does not cancel the call for the other waiters."""
+    flight = AsyncSingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "value"
+
+def test_async_single_flight_shares_exceptions():
+    """Test that every waiter sees the shared call's exception and the key is released."""
+    flight = AsyncSingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["in_flight"] == 0
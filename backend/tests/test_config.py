@@ -0,0 +1,35 @@
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '..') #Assumes this file lives in a tests folder inside the backend folder
+sys.path.append(fpath)
+import pytest
+from config import DEFAULTS, load_config
+
+def test_defaults_without_environment():
+    """Test that every setting falls back to its default."""
+    assert load_config(environ={}) == DEFAULTS
+
+def test_environment_values_are_converted():
+    """Test that environment strings are converted to the type of the default."""
+    config = load_config(environ={
+        "WEATHER_CACHE_TTL_CURRENT": "60",
+        "WEATHER_FETCH_TIMEOUT": "2.5",
+        "WEATHER_PREFETCH_ENABLED": "0",
+        "FORECAST_HISTORY_ENABLED": "true",
+        "API_KEY": "abc",
+    })
+    assert config["WEATHER_CACHE_TTL_CURRENT"] == 60
+    assert config["WEATHER_FETCH_TIMEOUT"] == 2.5
+    assert config["WEATHER_PREFETCH_ENABLED"] is False
+    assert config["FORECAST_HISTORY_ENABLED"] is True
+    assert config["API_KEY"] == "abc"
+
+def test_overrides_win_over_environment():
+    """Test that explicit overrides (e.g. from create_app) take precedence."""
+    config = load_config({"DB_PATH": "/tmp/test.db"}, environ={"DB_PATH": "/tmp/env.db"})
+    assert config["DB_PATH"] == "/tmp/test.db"
+
+def test_invalid_value_raises():
+    """Test that a malformed number is reported with the setting's name."""
+    with pytest.raises(ValueError, match="WEATHER_CACHE_MAXSIZE"):
+        load_config(environ={"WEATHER_CACHE_MAXSIZE": "lots"})
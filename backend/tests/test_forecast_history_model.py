@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '../models') #Assumes this file lives in a tests folder next to the Models folder
+sys.path.append(fpath)
+import pytest
+
+np = pytest.importorskip("numpy")
+from Forecast_History_Model import HISTORY_DTYPE, ForecastHistory
+
+LOCATION = ("city", "new york")
+
+def forecast_payload(start, count, temp=10.0):
+    """Minimal /forecast payload with count 3-hourly entries starting at start."""
+    return {"list": [{"dt": start + 10800 * i,
+                      "main": {"temp": temp + i, "feels_like": temp + i - 2, "humidity": 50 + i},
+                      "wind": {"speed": 3.5}}
+                     for i in range(count)]}
+
+# --- Test Fixture ---
+@pytest.fixture
+def history(tmp_path):
+    return ForecastHistory(str(tmp_path / "forecast_history"), segment_rows=16)
+
+# --- Test Functions ---
+def test_append_and_query_round_trip(history):
+    """Test that appended entries come back as typed NumPy columns."""
+    assert history.append(LOCATION, forecast_payload(1000, 5), fetched_at=1) == 5
+    result = history.query(LOCATION)
+    assert list(result["dt"]) == [1000 + 10800 * i for i in range(5)]
+    assert result["temp"].dtype == np.float32
+    assert np.allclose(result["feels_like"], [8, 9, 10, 11, 12])
+    assert np.allclose(result["wind_speed"], 3.5)
+
+def test_query_time_range(history):
+    """Test that start is inclusive and end is exclusive."""
+    history.append(LOCATION, forecast_payload(0, 10), fetched_at=1)
+    result = history.query(LOCATION, start=10800 * 2, end=10800 * 5)
+    assert list(result["dt"]) == [10800 * 2, 10800 * 3, 10800 * 4]
+
+def test_latest_fetch_wins_for_repeated_timestamps(history):
+    """Test that overlapping forecasts report each timestamp once, from the newest fetch."""
+    history.append(LOCATION, forecast_payload(0, 4, temp=10), fetched_at=100)
+    history.append(LOCATION, forecast_payload(10800 * 2, 4, temp=20), fetched_at=200)
+    result = history.query(LOCATION)
+    assert list(result["dt"]) == [0, 10800, 10800 * 2, 10800 * 3, 10800 * 4, 10800 * 5]
+    assert list(result["fetched_at"]) == [100, 100, 200, 200, 200, 200]
+    assert len(history.query(LOCATION, latest_only=False)["dt"]) == 8
+
+def test_segments_roll_over_at_fixed_size(history):
+    """Test that large appends are split into fixed-size memory-mappable segments."""
+    history.append(LOCATION, forecast_payload(0, 40), fetched_at=1)
+    segments = history.read(LOCATION)
+    assert [len(segment) for segment in segments] == [16, 16, 8]
+    assert all(isinstance(segment, np.memmap) for segment in segments)
+    assert len(history.query(LOCATION)["dt"]) == 40
+
+def test_torn_trailing_record_is_ignored(history):
+    """Test that a partially written record at the end of a segment is skipped."""
+    history.append(LOCATION, forecast_payload(0, 3), fetched_at=1)
+    segment_path = history.read(LOCATION)[0].filename
+    with open(segment_path, "ab") as segment:
+        segment.write(b"\x00" * (HISTORY_DTYPE.itemsize // 2))
+    assert len(history.query(LOCATION)["dt"]) == 3
+    history.append(LOCATION, forecast_payload(10800 * 3, 1), fetched_at=2)
+    assert list(history.query(LOCATION)["fetched_at"]) == [1, 1, 1, 2]
+
+def test_locations_are_isolated(history):
+    """Test that each location has its own history and unknown ones are empty."""
+    history.append(LOCATION, forecast_payload(0, 2), fetched_at=1)
+    history.append(("coords", 51.5, -0.12), forecast_payload(0, 3), fetched_at=1)
+    assert len(history.query(("coords", 51.5, -0.12))["dt"]) == 3
+    assert len(history.query(("city", "boston"))["dt"]) == 0
+    assert history.locations() == [history.location_slug(LOCATION), history.location_slug(("coords", 51.5, -0.12))]
+    assert history.locations()[0].startswith("city-new_york-")
+
+@pytest.mark.parametrize("first, second", [("東京", "北京"), ("москва", "東京"), ("new york", "new_york")])
+def test_locations_with_the_same_readable_name_are_isolated(history, first, second):
+    """Test that cities whose names reduce to the same directory prefix do not share history."""
+    history.append(("city", first), forecast_payload(0, 2), fetched_at=1)
+    history.append(("city", second), forecast_payload(0, 3), fetched_at=1)
+    assert len(history.query(("city", first))["dt"]) == 2
+    assert len(history.query(("city", second))["dt"]) == 3
+    assert len(history.locations()) == 2
+
+def append_many(data_dir, writer, appends):
+    """Worker process: appends forecasts the way one gunicorn worker would."""
+    history = ForecastHistory(data_dir, segment_rows=16)
+    for fetched_at in range(appends):
+        history.append(LOCATION, forecast_payload(0, 5, temp=writer), fetched_at=writer * 1000 + fetched_at)
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_concurrent_processes_do_not_corrupt_segments(tmp_path):
+    """Test that several processes appending to one location keep every record and every segment bounded."""
+    data_dir = str(tmp_path / "forecast_history")
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=append_many, args=(data_dir, writer, 40)) for writer in range(4)]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join(30)
+    assert [process.exitcode for process in writers] == [0, 0, 0, 0]
+
+    history = ForecastHistory(data_dir, segment_rows=16)
+    segments = history.read(LOCATION)
+    assert all(len(segment) <= 16 for segment in segments)
+    records = np.concatenate(segments)
+    assert len(records) == 4 * 40 * 5
+    assert sorted(set(records["fetched_at"].tolist())) == [writer * 1000 + i for writer in range(4) for i in range(40)]
+    assert np.array_equal(records["temp"] - records["feels_like"], np.full(len(records), 2, dtype=np.float32))
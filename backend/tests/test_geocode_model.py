@@ -0,0 +1,75 @@
+import pytest
+import sqlite3
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '../models') #Assumes this file lives in a tests folder next to the Models folder
+sys.path.append(fpath)
+from Geocode_Model import GeocodeCache
+
+# --- Test Fixture ---
+@pytest.fixture(scope="function")
+def temp_database():
+    """Fixture to create a temporary SQLite database for testing."""
+    db_path = "test_geocode_model.db"
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    yield db_path
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+@pytest.fixture(scope="function")
+def geocode_model(temp_database):
+    """Fixture to create a GeocodeCache instance with a temporary database."""
+    geocodes = GeocodeCache(db_name=temp_database)
+    geocodes.initialize_table()
+    return geocodes
+
+# --- Test Functions ---
+def test_initialize_table_is_idempotent_and_keeps_rows(geocode_model):
+    """Test that re-initializing the table does not drop cached coordinates."""
+    geocode_model.set("New York", 40.71, -74.01)
+    geocode_model.initialize_table()
+    assert geocode_model.get("New York")["data"] == {"lat": 40.71, "lon": -74.01}
+
+def test_get_missing_city(geocode_model):
+    """Test get() returns an error packet for a city that is not cached."""
+    result = geocode_model.get("Atlantis")
+    assert result["status"] == "error"
+    assert result["data"] == "Location not cached!"
+
+def test_set_then_get(geocode_model):
+    """Test that stored coordinates can be read back."""
+    result = geocode_model.set("New York", 40.71, -74.01)
+    assert result["status"] == "success"
+    result = geocode_model.get("New York")
+    assert result["status"] == "success"
+    assert result["data"] == {"lat": 40.71, "lon": -74.01}
+
+def test_keys_are_normalized(geocode_model):
+    """Test that lookups ignore case and repeated whitespace."""
+    geocode_model.set("New York", 40.71, -74.01)
+    assert geocode_model.get("  new   YORK ")["status"] == "success"
+
+def test_set_replaces_existing_row(geocode_model):
+    """Test that setting a city twice keeps a single, updated row."""
+    geocode_model.set("New York", 1.0, 2.0)
+    geocode_model.set("new york", 40.71, -74.01)
+    assert geocode_model.get("New York")["data"] == {"lat": 40.71, "lon": -74.01}
+
+    conn = sqlite3.connect(geocode_model.db_name)
+    count = conn.execute(f"SELECT COUNT(*) FROM {geocode_model.table_name};").fetchone()[0]
+    conn.close()
+    assert count == 1
+
+def test_entries_survive_new_instance(geocode_model):
+    """Test that a second instance (e.g. another worker) sees the same rows."""
+    geocode_model.set("New York", 40.71, -74.01)
+    other_worker = GeocodeCache(db_name=geocode_model.db_name)
+    assert other_worker.get("New York")["data"] == {"lat": 40.71, "lon": -74.01}
+
+def test_remove(geocode_model):
+    """Test that remove() deletes the cached city."""
+    geocode_model.set("New York", 40.71, -74.01)
+    assert geocode_model.remove("New York")["data"] is True
+    assert geocode_model.remove("New York")["data"] is False
+    assert geocode_model.get("New York")["status"] == "error"
@@ -0,0 +1,129 @@
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a tests folder next to the utils folder
+sys.path.append(fpath)
+import io
+import json
+import logging
+import queue
+import random
+import threading
+import pytest
+from log import (REDACTED, DroppingQueueHandler, SamplingFilter,
+                 configure_logging, get_logger, new_request_id, redact, request_id)
+
+CONFIG = {"LOG_LEVEL": "info", "LOG_SAMPLE_RATES": "", "LOG_QUEUE_SIZE": 100}
+
+@pytest.fixture
+def stream():
+    return io.StringIO()
+
+@pytest.fixture
+def pipeline(stream):
+    pipeline = configure_logging(CONFIG, stream=stream)
+    yield pipeline
+    pipeline.stop()
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_records_are_written_as_json_lines(pipeline, stream):
+    """Test that records come out as one JSON object each, with extra fields and the request ID."""
+    token = request_id.set("req-1")
+    try:
+        get_logger("test").info("User %s", "created", extra={"event": "user.created", "user_id": 7})
+    finally:
+        request_id.reset(token)
+    pipeline.stop()
+    [entry] = lines(stream)
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "backend.test"
+    assert entry["message"] == "User created"
+    assert entry["request_id"] == "req-1"
+    assert entry["event"] == "user.created"
+    assert entry["user_id"] == 7
+
+def test_records_are_written_off_the_calling_thread(pipeline, stream):
+    """Test that the stream is written by the listener thread, not the thread that logged."""
+    writers = []
+    original_emit = pipeline.output.emit
+    pipeline.output.emit = lambda record: (writers.append(threading.current_thread()), original_emit(record))
+    get_logger("test").warning("slow disk")
+    pipeline.stop()
+    assert writers and threading.current_thread() not in writers
+
+def test_below_level_is_not_logged(pipeline, stream):
+    """Test that records under LOG_LEVEL are discarded."""
+    get_logger("test").debug("noise")
+    pipeline.stop()
+    assert lines(stream) == []
+
+def test_exceptions_are_rendered(pipeline, stream):
+    """Test that a logged exception's traceback survives the queue."""
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        get_logger("test").exception("Error creating user")
+    pipeline.stop()
+    [entry] = lines(stream)
+    assert entry["level"] == "ERROR"
+    assert "RuntimeError: boom" in entry["exception"]
+
+def test_secrets_are_redacted(pipeline, stream):
+    """Test that OAuth tokens and API keys never reach the log output."""
+    user_info = {"name": "Ann", "google_oauth_token": "ya29.secret", "nested": [{"token": "abc"}]}
+    get_logger("test").warning("Request to http://owm/data?q=Boston&appid=KEY123 failed",
+                               extra={"user_info": user_info})
+    pipeline.stop()
+    output = stream.getvalue()
+    assert "ya29.secret" not in output and "KEY123" not in output and "abc" not in output
+    [entry] = lines(stream)
+    assert entry["user_info"]["google_oauth_token"] == REDACTED
+    assert entry["user_info"]["name"] == "Ann"
+    assert f"appid={REDACTED}" in entry["message"]
+
+def test_redact_leaves_missing_secrets_alone():
+    """Test that a None token stays None rather than looking like one was sent."""
+    assert redact({"google_oauth_token": None}) == {"google_oauth_token": None}
+
+def test_sampling_keeps_a_fraction_of_an_event():
+    """Test that sampled events are kept at about their rate, and warnings are always kept."""
+    sampler = SamplingFilter(SamplingFilter.parse("http.request=0.1, other=1"), rng=random.Random(3))
+    def record(level, event):
+        entry = logging.LogRecord("backend.access", level, "", 0, "GET /weather 200", (), None)
+        entry.event = event
+        return entry
+    kept = sum(sampler.filter(record(logging.INFO, "http.request")) for _ in range(5000))
+    assert 350 < kept < 650
+    assert all(sampler.filter(record(logging.WARNING, "http.request")) for _ in range(100))
+    assert all(sampler.filter(record(logging.INFO, "user.created")) for _ in range(100))
+
+def test_invalid_sample_rates_are_rejected():
+    """Test that a malformed LOG_SAMPLE_RATES value raises ValueError."""
+    with pytest.raises(ValueError):
+        SamplingFilter.parse("http.request=often")
+
+def test_full_queue_drops_instead_of_blocking():
+    """Test that logging never waits when the queue is full; the dropped record is counted."""
+    handler = DroppingQueueHandler(queue.Queue(1))
+    for _ in range(3):
+        handler.handle(logging.LogRecord("backend.test", logging.INFO, "", 0, "m", (), None))
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
+
+def test_reconfiguring_replaces_the_pipeline(stream):
+    """Test that configuring again (e.g. a second app) does not stack handlers."""
+    first = configure_logging(CONFIG, stream=io.StringIO())
+    second = configure_logging(CONFIG, stream=stream)
+    try:
+        assert logging.getLogger("backend").handlers == [second.handler]
+        assert first.listener is None
+    finally:
+        second.stop()
+
+def test_request_ids():
+    """Test that well formed incoming IDs are kept and anything else is replaced."""
+    assert new_request_id("abc-123") == "abc-123"
+    generated = new_request_id("bad id\nwith newline")
+    assert generated != "bad id\nwith newline" and len(generated) == 16
+    assert new_request_id() != new_request_id()
@@ -0,0 +1,64 @@
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a tests folder next to the utils folder
+sys.path.append(fpath)
+import pytest
+from metrics import MetricsRegistry
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+def test_counter_renders_per_label(registry):
+    """Test that counters are tracked and rendered per combination of labels."""
+    responses = registry.counter("upstream_responses_total", "Final status", ("endpoint", "status"))
+    responses.inc("forecast", "200")
+    responses.inc("forecast", "200")
+    responses.inc("current", "429")
+    text = registry.render()
+    assert "# TYPE upstream_responses_total counter" in text
+    assert 'upstream_responses_total{endpoint="forecast",status="200"} 2' in text
+    assert 'upstream_responses_total{endpoint="current",status="429"} 1' in text
+
+def test_histogram_buckets_are_cumulative(registry):
+    """Test that histogram buckets count observations <= their bound, cumulatively."""
+    stages = registry.histogram("weather_stage_seconds", "Stage time", ("stage",), buckets=(0.01, 0.1, 1))
+    for value in (0.005, 0.01, 0.05, 2):
+        stages.observe(value, "geocode")
+    text = registry.render()
+    assert 'weather_stage_seconds_bucket{stage="geocode",le="0.01"} 2' in text
+    assert 'weather_stage_seconds_bucket{stage="geocode",le="0.1"} 3' in text
+    assert 'weather_stage_seconds_bucket{stage="geocode",le="1"} 3' in text
+    assert 'weather_stage_seconds_bucket{stage="geocode",le="+Inf"} 4' in text
+    assert 'weather_stage_seconds_count{stage="geocode"} 4' in text
+    assert 'weather_stage_seconds_sum{stage="geocode"} 2.065' in text
+
+def test_timer_observes_block(registry):
+    """Test that histogram.time() records one observation per block, even when it raises."""
+    stages = registry.histogram("weather_stage_seconds", "Stage time", ("stage",))
+    with stages.time("serialize"):
+        pass
+    with pytest.raises(RuntimeError):
+        with stages.time("serialize"):
+            raise RuntimeError
+    assert stages.count("serialize") == 2
+
+def test_collected_values_are_read_at_render(registry):
+    """Test that collected metrics call their function on every render."""
+    hits = {"weather": 1}
+    registry.collected("cache_hits_total", "Hits", "counter", ("cache",),
+                       lambda: {(name,): value for name, value in hits.items()})
+    assert 'cache_hits_total{cache="weather"} 1' in registry.render()
+    hits["weather"] = 5
+    assert 'cache_hits_total{cache="weather"} 5' in registry.render()
+
+def test_label_values_are_escaped(registry):
+    """Test that quotes, backslashes and newlines in label values are escaped."""
+    registry.counter("http_responses_total", "Responses", ("route",)).inc('a"b\\c\nd')
+    assert 'http_responses_total{route="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+def test_duplicate_names_are_rejected(registry):
+    """Test that a metric name can only be registered once."""
+    registry.counter("requests_total", "Requests")
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "Requests")
@@ -0,0 +1,120 @@
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a tests folder next to the utils folder
+sys.path.append(fpath)
+import pytest
+from prefetch import PrefetchScheduler
+
+class InlineExecutor:
+    """Runs submitted work immediately so scheduling decisions can be asserted synchronously."""
+    def submit(self, fn, *args):
+        fn(*args)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def upstream(clock):
+    """Fake cache + upstream: refresh() stores an entry valid for 300s."""
+    class Upstream:
+        def __init__(self):
+            self.expiry = {}
+            self.refreshed = []
+            self.failing = set()
+
+        def refresh(self, location):
+            self.refreshed.append(location)
+            if location in self.failing:
+                raise RuntimeError("upstream down")
+            self.expiry[location] = clock.now + 300
+
+        def expires_in(self, location):
+            if location not in self.expiry or self.expiry[location] <= clock.now:
+                return None
+            return self.expiry[location] - clock.now
+    return Upstream()
+
+@pytest.fixture
+def scheduler(upstream, clock):
+    return PrefetchScheduler(upstream.refresh, upstream.expires_in, lead_time=30, idle_timeout=600,
+                             backoff_base=60, backoff_max=600, executor=InlineExecutor(),
+                             timer=clock)
+
+def test_uncached_location_is_refreshed_immediately(scheduler, upstream):
+    """Test that a newly tracked location with nothing cached is fetched on the next pass."""
+    scheduler.track("New York", pinned=True)
+    assert scheduler.run_once() == ["New York"]
+    assert upstream.refreshed == ["New York"]
+
+def test_refresh_happens_only_within_lead_time(scheduler, upstream, clock):
+    """Test that a fresh entry is left alone until it is about to expire."""
+    scheduler.track("New York", pinned=True)
+    scheduler.run_once()
+    clock.now += 200
+    assert scheduler.run_once() == []
+    clock.now += 75  # 25s left, inside the 30s lead time
+    assert scheduler.run_once() == ["New York"]
+    assert scheduler.stats()["refreshes"] == 2
+
+def test_idle_locations_are_forgotten_unless_pinned(scheduler, clock):
+    """Test that unrequested cities stop being refreshed while pinned ones stay tracked."""
+    scheduler.track("New York", pinned=True)
+    scheduler.track("Boston")
+    clock.now += 601
+    scheduler.run_once()
+    assert scheduler.stats()["tracked"] == 1
+
+def test_failed_refresh_backs_off(scheduler, upstream, clock):
+    """Test that a failing location is not retried on every pass."""
+    upstream.failing.add("Boston")
+    scheduler.track("Boston")
+    scheduler.run_once()
+    assert scheduler.stats()["refresh_errors"] == 1
+    assert scheduler.stats()["backing_off"] == 1
+    clock.now += 5
+    assert scheduler.run_once() == []
+    clock.now += 60
+    assert scheduler.run_once() == ["Boston"]
+
+    upstream.failing.clear()
+    clock.now += 600
+    scheduler.run_once()
+    assert scheduler.stats()["backing_off"] == 0
+
+def test_tracked_locations_are_capped(upstream, clock):
+    """Test that past max_tracked the least recently requested unpinned location is dropped."""
+    scheduler = PrefetchScheduler(upstream.refresh, upstream.expires_in, max_tracked=3,
+                                  executor=InlineExecutor(), timer=clock)
+    scheduler.track("New York", pinned=True)
+    for city in ["Boston", "Denver", "Austin"]:
+        clock.now += 1
+        scheduler.track(city)
+    clock.now += 1
+    scheduler.track("Denver")
+    clock.now += 1
+    scheduler.track("Miami")
+    assert sorted(scheduler.run_once()) == ["Denver", "Miami", "New York"]
+    assert scheduler.stats()["tracked"] == 3
+    assert scheduler.stats()["evictions"] == 2
+
+def test_locations_are_tracked_after_min_requests(upstream, clock):
+    """Test that a location requested only once is not refreshed in the background."""
+    scheduler = PrefetchScheduler(upstream.refresh, upstream.expires_in, idle_timeout=600, min_requests=2,
+                                  executor=InlineExecutor(), timer=clock)
+    scheduler.track("Boston")
+    assert scheduler.run_once() == []
+    assert scheduler.stats()["candidates"] == 1
+    clock.now += 601  # a second request after the first went idle counts as a first request again
+    scheduler.track("Boston")
+    assert scheduler.run_once() == []
+    scheduler.track("Boston")
+    assert scheduler.run_once() == ["Boston"]
+    assert scheduler.stats()["candidates"] == 0
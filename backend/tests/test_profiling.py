@@ -0,0 +1,76 @@
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a tests folder next to the utils folder
+sys.path.append(fpath)
+import pstats
+import random
+import pytest
+from profiling import RouteProfiler
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def timer():
+    return FakeTimer()
+
+@pytest.fixture
+def profiler(tmp_path, timer):
+    return RouteProfiler(str(tmp_path), routes=["/weather", " /users"], sample_rate=1.0,
+                         admin_token="secret", flush_interval=60, timer=timer)
+
+def profile_work(profiler, route):
+    profile = profiler.start()
+    assert profile is not None
+    sorted(random.random() for _ in range(100))
+    profiler.finish(route, profile)
+
+def test_wants_matches_route_prefixes(profiler):
+    """Test that configured routes match themselves and their sub-paths, but not look-alikes."""
+    assert profiler.wants("/weather")
+    assert profiler.wants("/weather/batch")
+    assert profiler.wants("/users/bulk")
+    assert not profiler.wants("/weatherman")
+    assert not profiler.wants("/metrics")
+
+def test_wants_samples_by_rate(tmp_path):
+    """Test that only about sample_rate of matching requests are profiled."""
+    profiler = RouteProfiler(str(tmp_path), routes=["/weather"], sample_rate=0.25, rng=random.Random(1))
+    picked = sum(profiler.wants("/weather") for _ in range(4000))
+    assert 800 < picked < 1200
+    assert not RouteProfiler(str(tmp_path), routes=["/weather"], sample_rate=0).wants("/weather")
+
+def test_admin_token_profiles_any_route(tmp_path):
+    """Test that the admin header profiles a request regardless of route and sampling, and only with the right token."""
+    profiler = RouteProfiler(str(tmp_path), routes=(), sample_rate=0, admin_token="secret")
+    assert profiler.wants("/metrics", "secret")
+    assert not profiler.wants("/metrics", "guess")
+    assert not profiler.wants("/metrics")
+    assert not RouteProfiler(str(tmp_path), routes=(), admin_token=None).wants("/metrics", "")
+
+def test_profiles_are_aggregated_per_route(profiler, tmp_path):
+    """Test that flush writes one pstats file per route, aggregating every profiled request."""
+    for _ in range(3):
+        profile_work(profiler, "/weather")
+    profile_work(profiler, "/users/delete/<email>")
+    assert os.listdir(tmp_path) == []
+
+    paths = profiler.flush()
+    names = sorted(os.path.basename(path) for path in paths)
+    assert names == [f"users_delete_email.{os.getpid()}.prof", f"weather.{os.getpid()}.prof"]
+    stats = pstats.Stats(os.path.join(tmp_path, f"weather.{os.getpid()}.prof"))
+    calls = [entry[1] for func, entry in stats.stats.items() if func[2] == "<built-in method builtins.sorted>"]
+    assert calls == [3]
+    assert profiler.flush() == []
+
+def test_flushes_after_interval(profiler, timer, tmp_path):
+    """Test that finishing a profile writes the aggregates once flush_interval has passed."""
+    profile_work(profiler, "/weather")
+    assert os.listdir(tmp_path) == []
+    timer.now = 61
+    profile_work(profiler, "/weather")
+    assert os.listdir(tmp_path) == [f"weather.{os.getpid()}.prof"]
@@ -0,0 +1,37 @@
+import os
+import sys
+from datetime import datetime, timezone
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a tests folder next to the utils folder
+sys.path.append(fpath)
+from time_format import format_clock, format_local_times, get_zone
+
+def epoch(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+def test_format_clock():
+    """Test 12-hour formatting, dropping :00 minutes."""
+    assert format_clock(0, 0) == "12AM"
+    assert format_clock(9, 0) == "9AM"
+    assert format_clock(12, 0) == "12PM"
+    assert format_clock(15, 30) == "3:30PM"
+    assert format_clock(23, 5) == "11:05PM"
+
+def test_offset_path_matches_forecast_timezone():
+    """Test that a UTC offset from the API shifts epoch times into local clock time."""
+    timestamps = [epoch(2025, 7, 1, 0), epoch(2025, 7, 1, 3), epoch(2025, 7, 1, 18, 30)]
+    assert format_local_times(timestamps, utc_offset=-4 * 3600) == ["8PM", "11PM", "2:30PM"]
+    assert format_local_times(timestamps, utc_offset=19800) == ["5:30AM", "8:30AM", "12AM"]
+
+def test_zone_fallback_handles_daylight_saving():
+    """Test that without an offset times use the default zone, including DST."""
+    assert format_local_times([epoch(2025, 1, 15, 12)]) == ["7AM"]
+    assert format_local_times([epoch(2025, 7, 15, 12)]) == ["8AM"]
+
+def test_offset_and_zone_paths_agree():
+    """Test that both paths give the same answer when the offset matches the zone."""
+    timestamps = [epoch(2025, 7, 15, 0) + 10800 * i for i in range(8)]
+    assert format_local_times(timestamps, utc_offset=-4 * 3600) == format_local_times(timestamps)
+
+def test_zones_are_cached():
+    """Test that zone lookups are served from the cache."""
+    assert get_zone("America/New_York") is get_zone("America/New_York")
@@ -0,0 +1,119 @@
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a tests folder next to the utils folder
+sys.path.append(fpath)
+import pytest
+from ttl_cache import TTLCache
+
+class FakeClock:
+    """Manually advanced clock so expiry can be tested without sleeping."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def cache(clock):
+    return TTLCache(maxsize=3, ttl=10, timer=clock)
+
+def test_get_missing_key_counts_miss(cache):
+    """Test that looking up a missing key returns the default and counts a miss."""
+    assert cache.get("missing") is None
+    assert cache.get("missing", "default") == "default"
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["hits"] == 0
+
+def test_set_then_get_counts_hit(cache):
+    """Test that a stored value is returned and counted as a hit."""
+    cache.set(("forecast", "New York"), {"list": []})
+    assert cache.get(("forecast", "New York")) == {"list": []}
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 0
+    assert stats["hit_ratio"] == 1.0
+
+def test_entry_expires_after_default_ttl(cache, clock):
+    """Test that entries expire once the default ttl has passed."""
+    cache.set("key", "value")
+    clock.now = 9.9
+    assert cache.get("key") == "value"
+    clock.now = 10
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+def test_per_entry_ttl_overrides_default(cache, clock):
+    """Test that a ttl passed to set() overrides the cache default."""
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2, ttl=100)
+    clock.now = 50
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+def test_none_ttl_never_expires(clock):
+    """Test that a cache created with ttl=None keeps entries indefinitely."""
+    cache = TTLCache(maxsize=2, ttl=None, timer=clock)
+    cache.set("key", "value")
+    clock.now = 10 ** 9
+    assert cache.get("key") == "value"
+
+def test_lru_eviction_drops_least_recently_used(cache):
+    """Test that exceeding maxsize evicts the least recently used entry."""
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    cache.get("a")  # a is now most recently used
+    cache.set("d", 4)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get("d") == 4
+    assert cache.stats()["evictions"] == 1
+    assert len(cache) == 3
+
+def test_invalidate_and_clear(cache):
+    """Test that invalidate() removes one entry and clear() removes all."""
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.invalidate("a") is True
+    assert cache.invalidate("a") is False
+    assert "a" not in cache
+    cache.clear()
+    assert len(cache) == 0
+
+def test_invalid_maxsize_raises():
+    """Test that a non-positive maxsize is rejected."""
+    with pytest.raises(ValueError):
+        TTLCache(maxsize=0)
+
+def test_expires_in_reports_remaining_ttl(cache, clock):
+    """Test that expires_in() reports time left without counting a lookup."""
+    cache.set("a", 1)
+    cache.set("forever", 2, ttl=float("inf"))
+    clock.now = 4
+    assert cache.expires_in("a") == 6
+    assert cache.expires_in("forever") == float("inf")
+    assert cache.expires_in("missing") is None
+    clock.now = 10
+    assert cache.expires_in("a") is None
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 0
+
+def test_peek_does_not_count_or_reorder(clock):
+    """Test that peek() reads a value without counting a lookup or saving it from eviction."""
+    small = TTLCache(maxsize=2, ttl=10, timer=clock)
+    small.set("a", 1)
+    small.set("b", 2)
+    assert small.peek("a") == 1
+    assert small.peek("missing", "default") == "default"
+    small.set("c", 3)
+    assert "a" not in small
+    clock.now = 10
+    assert small.peek("b") is None
+    assert small.stats()["hits"] == 0
+    assert small.stats()["misses"] == 0
@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+fpath = os.path.join(os.path.dirname(__file__), '../utils') #Assumes this file lives in a tests folder next to the utils folder
+sys.path.append(fpath)
+import pytest
+
+requests = pytest.importorskip("requests")
+from upstream_client import UpstreamClient
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the upstream API with a few scripted behaviours."""
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse can be observed
+    flaky_failures = {}
+
+    def do_GET(self):
+        if self.path.startswith("/ok"):
+            self._send(200, {"ok": True})
+        elif self.path.startswith("/flaky"):
+            remaining = StandInHandler.flaky_failures.get(self.path, 0)
+            if remaining > 0:
+                StandInHandler.flaky_failures[self.path] = remaining - 1
+                self._send(503, {"error": "unavailable"})
+            else:
+                self._send(200, {"ok": True})
+        elif self.path.startswith("/missing"):
+            self._send(404, {"error": "not found"})
+        elif self.path.startswith("/slow"):
+            time.sleep(0.5)
+            self._send(200, {"ok": True})
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client():
+    upstream = UpstreamClient(max_retries=2, sleep=lambda seconds: None)
+    yield upstream
+    upstream.close()
+
+def test_get_json_success(client, server_url):
+    """Test that a JSON body is decoded and returned."""
+    assert client.get_json(f"{server_url}/ok") == {"ok": True}
+
+def test_keep_alive_connection_is_reused(client, server_url):
+    """Test that sequential requests share one pooled connection."""
+    for _ in range(5):
+        client.get_json(f"{server_url}/ok")
+    stats = client.stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+
+def test_retryable_status_is_retried(client, server_url):
+    """Test that a transient 503 is retried until it succeeds."""
+    StandInHandler.flaky_failures["/flaky/a"] = 2
+    assert client.get_json(f"{server_url}/flaky/a") == {"ok": True}
+    assert client.stats()["retries"] == 2
+
+def test_retries_are_bounded(client, server_url):
+    """Test that a persistent 503 is returned after max_retries and raises from get_json."""
+    StandInHandler.flaky_failures["/flaky/b"] = 10
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(f"{server_url}/flaky/b")
+    stats = client.stats()
+    assert stats["requests"] == 3
+    assert stats["failures"] == 1
+
+def test_client_errors_are_not_retried(client, server_url):
+    """Test that a 404 is returned immediately without retrying."""
+    assert client.get(f"{server_url}/missing").status_code == 404
+    assert client.stats()["retries"] == 0
+
+def test_read_timeout_raises_after_retries(server_url):
+    """Test that a slow upstream cannot hang the caller past its read timeout."""
+    upstream = UpstreamClient(read_timeout=0.05, max_retries=1, sleep=lambda seconds: None)
+    with pytest.raises(requests.exceptions.Timeout):
+        upstream.get(f"{server_url}/slow")
+    assert upstream.stats()["retries"] == 1
+    upstream.close()
+
+def test_backoff_is_jittered_and_capped():
+    """Test that backoff delays stay within the exponential envelope and the cap."""
+    upstream = UpstreamClient(backoff_base=0.1, backoff_max=0.3)
+    for attempt in range(6):
+        delay = upstream.backoff(attempt)
+        assert 0 <= delay <= min(0.3, 0.1 * 2 ** attempt)
+    assert upstream.backoff(0, retry_after=10) == 0.3
+    upstream.close()
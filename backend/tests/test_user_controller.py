@@ -0,0 +1,338 @@
+import os
+import sys
+fpath = os.path.join(os.path.dirname(__file__), '..') #Assumes this file lives in a tests folder inside the backend folder
+sys.path.append(fpath)
+sys.path.append(os.path.join(fpath, 'benchmarks'))
+import asyncio
+import json
+import sqlite3
+import pytest
+import requests
+from fake_owm import FakeOpenWeatherMap, FakeOpenWeatherMapHandler
+from controllers.User_Controller import Location
+from server import create_app
+
+@pytest.fixture(scope="module")
+def upstream():
+    """Fixture running the local OpenWeatherMap stand-in for the routes to call."""
+    server = FakeOpenWeatherMap().start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def app(upstream, tmp_path):
+    """Fixture building the Flask app against a temporary database and the stand-in upstream."""
+    app = create_app({"OWM_BASE_URL": upstream.base_url, "API_KEY": "test-key",
+                      "DB_PATH": str(tmp_path / "test_user_controller.db"),
+                      "FORECAST_HISTORY_DIR": str(tmp_path / "forecast_history"),
+                      "WEATHER_PREFETCH_ENABLED": False})
+    yield app
+    app.extensions["user_controller"].users.close()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def users(app):
+    """Fixture creating one user per preference profile; returns {preference: email}."""
+    model = app.extensions["user_controller"].users
+    model.initialize_table()
+    emails = {}
+    for preference in model.preferences:
+        emails[preference] = f"{preference}@example.com"
+        model.create({"name": preference, "email": emails[preference], "preference_temperature": preference,
+                      "google_oauth_token": None})
+    return emails
+
+@pytest.fixture
+def async_app(app, tmp_path, monkeypatch):
+    """Fixture building the ASGI app on the sync app's database and upstream."""
+    config = {name: app.config[name] for name in ("OWM_BASE_URL", "API_KEY", "DB_PATH", "WEATHER_PREFETCH_ENABLED")}
+    config["FORECAST_HISTORY_DIR"] = str(tmp_path / "async_forecast_history")
+    # asgi.py builds a module-level app on import; keep that one off the real database too
+    for name, value in config.items():
+        monkeypatch.setenv(name, str(value))
+    from asgi import create_asgi_app
+    async_app = create_asgi_app(config)
+    yield async_app
+    async_app.extensions["user_controller"].users.close()
+
+def get_async(app, path, query_string):
+    """(status, JSON body) of one request to a Quart app, served with its startup hooks run"""
+    async def request():
+        async with app.test_app() as test_app:
+            response = await test_app.test_client().get(path, query_string=query_string)
+            return response.status_code, await response.get_json()
+    return asyncio.run(request())
+
+@pytest.fixture
+def garbled_current(monkeypatch):
+    """Fixture making the stand-in answer current weather for "Garbled" with a 200 that is not JSON."""
+    send_json = FakeOpenWeatherMapHandler.send_json
+    def garbled_send_json(handler, status, body, headers=None):
+        if status != 200 or not handler.path.startswith("/data/2.5/weather?") or "q=Garbled" not in handler.path:
+            return send_json(handler, status, body, headers)
+        payload = b"<html>Service Unavailable</html>"
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/html")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+    monkeypatch.setattr(FakeOpenWeatherMapHandler, "send_json", garbled_send_json)
+
+@pytest.fixture
+def upstream_calls(app):
+    """Fixture recording (url, params) of every call the controller makes upstream."""
+    calls = []
+    upstream_client = app.extensions["user_controller"].upstream
+    get_json = upstream_client.get_json
+    def recording_get_json(url, params=None, timeout=None):
+        calls.append((url, params))
+        return get_json(url, params=params, timeout=timeout)
+    upstream_client.get_json = recording_get_json
+    return calls
+
+# --- Upstream Request Tests ---
+@pytest.mark.parametrize("city", ["Paris&units=imperial", "Paris#fragment", "Paris&appid=stolen"])
+def test_city_is_encoded_in_upstream_queries(client, upstream_calls, city):
+    """Test that a city containing query syntax is sent as one q value and cannot change the query."""
+    response = client.get("/weather", query_string={"city": city})
+    assert response.status_code == 200
+    assert response.get_json()["current_weather_data"]["city"] == city
+    sent = {url.rsplit("/", 1)[-1]: params for url, params in upstream_calls}
+    assert sent["direct"]["q"] == city and sent["direct"]["appid"] == "test-key"
+    assert sent["weather"]["q"] == city and sent["weather"]["appid"] == "test-key"
+    assert sent["weather"]["units"] == "metric"
+    assert all("?" not in url for url, params in upstream_calls)
+
+# --- Startup Tests ---
+def test_app_start_installs_preference_stats(upstream, tmp_path):
+    """Test that building the app adds the preference counters to a database created without them."""
+    db_path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""CREATE TABLE users (id INTEGER PRIMARY KEY UNIQUE, name TEXT NOT NULL, email TEXT UNIQUE NOT NULL,
+                    preference_temperature TEXT DEFAULT 'neutral', google_oauth_token TEXT)""")
+    conn.execute("INSERT INTO users (name, email, preference_temperature) VALUES ('Ann', 'ann@example.com', 'gets_hot_easily')")
+    conn.commit()
+    conn.close()
+    app = create_app({"OWM_BASE_URL": upstream.base_url, "API_KEY": "test-key", "DB_PATH": db_path,
+                      "FORECAST_HISTORY_DIR": str(tmp_path / "forecast_history"),
+                      "WEATHER_PREFETCH_ENABLED": False})
+    users = app.extensions["user_controller"].users
+    try:
+        assert users.get_preference_stats()["data"] == {"neutral": 0, "gets_cold_easily": 0, "gets_hot_easily": 1}
+    finally:
+        users.close()
+
+# --- Conditional Request Tests ---
+def test_weather_etag_revalidation(client, users):
+    """Test that a matching If-None-Match gets a 304, for the identity and gzip ETags, until the body changes."""
+    query = {"city": "Boston", "email": users["neutral"]}
+    first = client.get("/weather", query_string=query)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag
+
+    unchanged = client.get("/weather", query_string=query, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+    assert unchanged.data == b""
+
+    gzipped = client.get("/weather", query_string=query, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    gzip_etag = gzipped.headers["ETag"]
+    assert gzip_etag == etag[:-1] + '-gzip"'
+    revalidated = client.get("/weather", query_string=query,
+                             headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == gzip_etag
+
+    response = client.put("/users/preference", json={"email": users["neutral"], "preference": "gets_cold_easily"})
+    assert response.status_code == 200
+    changed = client.get("/weather", query_string=query, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["current_weather_data"]["userPreference"] == "gets_cold_easily"
+
+# --- Field Projection Tests ---
+def test_weather_fields_projection(client, users, upstream_calls):
+    """Test that fields= returns only the requested subtrees, matching the full response."""
+    full = client.get("/weather", query_string={"city": "Boston", "email": users["gets_hot_easily"]}).get_json()
+    response = client.get("/weather", query_string={
+        "city": "Boston", "email": users["gets_hot_easily"],
+        "fields": "current_weather_data.city,current_weather_data.clothingRecommendation,hourly_forecast_data"})
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "current_weather_data": {"city": "Boston",
+                                 "clothingRecommendation": full["current_weather_data"]["clothingRecommendation"]},
+        "hourly_forecast_data": full["hourly_forecast_data"],
+    }
+
+def test_weather_user_fields_skip_upstream(client, users, upstream_calls):
+    """Test that a projection of user-only fields is answered without calling OpenWeatherMap."""
+    response = client.get("/weather", query_string={"email": users["gets_cold_easily"],
+                                                    "fields": "current_weather_data.userPreference"})
+    assert response.status_code == 200
+    assert response.get_json() == {"current_weather_data": {"userPreference": "gets_cold_easily"}}
+    assert upstream_calls == []
+
+@pytest.mark.parametrize("fields", ["current_weather_data.pressure", "daily_forecast_data", "hourly_forecast_data.list"])
+def test_weather_unknown_fields_are_rejected(client, upstream_calls, fields):
+    """Test that an unknown field is a 400 naming it, before anything is fetched."""
+    response = client.get("/weather", query_string={"city": "Boston", "fields": fields})
+    assert response.status_code == 400
+    assert fields in response.get_json()["error"]
+    assert upstream_calls == []
+
+# --- Snapshot Tests ---
+def test_one_snapshot_serves_every_preference(app, client, users, upstream_calls, monkeypatch):
+    """Test that users with different preferences are served from one fetch and one snapshot."""
+    controller = app.extensions["user_controller"]
+    builds = []
+    build_snapshot = controller.build_snapshot
+    monkeypatch.setattr(controller, "build_snapshot", lambda *args: builds.append(args) or build_snapshot(*args))
+    bodies = {preference: client.get("/weather", query_string={"city": "Boston", "email": email}).get_json()
+              for preference, email in users.items()}
+    assert len(builds) == 1
+    assert len(upstream_calls) == 3  # geocode, forecast, current
+
+    snapshot = controller.snapshots.get(controller.location_key(Location("Boston", None, None)))
+    current = snapshot["current"]
+    for preference, body in bodies.items():
+        assert body["current_weather_data"]["userPreference"] == preference
+        assert body["current_weather_data"]["clothingRecommendation"] == controller.get_clothing_recommendation(
+            current["main"]["feels_like"], current["weather"][0]["description"], preference, snapshot["will_rain"])
+        assert body["hourly_forecast_data"] == bodies["neutral"]["hourly_forecast_data"]
+
+# --- Async App Tests ---
+@pytest.mark.parametrize("query", [
+    {"city": "Boston"},
+    {"lat": "40.7128", "lon": "-74.006"},
+    {"city": "Boston", "fields": "current_weather_data.feelsLike,hourly_forecast_data"},
+])
+def test_async_weather_matches_sync(client, async_app, users, query):
+    """Test that the ASGI app returns exactly the body the Flask app does, for every preference."""
+    for email in users.values():
+        expected = client.get("/weather", query_string=dict(query, email=email))
+        assert get_async(async_app, "/weather", dict(query, email=email)) == (200, expected.get_json())
+
+def test_async_weather_matches_sync_for_invalid_upstream_json(client, async_app, garbled_current):
+    """Test that a 200 upstream response that is not JSON is the same 500 error in both apps."""
+    expected = client.get("/weather", query_string={"city": "Garbled"})
+    assert (expected.status_code, expected.get_json()) == (500, {"error": "Failed to retrieve weather data"})
+    assert get_async(async_app, "/weather", {"city": "Garbled"}) == (500, {"error": "Failed to retrieve weather data"})
+
+def test_async_weather_rejects_unknown_fields(async_app):
+    """Test that the ASGI app answers an unknown field with the same 400 as the Flask app."""
+    status, body = get_async(async_app, "/weather", {"city": "Boston", "fields": "current_weather_data.pressure"})
+    assert status == 400
+    assert "current_weather_data.pressure" in body["error"]
+
+# --- Batch Weather Tests ---
+def test_weather_batch_fetches_case_variants_once(client, upstream_calls):
+    """Test that spellings of one city differing in case and spacing are fetched and returned once."""
+    response = client.post("/weather/batch", json={"locations": ["Boston", "boston", " BOSTON ", {"city": "Boston"}]})
+    assert response.status_code == 200
+    [result] = response.get_json()["results"]
+    assert result["location"] == {"city": "Boston"}
+    assert result["status"] == 200
+    assert result["data"] == client.get("/weather", query_string={"city": "Boston"}).get_json()
+    assert len(upstream_calls) == 3  # geocode, forecast, current
+
+def test_weather_batch_reports_each_failure(app, client, monkeypatch):
+    """Test that one location failing upstream gets its own status without failing the others."""
+    upstream_client = app.extensions["user_controller"].upstream
+    get_json = upstream_client.get_json
+    def failing_get_json(url, params=None, timeout=None):
+        if url.endswith("/data/2.5/weather") and (params or {}).get("q") == "Atlantis":
+            raise requests.exceptions.ConnectionError("connection refused")
+        return get_json(url, params=params, timeout=timeout)
+    monkeypatch.setattr(upstream_client, "get_json", failing_get_json)
+    response = client.post("/weather/batch", json={"locations": ["Boston", "Atlantis", {"lat": 40.7, "lon": -74.0}]})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == [200, 500, 200]
+    assert results[1] == {"location": {"city": "Atlantis"}, "status": 500, "error": "Failed to retrieve weather data"}
+    assert results[2]["location"] == {"lat": 40.7, "lon": -74.0}
+
+@pytest.mark.parametrize("body", [{"locations": "Boston"}, {"locations": []}, ["Boston"], {"locations": [42]}])
+def test_weather_batch_rejects_malformed_bodies(client, upstream_calls, body):
+    """Test that a batch without a list of valid locations is a 400 and nothing is fetched."""
+    response = client.post("/weather/batch", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+    assert upstream_calls == []
+
+# --- Bulk User Tests ---
+def test_bulk_users_from_ndjson_report_each_row(app, client, users):
+    """Test that an NDJSON import reports per-row results, including a malformed line and a duplicate email."""
+    lines = [
+        json.dumps({"name": "Ann", "email": "ann@example.com", "preference_temperature": "gets_cold_easily"}),
+        '{"name": "Bob", "email": ',
+        "",
+        json.dumps({"name": "Ann again", "email": "ann@example.com"}),
+        json.dumps({"name": "Cy", "email": "cy@example.com"}),
+    ]
+    response = client.post("/users/bulk", data="\n".join(lines) + "\n", content_type="application/x-ndjson")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["created"], body["failed"]) == (2, 2)
+    assert [(row["index"], row["status"]) for row in body["results"]] == [
+        (0, "success"), (1, "error"), (2, "error"), (3, "success")]
+    model = app.extensions["user_controller"].users
+    assert model.get(email="ann@example.com")["data"]["preference_temperature"] == "gets_cold_easily"
+    assert model.get(email="cy@example.com")["status"] == "success"
+
+def test_bulk_users_accept_a_json_array(client, users):
+    """Test that a small JSON array body is imported like NDJSON."""
+    response = client.post("/users/bulk", json=[{"name": "Ann", "email": "ann@example.com"},
+                                                {"name": "Existing", "email": users["neutral"]}])
+    assert response.status_code == 200
+    assert [row["status"] for row in response.get_json()["results"]] == ["success", "error"]
+
+@pytest.mark.parametrize("body", ['{"name": "Ann", "email": "ann@example.com"}', "not json", '"users"'])
+def test_bulk_users_reject_json_that_is_not_an_array(client, users, body):
+    """Test that a JSON body other than an array of users is a 400."""
+    response = client.post("/users/bulk", data=body, content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Expected a JSON array of users"}
+
+# --- Metrics Tests ---
+def test_geocode_cache_counts_only_real_lookups(app, client):
+    """Test that computing max-age does not count as a geocode cache hit."""
+    assert client.get("/weather", query_string={"city": "Boston"}).status_code == 200
+    stats = app.extensions["user_controller"].geocode_memory.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 1)
+
+# --- Prefetch Tests ---
+def test_refresh_fetches_only_expiring_payloads(app, client, upstream_calls):
+    """Test that a prefetch refresh re-fetches the payload near expiry and keeps the fresh one."""
+    controller = app.extensions["user_controller"]
+    location = Location("Boston", None, None)
+    client.get("/weather", query_string={"city": "Boston"})
+    forecast = controller.fetch_weather_payloads(location)["forecast"]
+    del upstream_calls[:]
+
+    controller.refresh_location(location)
+    assert upstream_calls == []
+
+    current_key = ("current", "boston")
+    controller.weather_cache.set(current_key, controller.weather_cache.get(current_key), ttl=5)  # inside the lead time
+    controller.refresh_location(location)
+    assert [url.rsplit("/", 1)[-1] for url, params in upstream_calls] == ["weather"]
+    assert controller.fetch_weather_payloads(location)["forecast"] is forecast
+
+def test_each_spelling_of_a_city_is_shown_as_requested(app, client, upstream_calls):
+    """Test that spellings sharing one snapshot each get their own city name and ETag."""
+    lower = client.get("/weather", query_string={"city": "boston"})
+    upper = client.get("/weather", query_string={"city": "BOSTON"})
+    assert len(upstream_calls) == 3  # one fetch serves both spellings
+    assert lower.get_json()["current_weather_data"]["city"] == "boston"
+    assert upper.get_json()["current_weather_data"]["city"] == "BOSTON"
+    assert lower.get_json()["hourly_forecast_data"] == upper.get_json()["hourly_forecast_data"]
+    assert lower.headers["ETag"] != upper.headers["ETag"]
+    projected = client.get("/weather", query_string={"city": "Boston", "fields": "current_weather_data.city"})
+    assert projected.get_json() == {"current_weather_data": {"city": "Boston"}}
+    revalidated = client.get("/weather", query_string={"city": "BOSTON"}, headers={"If-None-Match": lower.headers["ETag"]})
+    assert revalidated.status_code == 200
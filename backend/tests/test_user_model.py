@@ -2,6 +2,7 @@ import pytest
 import sqlite3
 import os
 import sys
+import threading
 fpath = os.path.join(os.path.dirname(__file__), '../models') #Assumes this file lives in a tests folder next to the Models folder
 sys.path.append(fpath)
 import User_Model
@@ -13,18 +14,21 @@ from sample_user_data import SAMPLE_USERS
 def temp_database():
     """Fixture to create a temporary SQLite database for testing."""
     db_path = "test_user_model.db"
-    if os.path.exists(db_path):
-        os.remove(db_path)
+    for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
     yield db_path
-    if os.path.exists(db_path):
-        os.remove(db_path)
+    for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
 
 @pytest.fixture(scope="function")
 def user_model(temp_database):
     """Fixture to create a User model instance with a temporary database."""
     user = User(db_name=temp_database, table_name="users")
     user.initialize_table()
-    return user
+    yield user
+    user.close()
 
 @pytest.fixture
 def valid_user_data():
@@ -663,4 +667,292 @@ def test_remove_only_removes_specified_user(user_model):
             cursor.execute(f"SELECT * FROM {user_model.table_name} WHERE email = ?;", (user_data["email"],))
             user_from_db = cursor.fetchone()
             assert user_from_db is not None, f"User with email {user_data['email']} was incorrectly removed"
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+# --- Tests for connection pooling ---
+def test_connections_use_wal_journal_mode(user_model):
+    """Test that the model's connections run in WAL mode."""
+    user_model.create(SAMPLE_USERS[0])
+    conn = sqlite3.connect(user_model.db_name)
+    journal_mode = conn.execute("PRAGMA journal_mode;").fetchone()[0]
+    conn.close()
+    assert journal_mode == "wal"
+
+def test_connection_is_reused_within_a_thread(user_model):
+    """Test that repeated and nested calls on one thread share a single connection."""
+    for user_data in SAMPLE_USERS:
+        user_model.create(user_data)
+    user_model.update_preference(SAMPLE_USERS[0]["email"], "neutral")
+    user_model.remove(SAMPLE_USERS[1]["email"])
+    stats = user_model.pool_stats()
+    assert stats["connections_opened"] == 1
+    assert stats["open_connections"] == 1
+    assert stats["checkouts"] > len(SAMPLE_USERS)
+
+def test_each_thread_gets_its_own_connection(user_model):
+    """Test that concurrent threads each open one connection and see committed writes."""
+    user_model.cache_size = 0  # every read goes to the database
+    user_model.create(SAMPLE_USERS[0])
+    results = []
+    def read_user():
+        results.append(user_model.get(email=SAMPLE_USERS[0]["email"])["status"])
+    threads = [threading.Thread(target=read_user) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["success"] * 3
+    assert user_model.pool_stats()["connections_opened"] == 4
+
+def test_connections_of_finished_threads_are_closed(user_model):
+    """Test that short-lived threads (e.g. one per request) do not leave their connections open."""
+    user_model.cache_size = 0  # every read goes to the database
+    user_model.create(SAMPLE_USERS[0])
+    for _ in range(50):
+        thread = threading.Thread(target=user_model.get, kwargs={"email": SAMPLE_USERS[0]["email"]})
+        thread.start()
+        thread.join()
+    stats = user_model.pool_stats()
+    assert stats["connections_opened"] == 51
+    assert stats["open_connections"] == 1  # only the test thread's own connection
+
+def test_failed_write_does_not_leave_transaction_open(user_model, valid_user_data, invalid_user_data_duplicate_email):
+    """Test that a failed insert is rolled back so other connections can still write."""
+    user_model.create(valid_user_data)
+    assert user_model.create(invalid_user_data_duplicate_email)["status"] == "error"
+    conn = sqlite3.connect(user_model.db_name, timeout=0.1)
+    conn.execute(f"UPDATE {user_model.table_name} SET name = 'Other Writer';")
+    conn.commit()
+    conn.close()
+    assert user_model.get(email=valid_user_data["email"])["data"]["name"] == "Other Writer"
+
+def test_close_reconnects_on_next_call(user_model, valid_user_data):
+    """Test that the model keeps working after its pooled connections are closed."""
+    user_model.create(valid_user_data)
+    user_model.close()
+    assert user_model.pool_stats()["open_connections"] == 0
+    assert user_model.exists(email=valid_user_data["email"])["data"] is True
+    assert user_model.pool_stats()["connections_opened"] == 2
+
+# --- Tests for id allocation ---
+def test_create_rerolls_colliding_id(user_model, valid_user_data, another_valid_user_data, monkeypatch):
+    """Test that create() picks a new id when the random id is already taken."""
+    first = user_model.create(valid_user_data)
+    taken_id = first["data"]["id"]
+    rolls = iter([taken_id, taken_id, 42])
+    monkeypatch.setattr(User_Model.random, "randint", lambda low, high: next(rolls))
+
+    result = user_model.create(another_valid_user_data)
+    assert result["status"] == "success"
+    assert result["data"]["id"] == 42
+    assert user_model.get(id=taken_id)["data"]["email"] == valid_user_data["email"]
+
+def test_create_gives_up_after_max_id_attempts(user_model, valid_user_data, another_valid_user_data, monkeypatch):
+    """Test that create() returns an error instead of looping forever when every id collides."""
+    taken_id = user_model.create(valid_user_data)["data"]["id"]
+    monkeypatch.setattr(User_Model.random, "randint", lambda low, high: taken_id)
+
+    result = user_model.create(another_valid_user_data)
+    assert result["status"] == "error"
+    assert isinstance(result["data"], sqlite3.IntegrityError)
+    assert user_model.exists(email=another_valid_user_data["email"])["data"] is False
+
+def test_create_does_not_scan_existing_ids(user_model, valid_user_data):
+    """Test that create() never runs a full-table SELECT of ids."""
+    statements = []
+    user_model._get_connection().set_trace_callback(statements.append)
+    user_model.create(valid_user_data)
+    assert not any("SELECT id FROM" in statement for statement in statements)
+
+def test_update_uses_constant_indexed_queries(user_model, valid_user_data):
+    """Test that update() runs a fixed number of point queries instead of scanning ids and emails."""
+    for user_data in SAMPLE_USERS:
+        user_model.create(user_data)
+    user_id = user_model.create(valid_user_data)["data"]["id"]
+
+    statements = []
+    user_model._get_connection().set_trace_callback(statements.append)
+    result = user_model.update({"id": user_id, "name": "O'Brien", "email": "obrien@example.com"})
+    user_model._get_connection().set_trace_callback(None)
+
+    assert result["status"] == "success"
+    assert result["data"]["name"] == "O'Brien"
+    queries = [statement for statement in statements if "SELECT" in statement or "UPDATE" in statement]
+    assert len(queries) == 3
+    assert all(f"WHERE id = {user_id}" in statement for statement in queries)
+
+# --- Tests for create_many() ---
+def test_create_many_inserts_all_valid_users(user_model):
+    """Test that create_many() inserts every user and returns one packet per row in order."""
+    result = user_model.create_many(SAMPLE_USERS, chunk_size=2)
+    assert result["status"] == "success"
+    assert [row["status"] for row in result["data"]] == ["success"] * len(SAMPLE_USERS)
+    assert [row["data"]["email"] for row in result["data"]] == [user["email"] for user in SAMPLE_USERS]
+    ids = [row["data"]["id"] for row in result["data"]]
+    assert len(set(ids)) == len(ids)
+    for user_data in SAMPLE_USERS:
+        assert user_model.exists(email=user_data["email"])["data"] is True
+
+def test_create_many_accepts_a_generator(user_model):
+    """Test that create_many() consumes any iterable, e.g. a stream of parsed rows."""
+    rows = ({"name": f"User {n}", "email": f"user{n}@example.com"} for n in range(25))
+    result = user_model.create_many(rows, chunk_size=10)
+    assert len(result["data"]) == 25
+    assert len(user_model.get_all()["data"]) == 25
+    assert result["data"][0]["data"]["preference_temperature"] == "neutral"
+
+def test_create_many_reports_invalid_rows(user_model, valid_user_data):
+    """Test that invalid rows fail individually while valid rows are inserted."""
+    rows = [
+        valid_user_data,
+        {"name": "No Email"},
+        {"name": "Bad Pref", "email": "pref@example.com", "preference_temperature": "lukewarm"},
+        "not a user",
+    ]
+    result = user_model.create_many(rows)
+    statuses = [row["status"] for row in result["data"]]
+    assert statuses == ["success", "error", "error", "error"]
+    assert result["data"][1]["data"] == "Missing required fields"
+    assert len(user_model.get_all()["data"]) == 1
+
+def test_create_many_isolates_duplicate_emails(user_model, valid_user_data, invalid_user_data_duplicate_email, another_valid_user_data):
+    """Test that a duplicate email only fails its own row, including duplicates within one chunk."""
+    user_model.create(another_valid_user_data)
+    rows = [valid_user_data, invalid_user_data_duplicate_email, another_valid_user_data, SAMPLE_USERS[0]]
+    result = user_model.create_many(rows, chunk_size=10)
+    statuses = [row["status"] for row in result["data"]]
+    assert statuses == ["success", "error", "error", "success"]
+    assert isinstance(result["data"][1]["data"], sqlite3.IntegrityError)
+    assert len(user_model.get_all()["data"]) == 3
+
+# --- User Cache Tests ---
+def count_selects(user_model, monkeypatch):
+    """Counts row lookups that reach SQLite."""
+    selects = []
+    original = user_model._select
+    monkeypatch.setattr(user_model, "_select", lambda column, value: selects.append(column) or original(column, value))
+    return selects
+
+def test_get_is_served_from_cache(user_model, valid_user_data, monkeypatch):
+    """Test that repeated get() and exists() calls for a user only query the database once."""
+    created = user_model.create(valid_user_data)["data"]
+    selects = count_selects(user_model, monkeypatch)
+    for _ in range(3):
+        assert user_model.get(email=valid_user_data["email"])["data"] == created
+        assert user_model.exists(email=valid_user_data["email"])["data"] is True
+        assert user_model.get(id=created["id"])["data"] == created
+    assert selects == ["email"]
+    assert user_model.cache_stats()["hits"] == 8
+
+def test_cached_user_is_returned_as_a_copy(user_model, valid_user_data):
+    """Test that changing a returned user dict does not change what later calls see."""
+    user_model.create(valid_user_data)
+    user_model.get(email=valid_user_data["email"])["data"]["preference_temperature"] = "gets_hot_easily"
+    assert user_model.get(email=valid_user_data["email"])["data"]["preference_temperature"] == "neutral"
+
+def test_writes_invalidate_cached_user(user_model, valid_user_data):
+    """Test that update_preference(), update() and remove() are visible to the next read."""
+    user_model.coherence_interval = 3600  # only write-through invalidation can keep reads fresh here
+    created = user_model.create(valid_user_data)["data"]
+    user_model.get(email=valid_user_data["email"])
+
+    user_model.update_preference(valid_user_data["email"], "gets_cold_easily")
+    assert user_model.get(id=created["id"])["data"]["preference_temperature"] == "gets_cold_easily"
+
+    user_model.update({"id": created["id"], "name": "Renamed", "email": "renamed@example.com"})
+    assert user_model.exists(email=valid_user_data["email"])["data"] is False
+    assert user_model.get(id=created["id"])["data"]["name"] == "Renamed"
+
+    user_model.remove("renamed@example.com")
+    assert user_model.get(id=created["id"])["status"] == "error"
+    assert user_model.exists(email="renamed@example.com")["data"] is False
+
+def test_cache_sees_writes_from_other_connections(user_model, valid_user_data):
+    """Test that a commit made by another connection (e.g. another worker process) clears the cache."""
+    user_model.create(valid_user_data)
+    user_model.get(email=valid_user_data["email"])
+    conn = sqlite3.connect(user_model.db_name)
+    conn.execute("UPDATE users SET preference_temperature = 'gets_hot_easily' WHERE email = ?", (valid_user_data["email"],))
+    conn.commit()
+    conn.close()
+    assert user_model.get(email=valid_user_data["email"])["data"]["preference_temperature"] == "gets_hot_easily"
+
+def test_cache_is_bounded(temp_database):
+    """Test that the least recently used users are evicted past cache_size."""
+    user_model = User(db_name=temp_database, table_name="users", cache_size=2)
+    user_model.initialize_table()
+    user_model.create_many(SAMPLE_USERS[:3])
+    for sample in SAMPLE_USERS[:3]:
+        user_model.get(email=sample["email"])
+    stats = user_model.cache_stats()
+    assert stats["size"] == 2 and stats["maxsize"] == 2
+    assert ("email", SAMPLE_USERS[0]["email"]) not in user_model._cache
+    assert ("id", user_model.get(email=SAMPLE_USERS[2]["email"])["data"]["id"]) in user_model._cache
+    user_model.close()
+
+# --- Preference Stats Tests ---
+def test_preference_stats_follow_every_write(user_model, valid_user_data, another_valid_user_data):
+    """Test that creates, bulk creates, preference changes and removals keep the counters exact."""
+    user_model.create(valid_user_data)
+    user_model.create_many(SAMPLE_USERS)
+    user_model.create_many([another_valid_user_data, another_valid_user_data])  # the duplicate is rolled back
+    user_model.update_preference(valid_user_data["email"], "gets_hot_easily")
+    user_model.update_preference(another_valid_user_data["email"], another_valid_user_data["preference_temperature"])
+    user_model.remove(SAMPLE_USERS[0]["email"])
+    stats = user_model.get_preference_stats()
+    assert stats["status"] == "success"
+    assert stats["data"] == user_model._count_preferences(user_model._get_connection().cursor())
+    assert user_model.check_preference_stats()["data"] == {"drift": {}, "repaired": False}
+
+def test_preference_stats_follow_direct_sql(user_model, valid_user_data):
+    """Test that the triggers also count writes that bypass the model."""
+    user_model.create(valid_user_data)
+    conn = sqlite3.connect(user_model.db_name)
+    conn.execute("UPDATE users SET preference_temperature = 'gets_cold_easily';")
+    conn.execute("INSERT INTO users VALUES (1, 'Raw', 'raw@example.com', 'gets_cold_easily', NULL);")
+    conn.commit()
+    conn.close()
+    assert user_model.get_preference_stats()["data"] == {"neutral": 0, "gets_cold_easily": 2, "gets_hot_easily": 0}
+
+def test_check_preference_stats_reports_and_repairs_drift(user_model, valid_user_data):
+    """Test that drifted counters are reported, and only overwritten with repair=True."""
+    user_model.create(valid_user_data)
+    conn = sqlite3.connect(user_model.db_name)
+    conn.execute("UPDATE users_preference_stats SET user_count = 5 WHERE preference_temperature = 'neutral';")
+    conn.commit()
+    conn.close()
+    expected_drift = {"neutral": {"stored": 5, "actual": 1}}
+    assert user_model.check_preference_stats()["data"] == {"drift": expected_drift, "repaired": False}
+    assert user_model.check_preference_stats(repair=True)["data"] == {"drift": expected_drift, "repaired": True}
+    assert user_model.get_preference_stats()["data"]["neutral"] == 1
+    assert user_model.check_preference_stats()["data"]["drift"] == {}
+
+def test_initialize_preference_stats_counts_existing_users(user_model, valid_user_data):
+    """Test that installing the stats on a populated table starts from the right counts."""
+    user_model.create(valid_user_data)
+    conn = sqlite3.connect(user_model.db_name)
+    conn.execute("DROP TABLE users_preference_stats;")
+    conn.commit()
+    conn.close()
+    user_model.initialize_preference_stats()
+    user_model.initialize_preference_stats()
+    assert user_model.get_preference_stats()["data"] == {"neutral": 1, "gets_cold_easily": 0, "gets_hot_easily": 0}
+
+def test_initialize_preference_stats_is_cheap_once_installed(user_model, valid_user_data):
+    """Test that re-running the install (as every app start does) does not recount the users table."""
+    user_model.create(valid_user_data)
+    conn = sqlite3.connect(user_model.db_name)
+    conn.execute("UPDATE users_preference_stats SET user_count = 5 WHERE preference_temperature = 'neutral';")
+    conn.commit()
+    conn.close()
+    user_model.initialize_preference_stats()
+    assert user_model.get_preference_stats()["data"]["neutral"] == 5
+
+def test_initialize_preference_stats_waits_for_users_table(temp_database):
+    """Test that installing the stats before the users table exists is a no-op, not an error."""
+    user = User(db_name=temp_database, table_name="users")
+    user.initialize_preference_stats()
+    assert user.get_preference_stats()["status"] == "error"
+    user.initialize_table()
+    assert user.get_preference_stats()["data"] == {"neutral": 0, "gets_cold_easily": 0, "gets_hot_easily": 0}
+    user.close()
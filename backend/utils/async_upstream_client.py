@@ -0,0 +1,92 @@
+# utils/async_upstream_client.py
+import asyncio
+
+import httpx
+
+from utils.upstream_client import RETRY_STATUSES, UpstreamClient
+
+
+class AsyncUpstreamClient:
+    """
+    Non-blocking counterpart of UpstreamClient for the async request path.
+
+    Wraps one httpx.AsyncClient (pooled keep-alive connections, (connect, read) timeouts) and
+    retries GETs with the same full-jitter backoff and Retry-After handling as UpstreamClient.
+    The httpx client is created on first use, inside the event loop that will use it.
+    """
+
+    def __init__(self, max_connections=100, max_keepalive_connections=32, connect_timeout=3.05,
+                 read_timeout=10, max_retries=2, backoff_base=0.2, backoff_max=2.0, sleep=asyncio.sleep):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self.requests_sent = 0
+        self.retries = 0
+        self.failures = 0
+        self._client = None
+
+    backoff = UpstreamClient.backoff
+    _retry_after = staticmethod(UpstreamClient._retry_after)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    async def get(self, url, params=None):
+        """
+        GET url, retrying transient failures. Returns the final httpx.Response (see UpstreamClient.get).
+
+        Raises:
+            httpx.TransportError: if the last attempt failed to connect or timed out.
+        """
+        attempt = 0
+        while True:
+            self.requests_sent += 1
+            try:
+                response = await self.client.get(url, params=params)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    if response.status_code >= 400:
+                        self.failures += 1
+                    return response
+                delay = self.backoff(attempt, self._retry_after(response))
+            self.retries += 1
+            attempt += 1
+            await self.sleep(delay)
+
+    async def get_json(self, url, params=None):
+        """
+        GET url and return the decoded JSON body, raising httpx.HTTPStatusError for error statuses.
+
+        A body that is not JSON raises httpx.DecodingError (an httpx.HTTPError), just as
+        UpstreamClient.get_json raises a RequestException for it, so callers handle both alike.
+        """
+        response = await self.get(url, params=params)
+        response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError as e:
+            raise httpx.DecodingError(f"Invalid JSON in response from {url}: {e}", request=response.request) from e
+
+    def stats(self):
+        return {
+            "requests": self.requests_sent,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,56 @@
+# utils/compression.py
+import gzip
+
+# Appended to a strong ETag when the body is sent gzip-encoded: the encoded bytes differ, so
+# the validator has to as well (RFC 9110, section 8.8.3).
+GZIP_ETAG_SUFFIX = "-gzip"
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "text/html", "text/plain", "text/csv"}
+
+
+def accepts_gzip(request):
+    """True if the client's Accept-Encoding allows gzip (explicitly or via *) with a non-zero q."""
+    return request.accept_encodings["gzip"] > 0
+
+
+def compressible(response, request):
+    """
+    True if the response may be gzipped for this client. Non-200 responses, streamed responses,
+    already encoded responses and non-text mimetypes are left alone. Responses that could have
+    been compressed get "Vary: Accept-Encoding" either way so shared caches key on it.
+    """
+    if (response.status_code != 200 or getattr(response, "direct_passthrough", False)
+            or getattr(response, "is_streamed", False) or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return False
+    response.vary.add("Accept-Encoding")
+    return accepts_gzip(request)
+
+
+def compress_body(response, body, min_size, level):
+    """Gzip body and mark response as encoded, or return None if body is shorter than min_size."""
+    if len(body) < min_size:
+        return None
+    response.headers["Content-Encoding"] = "gzip"
+    etag, weak = response.get_etag()
+    if etag is not None:
+        response.set_etag(etag + GZIP_ETAG_SUFFIX, weak=weak)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def gzip_response(response, request, min_size=1024, level=6):
+    """Compress a Flask response in place when the client negotiated gzip and the body is worth it."""
+    if compressible(response, request):
+        compressed = compress_body(response, response.get_data(), min_size, level)
+        if compressed is not None:
+            response.set_data(compressed)
+    return response
+
+
+async def gzip_response_async(response, request, min_size=1024, level=6):
+    """gzip_response for frameworks whose response bodies are read asynchronously (Quart)."""
+    if compressible(response, request):
+        compressed = compress_body(response, await response.get_data(), min_size, level)
+        if compressed is not None:
+            response.set_data(compressed)
+    return response
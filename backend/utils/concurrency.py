@@ -0,0 +1,145 @@
+# utils/concurrency.py
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+class StageTimeout(TimeoutError):
+    """Raised when a fan-out stage does not finish within its deadline."""
+
+
+def fan_out(calls, executor, timeout=None, return_exceptions=False):
+    """
+    Run independent zero-argument callables concurrently and collect their results.
+
+    Each call runs in a copy of the caller's context, so context variables (e.g. the request
+    ID stamped on log records) are seen by the pool thread as they were at submission.
+
+    Args:
+        calls: dict of name -> callable.
+        executor: the (bounded) executor the calls are submitted to.
+        timeout: seconds allowed for the whole stage, not for each call.
+        return_exceptions: if True, a failed call's exception (or a StageTimeout for a call
+            that missed the deadline) is returned as its result instead of being raised.
+
+    Returns:
+        dict of name -> result, with the same keys as calls.
+
+    Raises:
+        StageTimeout: if any call is still running when the deadline passes.
+        Exception: the first exception raised by a call, in the order of calls.
+    """
+    futures = {name: executor.submit(contextvars.copy_context().run, call) for name, call in calls.items()}
+    done, not_done = wait(futures.values(), timeout=timeout)
+    for future in not_done:
+        future.cancel()
+    if not return_exceptions:
+        if not_done:
+            pending = [str(name) for name, future in futures.items() if future in not_done]
+            raise StageTimeout(f"Timed out after {timeout}s waiting for: {', '.join(pending)}")
+        return {name: future.result() for name, future in futures.items()}
+
+    results = {}
+    for name, future in futures.items():
+        if future in not_done:
+            results[name] = StageTimeout(f"Timed out after {timeout}s waiting for: {name}")
+        else:
+            error = future.exception()
+            results[name] = error if error is not None else future.result()
+    return results
+
+
+def bounded_executor(max_workers, name):
+    """Thread pool used for upstream I/O, named so its threads are easy to spot in dumps."""
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that arrive
+    while it is still running wait for and share its result or exception instead
+    of repeating the work. Once the leader finishes the key is released, so later
+    calls run again (callers are expected to cache the result themselves).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future shared by the leader and its waiters
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines: concurrent awaits that share a key run the coroutine function
+    once and share its result or exception. Must be used from a single event loop.
+
+    The shared call runs as its own task, so a caller that is cancelled (e.g. by its request
+    timing out) stops waiting without cancelling the call for the callers still waiting on it.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> asyncio.Task shared by every caller
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done, key=key: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved so a failure nobody awaited any more is not logged as lost
+
+    def stats(self):
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
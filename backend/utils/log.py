@@ -0,0 +1,221 @@
+# utils/log.py
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+
+ROOT_LOGGER = "backend"  # modules log to backend.<module>; only this logger gets the queue handler
+REQUEST_ID_HEADER = "X-Request-ID"
+REDACTED = "[redacted]"
+# Field names whose values never reach a log line, whatever logged them
+SECRET_FIELDS = frozenset({"google_oauth_token", "oauth_token", "token", "access_token", "password",
+                           "authorization", "api_key", "appid"})
+SECRET_PARAMETER = re.compile(r"((?:appid|api_key|token)=)[^&\s'\"]+", re.IGNORECASE)
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+# Attributes every LogRecord has; anything else on a record came from extra= and is logged as a field
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def get_logger(name):
+    """Logger for a backend module, e.g. get_logger("user_controller") -> backend.user_controller"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def new_request_id(incoming=None):
+    """Use the caller's X-Request-ID when it is well formed (so IDs follow a request across services)"""
+    if incoming and VALID_REQUEST_ID.match(incoming):
+        return incoming
+    return os.urandom(8).hex()
+
+
+def redact(value, key=None):
+    """Copy of value with secret fields replaced and secret query parameters masked in strings"""
+    if key is not None and str(key).lower() in SECRET_FIELDS:
+        return REDACTED if value is not None else None
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return SECRET_PARAMETER.sub(r"\1" + REDACTED, value)
+    return value
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps each record with the current request's ID (None outside a request)"""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of high-volume records. Rates are per event, the name a call passes
+    as extra={"event": ...}; records at WARNING and above are always kept.
+    """
+
+    def __init__(self, rates, rng=None):
+        super().__init__()
+        self.rates = dict(rates)
+        self.rng = rng or random.Random()
+
+    @staticmethod
+    def parse(spec):
+        """Parse "http.request=0.1,weather.served=0.5" into {event: rate}"""
+        rates = {}
+        for part in spec.split(","):
+            if not part.strip():
+                continue
+            event, _, rate = part.partition("=")
+            try:
+                rates[event.strip()] = float(rate)
+            except ValueError:
+                raise ValueError(f"Invalid log sample rate {part.strip()!r}")
+        return rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        return rate is None or rate >= 1 or self.rng.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and name not in entry:
+                entry[name] = redact(value, name)
+        if record.exc_info:
+            entry["exception"] = redact(self.formatException(record.exc_info))
+        elif record.exc_text:
+            entry["exception"] = redact(record.exc_text)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the logging thread: when the queue is full the record is
+    dropped and counted rather than waited on.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only merge args into the message here; formatting (and the JSON work) happens on the
+        # listener thread. Exceptions are rendered now, since tracebacks do not survive the queue.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class QueueLogging:
+    """
+    The backend's logging pipeline: records are filtered and queued on the calling thread, then
+    formatted and written by a QueueListener thread, so log I/O never runs on a request thread.
+    A forked child gets a fresh queue and listener thread (neither survives fork).
+    """
+
+    def __init__(self, level="INFO", sample_rates=None, queue_size=10000, stream=None):
+        self.queue_size = queue_size
+        self.output = logging.StreamHandler(stream or sys.stderr)
+        self.output.setFormatter(JsonFormatter())
+        self.handler = DroppingQueueHandler(queue.Queue(queue_size))
+        self.handler.addFilter(RequestIdFilter())
+        self.handler.addFilter(SamplingFilter(sample_rates or {}))
+        self.level = level
+        self.listener = None
+
+    def start(self):
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel(self.level)
+        logger.addHandler(self.handler)
+        logger.propagate = False
+        return self
+
+    def stop(self):
+        """Detach from the backend logger and write out everything still queued"""
+        logging.getLogger(ROOT_LOGGER).removeHandler(self.handler)
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def after_fork(self):
+        if self.listener is None:
+            return
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+
+    @property
+    def dropped(self):
+        return self.handler.dropped
+
+
+_active = None
+_active_lock = threading.Lock()
+
+
+def configure_logging(config, stream=None):
+    """
+    Route backend.* loggers through a QueueLogging pipeline built from config (LOG_LEVEL,
+    LOG_SAMPLE_RATES, LOG_QUEUE_SIZE). Replaces the pipeline of any earlier call, so building
+    several apps in one process does not stack handlers or listener threads.
+    """
+    global _active
+    pipeline = QueueLogging(level=config["LOG_LEVEL"].upper(),
+                            sample_rates=SamplingFilter.parse(config["LOG_SAMPLE_RATES"]),
+                            queue_size=config["LOG_QUEUE_SIZE"], stream=stream)
+    with _active_lock:
+        if _active is not None:
+            _active.stop()
+        _active = pipeline.start()
+    return pipeline
+
+
+def _stop_active():
+    if _active is not None:
+        _active.stop()
+
+
+def _restart_active_after_fork():
+    if _active is not None:
+        _active.after_fork()
+
+
+atexit.register(_stop_active)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_active_after_fork)
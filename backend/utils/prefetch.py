@@ -0,0 +1,176 @@
+# utils/prefetch.py
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("backend.prefetch")
+
+
+class PrefetchScheduler:
+    """
+    Keeps tracked locations warm by refreshing them shortly before their cached
+    payloads expire, so requests are served from cache instead of waiting on
+    the upstream API.
+
+    Locations are tracked once they have been requested min_requests times and
+    forgotten after idle_timeout seconds without a request, unless they were
+    pinned. At most max_tracked locations are kept; past that the least recently
+    requested unpinned location is dropped, so the tracked set always fits in the
+    cache it is refreshing. Refreshes run on a bounded worker pool; a location
+    whose refresh fails is retried with jittered exponential backoff instead of
+    on every poll.
+
+    Args:
+        refresh: callable(location) that fetches fresh payloads and stores them in the cache.
+        expires_in: callable(location) returning seconds until the location's earliest cached
+            payload expires, or None if something is not cached at all.
+    """
+
+    def __init__(self, refresh, expires_in, lead_time=30, poll_interval=5, idle_timeout=3600,
+                 max_workers=4, backoff_base=30, backoff_max=900, max_tracked=None, min_requests=1,
+                 executor=None, timer=time.monotonic):
+        self.refresh = refresh
+        self.expires_in = expires_in
+        self.lead_time = lead_time
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.max_workers = max_workers
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_tracked = max_tracked
+        self.min_requests = min_requests
+        self.executor = executor
+        self.timer = timer
+        self._lock = threading.Lock()
+        # Both ordered least recently requested first, for eviction
+        self._locations = OrderedDict()  # location -> {"last_requested", "pinned", "failures", "next_attempt"}
+        self._candidates = OrderedDict()  # location -> (requests, last_requested), not yet tracked
+        self._in_flight = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    def track(self, location, pinned=False):
+        """Record a request for location. Tracking alone does not start the scheduler thread."""
+        now = self.timer()
+        with self._lock:
+            state = self._locations.get(location)
+            if state is not None:
+                state["last_requested"] = now
+                state["pinned"] = state["pinned"] or pinned
+                self._locations.move_to_end(location)
+                return
+            requests, last_requested = self._candidates.pop(location, (0, now))
+            requests = 1 if now - last_requested > self.idle_timeout else requests + 1
+            if pinned or requests >= self.min_requests:
+                self._locations[location] = {"last_requested": now, "pinned": pinned,
+                                             "failures": 0, "next_attempt": 0}
+                self._evict(self._locations, lambda state: not state["pinned"])
+            else:
+                self._candidates[location] = (requests, now)
+                self._evict(self._candidates, lambda candidate: True)
+
+    def _evict(self, locations, evictable):
+        """Drop the least recently requested evictable entries while locations is over max_tracked (lock held)"""
+        if self.max_tracked is None:
+            return
+        for location in list(locations):
+            if len(locations) <= self.max_tracked:
+                return
+            if evictable(locations[location]):
+                del locations[location]
+                if locations is self._locations:
+                    self.evictions += 1
+
+    def start(self):
+        """Start the scheduler thread if it is not already running (safe to call per request)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix="weather-prefetch")
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="weather-prefetch-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Prefetch scheduler error", extra={"event": "prefetch.scheduler_error"})
+            self._stop.wait(self.poll_interval)
+
+    def run_once(self):
+        """Submit a refresh for every tracked location that is missing or about to expire."""
+        now = self.timer()
+        due = []
+        with self._lock:
+            for location, state in list(self._locations.items()):
+                if not state["pinned"] and now - state["last_requested"] > self.idle_timeout:
+                    del self._locations[location]
+                elif location not in self._in_flight and state["next_attempt"] <= now:
+                    due.append(location)
+            for location, (_, last_requested) in list(self._candidates.items()):
+                if now - last_requested > self.idle_timeout:
+                    del self._candidates[location]
+
+        submitted = []
+        for location in due:
+            remaining = self.expires_in(location)
+            if remaining is not None and remaining > self.lead_time:
+                continue
+            with self._lock:
+                if location in self._in_flight:
+                    continue
+                self._in_flight.add(location)
+            self.executor.submit(self._refresh, location)
+            submitted.append(location)
+        return submitted
+
+    def _refresh(self, location):
+        try:
+            self.refresh(location)
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+                state = self._locations.get(location)
+                if state is not None:
+                    state["failures"] += 1
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** (state["failures"] - 1))
+                    state["next_attempt"] = self.timer() + random.uniform(delay / 2, delay)
+            logger.warning("Prefetch failed: %s", e, extra={"event": "prefetch.failed", "location": str(location)})
+        else:
+            with self._lock:
+                self.refreshes += 1
+                state = self._locations.get(location)
+                if state is not None:
+                    state["failures"] = 0
+                    state["next_attempt"] = 0
+        finally:
+            with self._lock:
+                self._in_flight.discard(location)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracked": len(self._locations),
+                "candidates": len(self._candidates),
+                "evictions": self.evictions,
+                "in_flight": len(self._in_flight),
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "backing_off": sum(1 for state in self._locations.values() if state["failures"]),
+            }
@@ -0,0 +1,97 @@
+# utils/profiling.py
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+PROFILE_HEADER = "X-Profile-Token"
+
+
+class RouteProfiler:
+    """
+    Profiles a sample of requests to selected routes with cProfile and keeps one aggregated
+    profile per route. Aggregates are written to directory as <route>.<pid>.prof (the pstats
+    dump format, readable with python -m pstats or snakeviz) at most every flush_interval
+    seconds, and on flush().
+
+    A request is profiled when its path starts with one of routes and it wins the sample_rate
+    draw, or when it carries admin_token in the X-Profile-Token header (any route).
+
+    Only create one when profiling is wanted: the app registers no hooks without it, so
+    requests pay nothing while profiling is off.
+    """
+
+    def __init__(self, directory, routes=(), sample_rate=0.0, admin_token=None, flush_interval=30.0,
+                 rng=None, timer=time.monotonic):
+        self.directory = directory
+        self.routes = tuple(route.strip() for route in routes if route.strip())
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self.flush_interval = flush_interval
+        self.rng = rng or random.Random()
+        self.timer = timer
+        self._lock = threading.Lock()
+        self._stats = {}  # route -> pstats.Stats aggregated since start
+        self._dirty = set()
+        self._last_flush = timer()
+        self.profiled = 0
+
+    def wants(self, path, token=None):
+        """Whether a request for path (with the given X-Profile-Token value) should be profiled"""
+        if token and self.admin_token and hmac.compare_digest(token, self.admin_token):
+            return True
+        if not any(path == route or path.startswith(route.rstrip("/") + "/") for route in self.routes):
+            return False
+        return self.sample_rate >= 1 or self.rng.random() < self.sample_rate
+
+    def start(self):
+        """
+        Return an enabled cProfile.Profile for the current request, or None if one cannot be
+        enabled here (Python 3.12+ allows only one active profiler per process).
+        """
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        return profile
+
+    def finish(self, route, profile):
+        """Stop profile and add it to route's aggregate; flushes if flush_interval has passed."""
+        profile.disable()
+        with self._lock:
+            stats = self._stats.get(route)
+            if stats is None:
+                self._stats[route] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+            self._dirty.add(route)
+            self.profiled += 1
+            due = self.timer() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def path_for(self, route):
+        name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        return os.path.join(self.directory, f"{name}.{os.getpid()}.prof")
+
+    def flush(self):
+        """Write every route profiled since the last flush; returns the paths written"""
+        with self._lock:
+            self._last_flush = self.timer()
+            routes, self._dirty = self._dirty, set()
+            if not routes:
+                return []
+            os.makedirs(self.directory, exist_ok=True)
+            paths = []
+            for route in sorted(routes):
+                path = self.path_for(route)
+                # Write then rename, so a reader never sees a half-written profile
+                self._stats[route].dump_stats(path + ".tmp")
+                os.replace(path + ".tmp", path)
+                paths.append(path)
+            return paths
@@ -0,0 +1,45 @@
+# utils/time_format.py
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+DEFAULT_ZONE = "America/New_York"
+
+
+@lru_cache(maxsize=32)
+def get_zone(name):
+    """ZoneInfo objects are cached per name so the tz database is read once per zone."""
+    return ZoneInfo(name)
+
+
+def format_clock(hour, minute):
+    """24h hour/minute -> "3PM", or "3:30PM" when the minute is not 00."""
+    hour12 = hour % 12 or 12
+    ampm = "AM" if hour < 12 else "PM"
+    if minute == 0:
+        return f"{hour12}{ampm}"
+    return f"{hour12}:{minute:02d}{ampm}"
+
+
+def format_local_times(timestamps, utc_offset=None, zone_name=DEFAULT_ZONE):
+    """
+    Format UTC epoch seconds as local clock times in one pass.
+
+    OpenWeatherMap reports each location's UTC offset in seconds (forecast
+    "city.timezone", current "timezone"). When it is given, local time is plain
+    integer arithmetic on the epoch; no datetime objects are created. Without it,
+    times fall back to the named zone.
+    """
+    if utc_offset is not None:
+        times = []
+        for timestamp in timestamps:
+            local_minutes = (int(timestamp) + utc_offset) // 60
+            times.append(format_clock((local_minutes // 60) % 24, local_minutes % 60))
+        return times
+
+    zone = get_zone(zone_name)
+    times = []
+    for timestamp in timestamps:
+        local = datetime.fromtimestamp(timestamp, zone)
+        times.append(format_clock(local.hour, local.minute))
+    return times
@@ -0,0 +1,131 @@
+# utils/upstream_client.py
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamClient:
+    """
+    Shared HTTP client for third-party APIs (OpenWeatherMap).
+
+    Wraps one requests.Session so connections are pooled and kept alive across
+    requests and threads, applies a (connect, read) timeout to every call, and
+    retries idempotent GETs a bounded number of times with full-jitter
+    exponential backoff on connection errors, timeouts and retryable statuses.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=32, connect_timeout=3.05, read_timeout=10,
+                 max_retries=2, backoff_base=0.2, backoff_max=2.0, sleep=time.sleep):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries = 0
+        self.failures = 0
+        self.session = self._new_session()
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt (0-based), capped at backoff_max."""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url, params=None, timeout=None):
+        """
+        GET url, retrying transient failures.
+
+        Returns:
+            The final requests.Response. Non-retryable error statuses are returned
+            as-is; a retryable status that persists after the last retry is returned
+            as well so the caller can inspect it.
+
+        Raises:
+            requests.exceptions.RequestException: if the last attempt failed to connect
+            or timed out.
+        """
+        timeout = timeout or self.timeout
+        attempt = 0
+        while True:
+            with self._lock:
+                self.requests_sent += 1
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    if response.status_code >= 400:
+                        with self._lock:
+                            self.failures += 1
+                    return response
+                delay = self.backoff(attempt, self._retry_after(response))
+                response.close()
+            with self._lock:
+                self.retries += 1
+            attempt += 1
+            self.sleep(delay)
+
+    def get_json(self, url, params=None, timeout=None):
+        """GET url and return the decoded JSON body, raising HTTPError for error statuses."""
+        response = self.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    def stats(self):
+        """
+        Request, retry and connection-pool counters.
+
+        connections_reused is the number of requests served over an already open
+        keep-alive connection, summed over the pools the session currently holds.
+        """
+        connections_opened = 0
+        pool_requests = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                connections_opened += pool.num_connections
+                pool_requests += pool.num_requests
+        with self._lock:
+            return {
+                "requests": self.requests_sent,
+                "retries": self.retries,
+                "failures": self.failures,
+                "connections_opened": connections_opened,
+                "connections_reused": max(pool_requests - connections_opened, 0),
+            }
+
+    def close(self):
+        self.session.close()
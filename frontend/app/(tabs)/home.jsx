@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { View, Text, StyleSheet, ScrollView, Button, TouchableOpacity, Dimensions } from 'react-native';
 import AsyncStorage from '@react-native-async-storage/async-storage'
 import { Link, useFocusEffect } from 'expo-router'; 
@@ -12,6 +12,7 @@ const Home = () => {
   const [error, setError] = useState(null);
   const [isCelsius, setIsCelsius] = useState(true);
   const [hourlyForecast, setHourlyForecast] = useState([]);
+  const weatherEtag = useRef(null); // ETag of the /weather body currently on screen
 
   const convertToF = (c) => Math.round((c * 9/5) + 32);
   const formatTemp = (temp) => isCelsius ? `${Math.round(temp)}°` : `${convertToF(temp)}°`;
@@ -133,14 +134,19 @@ const Home = () => {
       console.log("Fetching weather for email:", userEmail); // Debug log
       
       const response = await fetch(
-        `http://${IP_ADDRESS}:5000/weather?email=${encodeURIComponent(userEmail)}`
+        `http://${IP_ADDRESS}:5000/weather?email=${encodeURIComponent(userEmail)}`,
+        { headers: weatherEtag.current ? { 'If-None-Match': weatherEtag.current } : {} }
       );
-      
+
+      if (response.status === 304) {
+        return; // nothing changed since the last fetch, keep showing the current data
+      }
       if (!response.ok) {
         throw new Error('Could not retrieve weather data');
       }
 
       const data = await response.json();
+      weatherEtag.current = response.headers.get('ETag');
       console.log(data.hourly_forecast_data);
       setCurrentWeatherData(data.current_weather_data);
       setHourlyForecast(data.hourly_forecast_data.hourly_forecast_list);
@@ -17,9 +17,9 @@ const Settings = () => {
         try {
             const userEmail = await AsyncStorage.getItem('userEmail');
             const IP_ADDRESS = process.env.EXPO_PUBLIC_IP_ADDRESS;
-            const response = await fetch(`http://${IP_ADDRESS}:5000/weather?email=${encodeURIComponent(userEmail)}`);
+            const response = await fetch(`http://${IP_ADDRESS}:5000/weather?email=${encodeURIComponent(userEmail)}&fields=current_weather_data.userPreference`);
             const data = await response.json();
-            setSelectedPreference(data.userPreference);
+            setSelectedPreference(data.current_weather_data.userPreference);
         } catch (error) {
             console.error('Error loading preference:', error);
         }